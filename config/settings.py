@@ -7,6 +7,93 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     log_dir: str = "/app/logs"
 
+    # Backend de embeddings: "openai" o "hashing" (local, determinista, sin red; para pruebas de carga / CI)
+    embedding_backend: str = "openai"
+    embedding_model: str = "text-embedding-3-small"
+    local_embedding_dimension: int = 1536
+    # Dimension reducida de los embeddings (0 = completa); "request" la pide a la API
+    # (text-embedding-3-*), "truncate" recorta y renormaliza localmente. Cambiarla exige
+    # re-indexar el store: POST /api/v1/vector-store/reindex con la API en marcha, o con
+    # todo parado python -m src.app.infrastructure.vector_store.reindex --offline
+    # Al arrancar, un store ya re-indexado a <modelo>@N usa esa dimension aunque no coincida
+    embedding_target_dimension: int = 0
+    embedding_reduce_mode: str = "request"
+    # Ingesta de embeddings: textos por lote y lotes concurrentes
+    embedding_batch_size: int = 64
+    embedding_max_in_flight: int = 4
+    # Limites por peticion a la API de embeddings y cuota de la cuenta (0 = sin limite)
+    embedding_request_max_inputs: int = 2048
+    embedding_request_max_tokens: int = 300_000
+    embedding_tokens_per_minute: int = 1_000_000
+    embedding_requests_per_minute: int = 3_000
+    embedding_max_retries: int = 6
+    # Cache de embeddings en Redis: segundos de vida (0 = sin expiracion)
+    embedding_cache_ttl_seconds: int = 30 * 24 * 3600
+    embedding_cache_dtype: str = "float32"  # float32 o float16 (la mitad de memoria, algo de precision)
+    # Cache en memoria (LRU por bytes) delante de Redis; 0 = desactivado
+    embedding_memory_cache_bytes: int = 64 * 1024 * 1024
+    # Llamadas identicas simultaneas (embeddings / LLM) comparten una sola llamada;
+    # con singleflight_across_processes tambien entre procesos via Redis
+    singleflight_across_processes: bool = False
+    singleflight_lock_seconds: float = 30.0
+
+    # Chunking: tokens por chunk, tokens solapados entre chunks consecutivos y corte en
+    # limite de "paragraph", "sentence", "word" o "none" (corte duro cada chunk_max_tokens)
+    chunk_max_tokens: int = 200
+    chunk_overlap_tokens: int = 20
+    chunk_snap: str = "sentence"
+    # Directorio local de los ficheros BPE de tiktoken, relativo a la raiz del repositorio
+    # (python -m src.app.utils.tokenizer lo llena, tambien en el build de Docker; sin el, los
+    # tokens de cada chunk se estiman)
+    tiktoken_cache_dir: str = "tiktoken_cache"
+
+    # Ingesta en streaming: chunks por lote de embedding/indexado, lotes en espera entre
+    # etapas (paginas -> chunks -> embeddings -> indice) y bytes por lectura al guardar un upload
+    ingest_batch_chunks: int = 256
+    ingest_queue_size: int = 4
+    upload_spool_chunk_bytes: int = 1024 * 1024
+
+    # Trabajos de ingesta en segundo plano: "local" (hilos del proceso de la API) o "celery"
+    # (un worker escritor: celery -A src.worker.celery_app:celery_app worker --pool threads)
+    job_broker: str = "local"
+    worker_concurrency: int = 2
+    celery_broker_url: str = ""  # vacio = redis://REDIS_HOST:REDIS_PORT/1
+    job_ttl_seconds: int = 7 * 24 * 3600
+    # Donde se guardan los uploads hasta que el worker los procesa (vacio = temporal del
+    # sistema; con celery debe ser un directorio compartido con el worker)
+    upload_spool_dir: str = ""
+
+    # Extraccion de PDF con PyMuPDF: procesos (0 = uno por CPU), paginas por tarea y
+    # paginas minimas para repartir el documento entre procesos
+    pdf_extract_workers: int = 0
+    pdf_pages_per_task: int = 16
+    pdf_parallel_min_pages: int = 32
+
+    # Segmentos del vector store: compactar en segundo plano al superar este numero
+    vector_store_merge_threshold: int = 8
+
+    # Indice FAISS: flat, ivf_flat, ivf_pq o hnsw (se entrena al superar el umbral)
+    faiss_index_type: str = "flat"
+    faiss_storage: str = "float32"  # float32, fp16, sq8 o pq
+    faiss_quantizer_train_rows: int = 10_000
+    faiss_rescore_factor: int = 0  # >1: re-ranquea factor*top_k candidatos con vectores exactos
+    faiss_train_threshold: int = 100_000
+    faiss_train_sample_size: int = 65_536
+    faiss_nlist: int = 0  # 0 = automatico (~4*sqrt(n))
+    faiss_pq_m: int = 64
+    faiss_hnsw_m: int = 32
+    faiss_nprobe: int = 16
+    faiss_ef_search: int = 64
+    vector_store_index_checkpoint_rows: int = 50_000
+    # Snapshots: filas / deltas pendientes antes de reconstruir el indice en segundo plano
+    vector_store_delta_rows: int = 10_000
+    vector_store_max_deltas: int = 32
+    # Busquedas filtradas: por debajo de estas filas se hace un escaneo exacto del subconjunto
+    vector_store_exact_filter_rows: int = 20_000
+    # Workers de solo lectura: indice y vectores mapeados (mmap), compartidos entre procesos
+    vector_store_read_only: bool = False
+    vector_store_refresh_seconds: float = 10.0  # cada cuanto revisar cambios del escritor
+
     class Config:
         env_file = ".env"
 
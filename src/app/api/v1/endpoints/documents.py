@@ -1,47 +1,58 @@
-from fastapi import APIRouter, UploadFile, File
-from src.app.infrastructure.file_processing.pdf import parse_pdf_with_annexes
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from config.settings import settings
+from src.app.infrastructure.file_processing.sections import is_supported
 from src.app.infrastructure.llm.rag_container import rag_chain
+from src.worker.broker import enqueue_ingest
+import tempfile
 import uuid
 import os
 
 router = APIRouter()
 #rag_chain = RAGChain()
 
-@router.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    # Save PDF to /tmp
-    content = await file.read()
-    filename = file.filename or f"{uuid.uuid4()}.pdf"
-    temp_path = f"/tmp/{filename}"
-    
-    with open(temp_path, "wb") as f:
-        f.write(content)
 
-    # Parse into sections
-    parsed = parse_pdf_with_annexes(temp_path)  # returns {"summary": ..., "annexes": [...]}
+async def spool_upload(file: UploadFile, suffix: str = "") -> str:
+    """Copy an upload to a new temp file in fixed-size reads; returns its path"""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=settings.upload_spool_dir or None)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(settings.upload_spool_chunk_bytes)
+                if not chunk:
+                    break
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
 
+@router.post("/upload-pdf", status_code=202)
+async def upload_pdf(file: UploadFile = File(...)):
+    filename = os.path.basename(file.filename or "") or f"{uuid.uuid4()}.pdf"
+    if not is_supported(filename):
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {filename}")
     # Create doc_id based on filename (or UUID if needed)
     doc_id = os.path.splitext(filename)[0]  # e.g., contrato_2024.pdf → contrato_2024
 
-    # Embed summary
-    if parsed.get("summary"):
-        rag_chain.ingest_document(
-            text=parsed["summary"],
-            doc_id=doc_id,
-            section="summary"
-        )
-
-    # Embed annexes individually with sub-sections
-    for idx, annex_text in enumerate(parsed.get("annexes", []), start=1):
-        rag_chain.ingest_document(
-            text=annex_text,
-            doc_id=doc_id,
-            section=f"annex_{idx}"
-        )
-
+    # Spooled to a unique temp file, never read whole into memory; a worker
+    # parses, embeds and indexes it (poll GET /jobs/{job_id})
+    temp_path = await spool_upload(file, suffix=os.path.splitext(filename)[1])
+    try:
+        job = enqueue_ingest(temp_path, doc_id, filename)
+    except Exception:
+        os.unlink(temp_path)
+        raise
     return {
-        "status": "uploaded and embedded",
+        "status": job["status"],
+        "job_id": job["job_id"],
         "doc_id": doc_id,
-        "summary_chunks": len(parsed.get("summary", "").split("\n")),
-        "annexes": len(parsed.get("annexes", []))
     }
+
+
+@router.delete("/documents/{doc_id}")
+def delete_document(doc_id: str):
+    deleted = rag_chain.delete_document(doc_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+    return {"status": "deleted", "doc_id": doc_id, "chunks_deleted": deleted}
@@ -0,0 +1,13 @@
+# src/app/api/v1/endpoints/jobs.py
+from fastapi import APIRouter, HTTPException
+from src.worker.jobs import get_job_store
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    # status (queued / running / done / failed), progress, result and error of an upload
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
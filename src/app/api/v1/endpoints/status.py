@@ -1,13 +1,57 @@
 # src/app/api/v1/endpoints/status.py
-from fastapi import APIRouter
+import time
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
 from src.app.infrastructure.llm.rag_container import rag_chain  # ← USE THIS
+from src.worker import jobs
 
 router = APIRouter()
 
+class ReindexRequest(BaseModel):
+    # Shortened size of the current embeddings; must be below the store's dimension
+    dimension: int = Field(..., gt=0)
+    reembed: bool = False
+
 @router.get("/vector-status")
 def status():
     return {
-        "document_count": len(rag_chain.vector_store.documents),
+        "document_count": rag_chain.vector_store.count(),
         "index_trained": rag_chain.vector_store.is_trained,
-        "ready": len(rag_chain.vector_store.documents) > 0
+        "ready": rag_chain.vector_store.count() > 0,
+        "embedding_memory_cache": rag_chain.embedder.memory.stats()
     }
+
+@router.post("/vector-store/reindex", status_code=202)
+def reindex_store(request: ReindexRequest):
+    # Live re-index of the API's store at another dimension; follow it with GET /jobs/{job_id}
+    from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+    from src.app.infrastructure.llm.embeddings import create_backend
+    from src.app.infrastructure.vector_store.reindex import reindex_in_background
+
+    store = rag_chain.vector_store
+    if request.dimension >= store.dimension:
+        raise HTTPException(
+            status_code=400,
+            detail=f"dimension must be below the store's current {store.dimension}",
+        )
+    job_store = jobs.get_job_store()
+    embedder = EmbeddingAdapter(backend=create_backend(target_dimension=request.dimension))
+
+    def done(report, error):
+        if error is not None:
+            job_store.update(job["job_id"], status=jobs.FAILED, error=str(error), finished_at=time.time())
+        else:
+            job_store.update(job["job_id"], status=jobs.DONE, result=report, finished_at=time.time())
+
+    job = job_store.create(kind="reindex", dimension=request.dimension)
+    job_store.update(job["job_id"], status=jobs.RUNNING, started_at=time.time())
+    try:
+        reindex_in_background(store, embedder, request.reembed, done=done)
+    except ValueError as e:
+        job_store.update(job["job_id"], status=jobs.FAILED, error=str(e), finished_at=time.time())
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        # Read-only API process, or a re-index already running
+        job_store.update(job["job_id"], status=jobs.FAILED, error=str(e), finished_at=time.time())
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": jobs.RUNNING, "job_id": job["job_id"], "dimension": request.dimension}
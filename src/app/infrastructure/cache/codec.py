@@ -0,0 +1,48 @@
+import struct
+import numpy as np
+from typing import Optional
+
+# Cached embedding layout (little-endian):
+#   magic "EMB" | version u8 | dtype u8 | pad u8 | model length u16 | dimension u32
+#   | model (utf-8) | zero padding to 8 bytes | dimension * float32 / float16
+MAGIC = b"EMB"
+VERSION = 1
+_HEADER = struct.Struct("<3sBBxHI")
+DTYPES = {"float32": (0, np.dtype("<f4")), "float16": (1, np.dtype("<f2"))}
+_BY_CODE = {code: dtype for code, dtype in DTYPES.values()}
+
+
+def _payload_offset(model_len: int) -> int:
+    # Keep the vector 8-byte aligned so frombuffer views are aligned
+    end = _HEADER.size + model_len
+    return end + (-end % 8)
+
+
+def encode_embedding(vector, model: str, dtype: str = "float32") -> bytes:
+    """Raw little-endian bytes of an embedding, with a model / dimension header"""
+    code, np_dtype = DTYPES[dtype]
+    values = np.asarray(vector, dtype=np_dtype).ravel()
+    name = model.encode("utf-8")
+    header = _HEADER.pack(MAGIC, VERSION, code, len(name), len(values)) + name
+    return header + b"\0" * (_payload_offset(len(name)) - len(header)) + values.tobytes()
+
+
+def decode_embedding(data: Optional[bytes], model: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    float32 vector of a cached entry, or None when the entry is missing, not in
+    this format (e.g. an older pickled list) or was written for another model.
+    float32 entries are read-only views of `data` (no copy).
+    """
+    if not data or len(data) < _HEADER.size or data[:3] != MAGIC:
+        return None
+    _, version, code, model_len, dimension = _HEADER.unpack_from(data)
+    if version != VERSION or code not in _BY_CODE:
+        return None
+    if model is not None and data[_HEADER.size:_HEADER.size + model_len].decode("utf-8", "replace") != model:
+        return None
+    dtype = _BY_CODE[code]
+    offset = _payload_offset(model_len)
+    if len(data) != offset + dimension * dtype.itemsize:
+        return None
+    vector = np.frombuffer(data, dtype=dtype, count=dimension, offset=offset)
+    return vector if dtype == np.float32 else vector.astype(np.float32)
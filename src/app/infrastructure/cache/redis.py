@@ -2,7 +2,7 @@ import redis
 import json
 import os
 import pickle
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 
 class RedisCache:
 #    def __init__(self):
@@ -31,12 +31,32 @@ class RedisCache:
 	        db=int(os.getenv("REDIS_DB", 0))
 	    )
 
-    def set(self, key: str, value: Any, ex: Optional[int] = None):
-        pickled = pickle.dumps(value)
+    # raw=True stores / returns bytes as they are (values already encoded by the caller)
+    def set(self, key: str, value: Any, ex: Optional[int] = None, raw: bool = False):
+        pickled = value if raw else pickle.dumps(value)
         self.client.set(key, pickled, ex=ex)
 
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str, raw: bool = False) -> Optional[Any]:
         value = self.client.get(key)
+        return value if raw else self._decode(value)
+
+    def get_many(self, keys: List[str], raw: bool = False) -> List[Optional[Any]]:
+        """Values of many keys in one MGET round trip (None where missing)"""
+        if not keys:
+            return []
+        values = self.client.mget(keys)
+        return values if raw else [self._decode(value) for value in values]
+
+    def set_many(self, items: Dict[str, Any], ex: Optional[int] = None, raw: bool = False):
+        """Store many keys in one pipelined round trip"""
+        if not items:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value if raw else pickle.dumps(value), ex=ex)
+        pipe.execute()
+
+    def _decode(self, value) -> Optional[Any]:
         if value is None:
             return None
 
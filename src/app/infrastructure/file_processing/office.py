@@ -0,0 +1,302 @@
+"""
+Streaming text extraction for Office Open XML files (.docx, .xlsx, .pptx).
+
+The zip parts are decompressed and parsed incrementally (iterparse), each
+paragraph / table / row being dropped as soon as its text is taken, so memory
+does not grow with the document. Like iter_pdf_sections, every extractor
+yields (section, text) pieces:
+
+- .docx: body text goes to "summary"; a heading (or short paragraph) that
+  starts with ANEXO / ANNEX / APPENDIX / APÉNDICE opens annex_1, annex_2, ...
+- .xlsx: one "sheet_<n>" section per worksheet, rows as "a | b | c" lines,
+  the sheet's first row repeated at the top of every piece as a header
+- .pptx: one "slide_<n>" section per slide, in presentation order
+"""
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Characters per yielded piece (the chunker joins consecutive pieces of a section)
+PIECE_CHARS = 4000
+ANNEX_RE = re.compile(r"^\s*(ANEXO|ANNEX|APPENDIX|AP[EÉ]NDICE)\b", re.IGNORECASE)
+# Longest paragraph still taken as an annex title when it has no heading style
+ANNEX_TITLE_CHARS = 120
+
+
+def _local(tag: str) -> str:
+    """Tag without namespace (transitional and strict OOXML use different ones)"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _rel_id(elem: ET.Element) -> Optional[str]:
+    """The r:id attribute of an element, whatever its namespace"""
+    return next((value for key, value in elem.attrib.items() if key.startswith("{") and _local(key) == "id"), None)
+
+
+def _iter_children(stream, depth: int) -> Iterator[ET.Element]:
+    """
+    Elements `depth` levels below the root, each yielded once complete and
+    then detached, so the parsed tree never holds more than one of them
+    """
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if len(stack) == depth:
+            yield elem
+            stack[-1].remove(elem)
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, str]:
+    """Relationship id -> target part name of a part"""
+    directory, name = posixpath.split(part)
+    rels_path = posixpath.join(directory, "_rels", f"{name}.rels")
+    if rels_path not in archive.namelist():
+        return {}
+    targets = {}
+    for rel in ET.fromstring(archive.read(rels_path)):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External":
+            continue
+        if target.startswith("/"):
+            targets[rel.get("Id")] = target.lstrip("/")
+        else:
+            targets[rel.get("Id")] = posixpath.normpath(posixpath.join(directory, target))
+    return targets
+
+
+def _pieces(lines: Iterator[Tuple[str, str]], header: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, str]]:
+    """Group (section, line) into (section, text) pieces of about PIECE_CHARS characters"""
+    current, buffer, size = None, [], 0
+    for section, line in lines:
+        if section != current or size >= PIECE_CHARS:
+            if buffer:
+                yield current, "\n".join(buffer) + "\n"
+            current, buffer, size = section, [], 0
+            if header and header.get(section):
+                buffer.append(header[section])
+                size = len(header[section])
+        buffer.append(line)
+        size += len(line) + 1
+    if buffer:
+        yield current, "\n".join(buffer) + "\n"
+
+
+# --- .docx -----------------------------------------------------------------
+
+def _paragraph_text(p: ET.Element) -> str:
+    parts = []
+    for elem in p.iter():
+        tag = _local(elem.tag)
+        if tag == "t":
+            parts.append(elem.text or "")
+        elif tag == "tab":
+            parts.append("\t")
+        elif tag in ("br", "cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _paragraph_style(p: ET.Element) -> str:
+    for elem in p.iter():
+        if _local(elem.tag) == "pStyle":
+            for key, value in elem.attrib.items():
+                if _local(key) == "val":
+                    return value
+    return ""
+
+
+def _block_lines(block: ET.Element) -> Iterator[Tuple[str, bool]]:
+    """(text, is_heading) of a body element: a paragraph, a table or a content control"""
+    tag = _local(block.tag)
+    if tag == "p":
+        style = _paragraph_style(block).lower()
+        yield _paragraph_text(block), style.startswith(("heading", "title", "titulo", "ttulo"))
+    elif tag == "tbl":
+        for row in block.iter():
+            if _local(row.tag) != "tr":
+                continue
+            cells = [
+                " ".join(_paragraph_text(p) for p in cell.iter() if _local(p.tag) == "p").strip()
+                for cell in row if _local(cell.tag) == "tc"
+            ]
+            yield " | ".join(cells), False
+    else:
+        for p in block.iter():
+            if _local(p.tag) == "p":
+                yield _paragraph_text(p), False
+
+
+def iter_docx_sections(filepath: str) -> Iterator[Tuple[str, str]]:
+    def lines():
+        section, annexes = "summary", 0
+        with zipfile.ZipFile(filepath) as archive:
+            with archive.open("word/document.xml") as stream:
+                for block in _iter_children(stream, depth=2):
+                    for text, heading in _block_lines(block):
+                        if not text.strip():
+                            continue
+                        if ANNEX_RE.match(text) and (heading or len(text) <= ANNEX_TITLE_CHARS):
+                            annexes += 1
+                            section = f"annex_{annexes}"
+                        yield section, text
+
+    return _pieces(lines())
+
+
+# --- .xlsx -----------------------------------------------------------------
+
+class _SharedStrings:
+    """
+    The workbook's shared string table in one UTF-8 buffer plus end offsets
+    (a few bytes per string instead of a Python object each)
+    """
+
+    def __init__(self, archive: zipfile.ZipFile):
+        self._data = bytearray()
+        self._ends = array("q")
+        if "xl/sharedStrings.xml" not in archive.namelist():
+            return
+        with archive.open("xl/sharedStrings.xml") as stream:
+            for si in _iter_children(stream, depth=1):
+                parts = []
+                for child in si:
+                    tag = _local(child.tag)
+                    if tag == "t":
+                        parts.append(child.text or "")
+                    elif tag == "r":  # rich text run; phonetic runs (rPh) are skipped
+                        parts.extend(t.text or "" for t in child if _local(t.tag) == "t")
+                self._data += "".join(parts).encode("utf-8")
+                self._ends.append(len(self._data))
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            raise IndexError(index)
+        start = self._ends[index - 1] if index else 0
+        return self._data[start:self._ends[index]].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+
+_COLUMN_RE = re.compile(r"[A-Z]+")
+
+
+def _column_index(ref: str) -> int:
+    match = _COLUMN_RE.match(ref or "")
+    if not match:
+        return -1
+    index = 0
+    for letter in match.group(0):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _cell_value(cell: ET.Element, strings: _SharedStrings) -> str:
+    kind = cell.get("t")
+    value = None
+    for child in cell:
+        tag = _local(child.tag)
+        if tag == "v":
+            value = child.text
+        elif tag == "is":
+            value = "".join(t.text or "" for t in child.iter() if _local(t.tag) == "t")
+    if value is None:
+        return ""
+    if kind == "s":
+        try:
+            return strings[int(value)]
+        except (ValueError, IndexError):
+            return ""
+    if kind == "b":
+        return "TRUE" if value == "1" else "FALSE"
+    return value
+
+
+def _row_text(row: ET.Element, strings: _SharedStrings) -> str:
+    values: List[str] = []
+    for cell in row:
+        if _local(cell.tag) != "c":
+            continue
+        column = _column_index(cell.get("r"))
+        if column < 0:
+            column = len(values)
+        if column > len(values):
+            values.extend([""] * (column - len(values)))
+        values.append(_cell_value(cell, strings).strip())
+    while values and not values[-1]:
+        values.pop()
+    return " | ".join(values)
+
+
+def _workbook_sheets(archive: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(sheet name, part name) in workbook order"""
+    targets = _relationships(archive, "xl/workbook.xml")
+    sheets = []
+    for elem in ET.fromstring(archive.read("xl/workbook.xml")).iter():
+        if _local(elem.tag) == "sheet":
+            part = targets.get(_rel_id(elem))
+            if part:
+                sheets.append((elem.get("name", ""), part))
+    return sheets
+
+
+def iter_xlsx_sections(filepath: str) -> Iterator[Tuple[str, str]]:
+    with zipfile.ZipFile(filepath) as archive:
+        strings = _SharedStrings(archive)
+        for number, (name, part) in enumerate(_workbook_sheets(archive), start=1):
+            section = f"sheet_{number}"
+            header: Dict[str, str] = {}
+
+            def rows():
+                with archive.open(part) as stream:
+                    for row in _iter_children(stream, depth=2):
+                        if _local(row.tag) != "row":
+                            continue
+                        text = _row_text(row, strings)
+                        if not text:
+                            continue
+                        if not header:
+                            # Sheet name and first row head every piece of the sheet
+                            header[section] = f"{name}\n{text}"
+                            continue
+                        yield section, text
+
+            yielded = False
+            for piece in _pieces(rows(), header):
+                yielded = True
+                yield piece
+            if not yielded and header:
+                yield section, header[section] + "\n"
+
+
+# --- .pptx -----------------------------------------------------------------
+
+def _slide_parts(archive: zipfile.ZipFile) -> List[str]:
+    targets = _relationships(archive, "ppt/presentation.xml")
+    parts = []
+    for elem in ET.fromstring(archive.read("ppt/presentation.xml")).iter():
+        if _local(elem.tag) == "sldId":
+            part = targets.get(_rel_id(elem))
+            if part:
+                parts.append(part)
+    return parts
+
+
+def iter_pptx_sections(filepath: str) -> Iterator[Tuple[str, str]]:
+    with zipfile.ZipFile(filepath) as archive:
+        for number, part in enumerate(_slide_parts(archive), start=1):
+            # A slide is small: parsed whole, one at a time
+            root = ET.fromstring(archive.read(part))
+            lines = [
+                "".join(t.text or "" for t in p.iter() if _local(t.tag) == "t")
+                for p in root.iter() if _local(p.tag) == "p"
+            ]
+            text = "\n".join(line for line in lines if line.strip())
+            if text:
+                yield f"slide_{number}", text + "\n"
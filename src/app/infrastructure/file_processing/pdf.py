@@ -1,28 +1,126 @@
 import fitz  # PyMuPDF
-from PyPDF2 import PdfReader
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional, Tuple
+from config.settings import settings
+import logging
+logger = logging.getLogger("genai")
+
+# Pages go to the summary while it is shorter than this (besides RESUMEN pages)
+SUMMARY_MIN_CHARS = 1000
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _extract_workers() -> int:
+    return settings.pdf_extract_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by every extraction; spawned (not forked) because the server is threaded"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_extract_workers(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _extract_range(filepath: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop); runs in a pool worker"""
+    with fitz.open(filepath) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def extract_pages(filepath: str, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of every page in order. Documents of at least
+    settings.pdf_parallel_min_pages pages are split into ranges of
+    settings.pdf_pages_per_task pages extracted across a process pool; ranges
+    are yielded as soon as they and every range before them are done, with at
+    most two ranges per worker queued, so memory does not grow with the document.
+    """
+    with fitz.open(filepath) as doc:
+        page_count = doc.page_count
+        workers = workers or _extract_workers()
+        if workers <= 1 or page_count < settings.pdf_parallel_min_pages:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    step = max(1, settings.pdf_pages_per_task)
+    ranges = deque((start, min(start + step, page_count)) for start in range(0, page_count, step))
+    pool = _get_pool()
+    pending = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < workers * 2:
+                start, stop = ranges.popleft()
+                pending.append(pool.submit(_extract_range, filepath, start, stop))
+            yield from pending.popleft().result()
+    except BrokenProcessPool:
+        # A worker died (e.g. a malformed page crashed MuPDF); the next call gets a fresh pool
+        _reset_pool()
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def classify_pages(pages: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    (section, page_text) for each kept page: ANEXO pages become annex_1,
+    annex_2, ...; RESUMEN pages and the first ~1000 characters go to "summary";
+    other pages are skipped.
+    """
+    summary_chars = 0
+    annexes = 0
+    for text in pages:
+        if not text or not text.strip():
+            continue
+        upper = text.upper()
+        if "ANEXO" in upper:
+            annexes += 1
+            yield f"annex_{annexes}", text
+        elif "RESUMEN" in upper or summary_chars < SUMMARY_MIN_CHARS:
+            summary_chars += len(text)
+            yield "summary", text
+
+
+def iter_pdf_sections(filepath: str) -> Iterator[Tuple[str, str]]:
+    """Lazily yield (section, page_text) in page order; only a few page ranges are held in memory"""
+    return classify_pages(extract_pages(filepath))
+
 
 def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    with fitz.open(file_path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
+    return "".join(extract_pages(file_path))
+
 
 def parse_pdf_with_annexes(filepath: str) -> dict:
-    reader = PdfReader(filepath)
     summary = ""
     annexes = []
 
-    for page in reader.pages:
-        text = page.extract_text()
-        if not text:
-            continue
-        if "ANEXO" in text.upper():
-            annexes.append(text)
-        elif "RESUMEN" in text.upper() or len(summary) < 1000:
+    for section, text in iter_pdf_sections(filepath):
+        if section == "summary":
             summary += text
+        else:
+            annexes.append(text)
 
     return {
         "summary": summary.strip(),
         "annexes": annexes
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,28 @@
+import os
+from typing import Callable, Dict, Iterator, Tuple
+from src.app.infrastructure.file_processing.office import (
+    iter_docx_sections,
+    iter_pptx_sections,
+    iter_xlsx_sections,
+)
+from src.app.infrastructure.file_processing.pdf import iter_pdf_sections
+
+# File extension -> lazy (section, text) reader; every ingestion path goes through here
+EXTRACTORS: Dict[str, Callable[[str], Iterator[Tuple[str, str]]]] = {
+    ".pdf": iter_pdf_sections,
+    ".docx": iter_docx_sections,
+    ".xlsx": iter_xlsx_sections,
+    ".pptx": iter_pptx_sections,
+}
+
+
+def is_supported(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in EXTRACTORS
+
+
+def iter_sections(path: str, filename: str = None) -> Iterator[Tuple[str, str]]:
+    """(section, text) pieces of a file, picked by the extension of filename (default: path)"""
+    extension = os.path.splitext(filename or path)[1].lower()
+    if extension not in EXTRACTORS:
+        raise ValueError(f"Unsupported file type '{extension}' (supported: {sorted(EXTRACTORS)})")
+    return EXTRACTORS[extension](path)
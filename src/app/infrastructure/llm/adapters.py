@@ -45,53 +45,127 @@
 #        return result
 
 import hashlib
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
+from typing import Optional
 from config.settings import settings
 from src.app.infrastructure.cache.redis import RedisCache
+from src.app.infrastructure.cache.codec import decode_embedding, encode_embedding
+from src.app.infrastructure.cache.memory import LRUCache
+from src.app.utils.singleflight import SingleFlight
+from src.app.infrastructure.llm.embeddings import create_backend
 
 class EmbeddingAdapter:
-    def __init__(self, model: str = "text-embedding-3-small"):
-        self.model = model
+    def __init__(self, model: Optional[str] = None, backend=None):
+        # The backend (settings.embedding_backend) does the embedding; its model
+        # name namespaces the caches and is recorded in the vector store manifest
+        self.embedder = backend or create_backend(model=model)
+        self.model = self.embedder.model
         self.cache = RedisCache()
-
-        self.embedder = OpenAIEmbeddings(
-            model=self.model,
-            api_key=settings.openai_api_key        # tomado del .env / variable de entorno
+        # In-process tier in front of Redis for hot texts (queries, repeated chunks)
+        self.memory = LRUCache(settings.embedding_memory_cache_bytes)
+        # Concurrent misses on the same text wait for one upstream call
+        self.flight = SingleFlight(
+            f"embedding:{self.model}",
+            cache=self.cache if settings.singleflight_across_processes else None,
+            lock_seconds=settings.singleflight_lock_seconds,
         )
 
-        self.embedding_dim = self.embedder.embed_query("test").__len__()
+
+    @property
+    def embedding_dim(self) -> int:
+        return self.embedder.dimension
 
     def _hash(self, text: str) -> str:
         return f"embedding:{self.model}:{hashlib.sha256(text.encode()).hexdigest()}"
 
-    def get_embedding(self, text: str) -> list[float]:
+    def get_embedding(self, text: str) -> np.ndarray:
         cache_key = self._hash(text)
-        cached = self.cache.get(cache_key)
-        if cached:
+        cached = self.memory.get(cache_key)
+        if cached is not None:
+            return cached
+
+        cached = decode_embedding(self.cache.get(cache_key, raw=True), self.model)
+        if cached is not None:
+            self.memory.set(cache_key, cached)
             return cached
 
-        embedding = self.embedder.embed_query(text)
-        self.cache.set(cache_key, embedding)
+        embedding = self.flight.do(cache_key, lambda: self._embed_query(text, cache_key))
+        self.memory.set(cache_key, embedding)
+        return embedding
+
+    def _embed_query(self, text: str, cache_key: str) -> np.ndarray:
+        embedding = np.asarray(self.embedder.embed_query(text), dtype=np.float32)
+        embedding.setflags(write=False)  # shared through the memory cache
+        self.cache.set(cache_key, self._encode(embedding), ex=self._ttl(), raw=True)
         return embedding
 
-    def embed(self, texts: list[str]) -> list[list[float]]:
-        result: list[list[float]] = []
-        to_embed: list[str] = []
-        pending_keys: list[str] = []
-
-        for t in texts:
-            k = self._hash(t)
-            cached = self.cache.get(k)
-            if cached:
-                result.append(cached)
-            else:
-                pending_keys.append(k)
-                to_embed.append(t)
-
-        if to_embed:
-            embeddings = self.embedder.embed_documents(to_embed)
-            for k, emb in zip(pending_keys, embeddings):
-                self.cache.set(k, emb)
-                result.append(emb)
+    @staticmethod
+    def _ttl() -> Optional[int]:
+        return settings.embedding_cache_ttl_seconds or None
+
+    def _encode(self, embedding: np.ndarray) -> bytes:
+        # Raw float32/float16 bytes: ~4x smaller than a pickled list, decoded without copying
+        return encode_embedding(embedding, self.model, settings.embedding_cache_dtype)
+
+    def embed(self, texts: list[str]) -> list[np.ndarray]:
+        """
+        Embed a batch of texts; results follow the input order. Cache lookups
+        and write-backs take one Redis round trip each, and repeated texts are
+        embedded once, also across concurrent batches in this process.
+        """
+        keys = [self._hash(t) for t in texts]
+        result = [self.memory.get(k) for k in keys]
+        # Only what the memory tier lacks goes to Redis
+        remote = [k for k, cached in zip(keys, result) if cached is None]
+        fetched = dict(zip(remote, self.cache.get_many(remote, raw=True)))
+        for n, k in enumerate(keys):
+            if result[n] is None:
+                result[n] = decode_embedding(fetched[k], self.model)
+                if result[n] is not None:
+                    self.memory.set(k, result[n])
+
+        # key -> text for every miss, in first-seen order
+        missing: dict[str, str] = {}
+        for k, t, cached in zip(keys, texts, result):
+            if cached is None and k not in missing:
+                missing[k] = t
+
+        if missing:
+            # Texts another batch is already embedding are waited for, not re-sent
+            owned, waiting = {}, {}
+            for k, t in missing.items():
+                call, leader = self.flight.begin(k)
+                (owned if leader else waiting)[k] = (t, call)
+
+            embeddings: dict[str, np.ndarray] = {}
+            if owned:
+                error = None
+                try:
+                    vectors = self.embedder.embed_documents([t for t, _ in owned.values()])
+                    if len(vectors) != len(owned):
+                        # Which text a vector belongs to is unknown: none of them is kept
+                        raise ValueError(
+                            f"Embedding backend {self.model} returned {len(vectors)} vectors for {len(owned)} texts"
+                        )
+                    for k, v in zip(owned, vectors):
+                        embeddings[k] = np.asarray(v, dtype=np.float32)
+                        embeddings[k].setflags(write=False)
+                    self.cache.set_many(
+                        {k: self._encode(v) for k, v in embeddings.items()}, ex=self._ttl(), raw=True
+                    )
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    for k, (_, call) in owned.items():
+                        if error is None:
+                            self.flight.finish(k, call, embeddings[k])
+                        else:
+                            self.flight.finish(k, call, error=error)
+                for k, v in embeddings.items():
+                    self.memory.set(k, v)
+            for k, (_, call) in waiting.items():
+                embeddings[k] = call.wait()
+            result = [embeddings[k] if cached is None else cached for k, cached in zip(keys, result)]
 
         return result
\ No newline at end of file
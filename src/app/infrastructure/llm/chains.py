@@ -1,9 +1,8 @@
 import numpy as np
 from textwrap import wrap
-import tiktoken
-from typing import Dict, List, Tuple
-from src.app.infrastructure.llm.adapters import EmbeddingAdapter
-from src.app.infrastructure.vector_store.faiss import FaissStore
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from config.settings import settings
+from src.app.infrastructure.vector_store import registry
 from src.app.infrastructure.llm.providers import OpenAIProvider
 import hashlib
 from src.app.infrastructure.cache.redis import redis_client
@@ -12,6 +11,8 @@ import pickle  # Add this at the top of your chains.py file
 
 ## agregar 24-06-2025: libreria de memoria, save_message
 from src.app.utils.memory import save_message
+from src.app.utils.chunker import get_chunker
+from src.app.utils.stages import threaded
 
 
 import logging
@@ -19,31 +20,37 @@ logger = logging.getLogger("genai")
 
 class RAGChain:
     def __init__(self, persistence_dir: str = "vector_store"):
-        self.embedder = EmbeddingAdapter()
         self.llm = OpenAIProvider()
         self.persistence_dir = persistence_dir
         
-        # Initialize vector store with automatic recovery
+        # Shared per process: every chain / agent on this directory uses the same store
         try:
-            self.vector_store = FaissStore(
-                embedder=self.embedder,
-                persistence_dir=persistence_dir
+            self.vector_store = registry.get_vector_store(
+                persistence_dir=persistence_dir,
+                embedder=registry.get_embedder()
             )
             self._verify_store()
+            # Cached answers go stale on any write, whoever makes it
+            self.vector_store.subscribe(self._invalidate_cache)
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {str(e)}")
             raise
 
+    @property
+    def embedder(self):
+        # The store's embedder, so queries follow it through a re-index
+        return self.vector_store.embedder
+
     def _verify_store(self):
         """Verify the store is in a valid state"""
         if not hasattr(self.vector_store, 'index') or self.vector_store.index is None:
             raise ValueError("FAISS index not initialized")
         
-        test_embed = self.embedder.get_embedding("test")
-        if len(test_embed) != self.vector_store.dimension:
+        # Known models report their dimension without an API call
+        if self.embedder.embedding_dim != self.vector_store.dimension:
             raise ValueError(
                 f"Embedding dimension mismatch: "
-                f"expected {self.vector_store.dimension}, got {len(test_embed)}"
+                f"expected {self.vector_store.dimension}, got {self.embedder.embedding_dim}"
             )
 
     def ingest_document(self, text: str, doc_id: str, section: str = "summary"):
@@ -63,26 +70,171 @@ class RAGChain:
                 metadata={"section": section, "doc_id": doc_id}
             )
             logger.info(f"Successfully ingested document {doc_id}")
-            
-            from uuid import uuid4
-            redis_client.set("vector_version", str(uuid4()))
-            logger.info("Cache invalidated after ingestion")
         except Exception as e:
             logger.error(f"Failed to ingest document: {str(e)}")
             raise
-    
-    def split_text(self, text: str, max_tokens: int = 200) -> List[str]:
-        encoding = tiktoken.encoding_for_model("text-embedding-3-small")
-        tokens = encoding.encode(text)
 
-        chunks = []
-        for i in range(0, len(tokens), max_tokens):
-            chunk = tokens[i:i+max_tokens]
-            chunks.append(encoding.decode(chunk))
+    def replace_document(self, doc_id: str, sections: Dict[str, str]) -> Dict[str, int]:
+        """
+        Re-ingest a whole document ({section: text}); only chunks whose content
+        changed are embedded, and chunks no longer present are deleted.
+        """
+        if not doc_id.strip():
+            raise ValueError("Document ID cannot be empty")
+
+        texts, metadatas = [], []
+        sections = {section: text for section, text in sections.items() if text and text.strip()}
+        # One tokenizer call for every section
+        for section, chunks in zip(sections, self.split_texts(list(sections.values()))):
+            texts.extend(chunks)
+            metadatas.extend({"section": section, "doc_id": doc_id} for _ in chunks)
+
+        try:
+            result = self.vector_store.replace_document(doc_id, texts, metadatas)
+        except Exception as e:
+            logger.error(f"Failed to replace document {doc_id}: {str(e)}")
+            raise
+        return result
+
+    def replace_document_stream(
+        self,
+        doc_id: str,
+        sections: Iterable[Tuple[str, str]],
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> Dict:
+        """
+        replace_document() for a stream of (section, text) pieces, e.g. PDF
+        pages read lazily. Consecutive pieces of a section are chunked as one
+        text; chunks are embedded and indexed in batches of batch_size while
+        later pieces are still being read. Also returns the chunk count per section.
+        """
+        if not doc_id.strip():
+            raise ValueError("Document ID cannot be empty")
+        batch_size = batch_size or settings.ingest_batch_chunks
+        counts: Dict[str, int] = {}
+
+        def batches():
+            texts, metadatas = [], []
+            for section, chunks in self._chunk_sections(sections):
+                counts[section] = counts.get(section, 0) + len(chunks)
+                texts.extend(chunks)
+                metadatas.extend({"section": section, "doc_id": doc_id} for _ in chunks)
+                while len(texts) >= batch_size:
+                    yield texts[:batch_size], metadatas[:batch_size]
+                    texts, metadatas = texts[batch_size:], metadatas[batch_size:]
+            if texts:
+                yield texts, metadatas
 
-        logger.info(f"Token-split into {len(chunks)} chunks.")
+        try:
+            result = self.vector_store.replace_document_stream(
+                doc_id,
+                threaded(batches(), settings.ingest_queue_size, name=f"chunk-{doc_id}"),
+                progress=progress,
+            )
+        except Exception as e:
+            logger.error(f"Failed to replace document {doc_id}: {str(e)}")
+            raise
+        return {**result, "sections": counts}
+
+    def _chunk_sections(self, sections: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, List[str]]]:
+        """Chunks of each piece; a section's last partial chunk waits for its next piece"""
+        current, pending = None, ""
+        for section, text in sections:
+            if section != current:
+                if pending.strip():
+                    yield current, [pending]
+                current, pending = section, ""
+            chunks = self.split_text(f"{pending}\n{text}" if pending else text)
+            pending = chunks.pop() if chunks else ""
+            if chunks:
+                yield section, chunks
+        if pending.strip():
+            yield current, [pending]
+
+    def delete_document(self, doc_id: str) -> int:
+        """Remove every chunk of a document from the store"""
+        return self.vector_store.delete_document(doc_id)
+
+    def _invalidate_cache(self):
+        from uuid import uuid4
+        redis_client.set("vector_version", str(uuid4()))
+        logger.info("Cache invalidated after vector store change")
+    
+    def split_text(self, text: str, max_tokens: Optional[int] = None) -> List[str]:
+        chunks = get_chunker(max_tokens).split(text)
+        logger.debug(f"Token-split into {len(chunks)} chunks.")
+        return chunks
+
+    def split_texts(self, texts: List[str], max_tokens: Optional[int] = None) -> List[List[str]]:
+        """split_text() for many texts, tokenized in one batch"""
+        chunks = get_chunker(max_tokens).split_many(texts)
+        logger.info(f"Token-split {len(texts)} texts into {sum(len(c) for c in chunks)} chunks.")
         return chunks
     
+    def _context_key(self, query: str, section: str) -> str:
+        vector_version = redis_client.get("vector_version") or "v1"
+        cache_key = hashlib.sha256(f"{query}:{section}:{vector_version}".encode()).hexdigest()
+        return f"context:{cache_key}"
+
+    def _answer_from_cache(self, query: str, redis_key: str) -> Optional[dict]:
+        cached = redis_client.get(redis_key)
+        if not cached:
+            return None
+        try:
+            context_chunks, best_doc_id = pickle.loads(cached)
+            logger.info(f"Using cached results for: {query[:50]}...")
+            response = self._generate_response(context_chunks, best_doc_id, query)
+            return {
+                "answer": response["answer"],
+                "doc_id": response["doc_id"],
+                "source": "cache"
+            }
+        except Exception as e:
+            logger.warning(f"Cache read failed: {str(e)}")
+            return None
+
+    def _answer_from_chunks(self, query: str, section: str, chunks: List[Dict], redis_key: str) -> dict:
+        processed_chunks = self._process_chunks(chunks, section)
+
+        if processed_chunks:
+            # Found in vector DB
+            best_doc_id, context_chunks = self._rank_documents(processed_chunks)
+            
+            try:
+                redis_client.set(
+                    redis_key,
+                    pickle.dumps((context_chunks, best_doc_id)),
+                    ex=3600
+                )
+            except Exception as e:
+                logger.error(f"Caching failed: {str(e)}")
+
+            response = self._generate_response(context_chunks, best_doc_id, query)
+            return {
+                "answer": response["answer"],
+                "doc_id": response["doc_id"],
+                "source": "vector_db"
+            }
+        else:
+            # Not found in vector DB - use LLM directly
+            llm_response = self.llm.chat_completion(query)
+            return {
+                "answer": llm_response,
+                "doc_id": "llm_fallback",
+                "source": "llm"
+            }
+
+    def _answer_on_error(self, query: str, e: Exception) -> dict:
+        logger.error(f"RAG error: {str(e)}", exc_info=True)
+        # Fallback to LLM even in error cases
+        llm_response = self.llm.chat_completion(query)
+        return {
+            "answer": llm_response,
+            "doc_id": "llm_error_fallback",
+            "source": "llm_error"
+        }
+
     def run(self, query: str, section: str = "all", use_cache: bool = True) -> dict:
         try:
             # Generate query embedding
@@ -90,67 +242,62 @@ class RAGChain:
             query_embedding_np = np.array([query_embedding], dtype=np.float32)
 
             # Cache versioning
-            vector_version = redis_client.get("vector_version") or "v1"
-            cache_key = hashlib.sha256(f"{query}:{section}:{vector_version}".encode()).hexdigest()
-            redis_key = f"context:{cache_key}"
+            redis_key = self._context_key(query, section)
 
             # Try cache first
             if use_cache:
-                cached = redis_client.get(redis_key)
+                cached = self._answer_from_cache(query, redis_key)
                 if cached:
-                    try:
-                        context_chunks, best_doc_id = pickle.loads(cached)
-                        logger.info(f"Using cached results for: {query[:50]}...")
-                        response = self._generate_response(context_chunks, best_doc_id, query)
-                        return {
-                            "answer": response["answer"],
-                            "doc_id": response["doc_id"],
-                            "source": "cache"
-                        }
-                    except Exception as e:
-                        logger.warning(f"Cache read failed: {str(e)}")
-
-            # Vector store search
-            chunks = self.vector_store.search(query_embedding_np, top_k=50)
-            processed_chunks = self._process_chunks(chunks, section)
-
-            if processed_chunks:
-                # Found in vector DB
-                best_doc_id, context_chunks = self._rank_documents(processed_chunks)
-                
+                    return cached
+
+            # Vector store search (section filter applied inside FAISS)
+            chunks = self.vector_store.search(
+                query_embedding_np, top_k=50, filters=self._section_filters(section)
+            )
+            return self._answer_from_chunks(query, section, chunks, redis_key)
+
+        except Exception as e:
+            return self._answer_on_error(query, e)
+
+    def run_many(self, queries: List[str], section: str = "all", use_cache: bool = True) -> List[dict]:
+        """
+        Batch version of run(): queries are embedded in one call and every cache
+        miss is searched in a single FaissStore.search_many call.
+        Answers come back in the order of the queries.
+        """
+        if not queries:
+            return []
+        try:
+            embeddings = np.array(self.embedder.embed(queries), dtype=np.float32)
+            redis_keys = [self._context_key(q, section) for q in queries]
+        except Exception as e:
+            return [self._answer_on_error(q, e) for q in queries]
+
+        answers: List[Optional[dict]] = [None] * len(queries)
+        misses = []
+        for i, (query, redis_key) in enumerate(zip(queries, redis_keys)):
+            if use_cache:
+                answers[i] = self._answer_from_cache(query, redis_key)
+            if answers[i] is None:
+                misses.append(i)
+
+        if misses:
+            try:
+                results = self.vector_store.search_many(
+                    embeddings[misses], top_k=50, filters=self._section_filters(section)
+                )
+            except Exception as e:
+                results = [e] * len(misses)
+
+            for i, chunks in zip(misses, results):
                 try:
-                    redis_client.set(
-                        redis_key,
-                        pickle.dumps((context_chunks, best_doc_id)),
-                        ex=3600
-                    )
+                    if isinstance(chunks, Exception):
+                        raise chunks
+                    answers[i] = self._answer_from_chunks(queries[i], section, chunks, redis_keys[i])
                 except Exception as e:
-                    logger.error(f"Caching failed: {str(e)}")
-
-                response = self._generate_response(context_chunks, best_doc_id, query)
-                return {
-                    "answer": response["answer"],
-                    "doc_id": response["doc_id"],
-                    "source": "vector_db"
-                }
-            else:
-                # Not found in vector DB - use LLM directly
-                llm_response = self.llm.chat_completion(query)
-                return {
-                    "answer": llm_response,
-                    "doc_id": "llm_fallback",
-                    "source": "llm"
-                }
+                    answers[i] = self._answer_on_error(queries[i], e)
 
-        except Exception as e:
-            logger.error(f"RAG error: {str(e)}", exc_info=True)
-            # Fallback to LLM even in error cases
-            llm_response = self.llm.chat_completion(query)
-            return {
-                "answer": llm_response,
-                "doc_id": "llm_error_fallback",
-                "source": "llm_error"
-            }
+        return answers
 
     # def run(self, query: str, section: str = "all", use_cache: bool = True) -> dict:
     #     try:
@@ -219,6 +366,22 @@ class RAGChain:
     #             "doc_id": "error"
     #         }
 # 
+    @staticmethod
+    def _section_filters(section: str) -> Optional[Dict[str, str]]:
+        """Map a routed section ("all", "summary", "annex", "annex_2") to vector store filters"""
+        if not section or section == "all":
+            return None
+        # Annexes are stored per annex (annex_1, annex_2, ...); "annex" means any of them
+        if section == "annex":
+            return {"section_prefix": "annex_"}
+        return {"section": section}
+
+    @staticmethod
+    def _section_matches(chunk_section: str, section: str) -> bool:
+        if section == "annex":
+            return str(chunk_section).startswith("annex_")
+        return chunk_section == section
+
     def _process_chunks(self, chunks: List[Dict], section: str) -> List[Dict]:
         processed = []
 
@@ -249,9 +412,10 @@ class RAGChain:
                     }
                 })
 
-        if section != "all":
+        if section and section != "all":
             processed = [
-                c for c in processed if c["metadata"].get("section") == section
+                c for c in processed
+                if self._section_matches(c["metadata"].get("section"), section)
             ]
 
         return processed
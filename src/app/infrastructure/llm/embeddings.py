@@ -0,0 +1,234 @@
+"""
+Embedding backends behind EmbeddingAdapter.
+
+A backend exposes `model` (also the cache / store namespace), `dimension`,
+`embed_query(text)` and `embed_documents(texts)`. "openai" calls the API;
+"hashing" is a deterministic local CPU embedder for offline benchmarks, load
+tests and CI. Other local models are added with register_backend().
+
+settings.embedding_target_dimension shortens every backend's vectors: OpenAI
+text-embedding-3 models return them shortened (`dimensions` request field),
+others are truncated and renormalized locally. Both give the same vectors, and
+the model name becomes "<model>@<dimension>" so caches and stores stay apart.
+"""
+import hashlib
+import re
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from config.settings import settings
+from src.app.infrastructure.llm.ratelimit import (
+    AdaptiveRateLimiter,
+    is_rate_limited,
+    is_transient,
+    pack_requests,
+    retry_after_seconds,
+)
+from src.app.utils.tokenizer import count_tokens
+import logging
+logger = logging.getLogger("genai")
+
+# Output size of the OpenAI embedding models, so startup needs no probe call
+KNOWN_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+# Models that accept the `dimensions` request field
+SHORTENABLE_MODELS = ("text-embedding-3-small", "text-embedding-3-large")
+
+
+def truncate_embeddings(vectors, dimension: int) -> np.ndarray:
+    """First `dimension` components of each vector, L2-renormalized (float32)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    truncated = vectors[..., :dimension]
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / np.where(norms == 0, 1.0, norms)
+
+
+class OpenAIBackend:
+    """
+    OpenAI embeddings. Inputs are packed into requests under the configured
+    input / token limits and sent through an adaptive rate limiter that backs
+    off and shrinks requests on 429s, so large ingests run at the account's
+    sustainable rate instead of failing mid-way.
+    """
+
+    def __init__(self, model: Optional[str] = None, dimension: Optional[int] = None, **_):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.base_model = model or settings.embedding_model
+        self.model = self.base_model
+        # Known models need no API call; any other model is probed once, on first use
+        self._dimension = KNOWN_DIMENSIONS.get(self.base_model)
+        options = {}
+        if dimension and self.base_model in SHORTENABLE_MODELS and dimension < (self._dimension or 0):
+            options["dimensions"] = dimension
+            self._dimension = dimension
+            self.model = f"{self.base_model}@{dimension}"
+        self.client = OpenAIEmbeddings(
+            model=self.base_model,
+            api_key=settings.openai_api_key,       # tomado del .env / variable de entorno
+            max_retries=0,                         # reintentos y esperas los maneja el limiter
+            **options,
+        )
+        self.limiter = AdaptiveRateLimiter(
+            settings.embedding_tokens_per_minute, settings.embedding_requests_per_minute
+        )
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = len(self.client.embed_query("test"))
+        return self._dimension
+
+    def embed_query(self, text: str) -> List[float]:
+        tokens = count_tokens([text], self.base_model)[0]
+        for attempt in range(settings.embedding_max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                embedding = self.client.embed_query(text)
+            except Exception as e:
+                self._back_off(e, attempt)
+                continue
+            self.limiter.on_success()
+            return embedding
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        counts = count_tokens(texts, self.base_model)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        start, attempt = 0, 0
+        while start < len(texts):
+            # Re-packed after every throttle, so later requests use the shrunken limits
+            max_inputs, max_tokens = self.limiter.limits(
+                settings.embedding_request_max_inputs, settings.embedding_request_max_tokens
+            )
+            base = start
+            for request in pack_requests(counts[base:], max_inputs, max_tokens):
+                positions = [base + i for i in request]
+                self.limiter.acquire(sum(counts[i] for i in positions))
+                try:
+                    vectors = self.client.embed_documents([texts[i] for i in positions])
+                except Exception as e:
+                    self._back_off(e, attempt)
+                    attempt += 1
+                    break
+                self.limiter.on_success()
+                attempt = 0
+                for i, vector in zip(positions, vectors):
+                    embeddings[i] = vector
+                start = positions[-1] + 1
+        return embeddings
+
+    def _back_off(self, error: Exception, attempt: int):
+        """Wait before a retry, or re-raise when the error is final"""
+        if not is_transient(error) or attempt >= settings.embedding_max_retries:
+            raise error
+        if is_rate_limited(error):
+            self.limiter.on_rate_limited(retry_after_seconds(error), attempt)
+        else:
+            logger.warning(f"Embedding request failed ({error}); retrying")
+            self.limiter.on_error(attempt)
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder: word unigrams/bigrams and character n-grams
+    are hashed (blake2b, so stable across processes) into `dimension` signed
+    buckets and L2-normalized. Texts sharing words land close together, which
+    is enough to exercise retrieval end to end without a network.
+    """
+
+    def __init__(self, model: Optional[str] = None, dimension: Optional[int] = None, char_ngrams=(3, 4), **_):
+        self.dimension = dimension or settings.local_embedding_dimension
+        self.model = model or f"hashing-{self.dimension}"
+        self.char_ngrams = char_ngrams
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(text.lower())
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.char_ngrams:
+                features += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+        return features
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        features = self._features(text)
+        if not features:
+            return vector
+        digests = np.frombuffer(
+            b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features),
+            dtype="<u8",
+        )
+        buckets = (digests % self.dimension).astype(np.int64)
+        signs = np.where(digests >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, buckets, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        return [self._vector(t) for t in texts]
+
+
+class TruncatedBackend:
+    """Shortens another backend's vectors locally (truncate + renormalize)"""
+
+    def __init__(self, backend, dimension: int):
+        self.backend = backend
+        self.dimension = dimension
+        self.model = f"{backend.model}@{dimension}"
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return truncate_embeddings(self.backend.embed_query(text), self.dimension)
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        if not texts:
+            return []
+        return list(truncate_embeddings(self.backend.embed_documents(texts), self.dimension))
+
+
+BACKENDS: Dict[str, Callable[..., object]] = {
+    "openai": OpenAIBackend,
+    "hashing": HashingEmbedder,
+}
+
+
+def register_backend(name: str, factory: Callable[..., object]):
+    """
+    Make a backend selectable through settings.embedding_backend. factory is
+    called with model= and dimension= keyword arguments (either may be None)
+    and must return an object with model, dimension, embed_query, embed_documents.
+    """
+    BACKENDS[name] = factory
+
+
+def create_backend(
+    name: Optional[str] = None,
+    model: Optional[str] = None,
+    dimension: Optional[int] = None,
+    target_dimension: Optional[int] = None,
+):
+    """
+    Build a registered backend. target_dimension (default
+    settings.embedding_target_dimension, 0 = full size) shortens its vectors.
+    """
+    name = name or settings.embedding_backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}' (registered: {sorted(BACKENDS)})")
+    target = settings.embedding_target_dimension if target_dimension is None else target_dimension
+    if name == "openai" and target and settings.embedding_reduce_mode == "request":
+        backend = BACKENDS[name](model=model, dimension=target)
+    else:
+        backend = BACKENDS[name](model=model, dimension=dimension)
+    if target and backend.dimension > target:
+        backend = TruncatedBackend(backend, target)
+    logger.info(f"Embedding backend {name} ({backend.model})")
+    return backend
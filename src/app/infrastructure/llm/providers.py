@@ -13,8 +13,12 @@
 #        )
 #        return response.choices[0].message["content"]
         
+import hashlib
+import json
 from langchain_openai import ChatOpenAI
 from config.settings import settings
+from src.app.infrastructure.cache.redis import redis_client
+from src.app.utils.singleflight import SingleFlight
 ## agregar 24-06-2025: libreria de memoria
 from src.app.utils.memory import save_message, get_history, DEFAULT_CHAT_ID
 
@@ -25,6 +29,12 @@ class OpenAIProvider:
             api_key=settings.openai_api_key,
             temperature=0.0
         )
+        # Identical concurrent prompts (same history) share one completion
+        self.flight = SingleFlight(
+            f"chat:{settings.openai_model}",
+            cache=redis_client if settings.singleflight_across_processes else None,
+            lock_seconds=settings.singleflight_lock_seconds,
+        )
 
     # modificado 24-06-2025
     #def chat_completion(self, prompt: str) -> str:
@@ -38,12 +48,13 @@ class OpenAIProvider:
         # 2. Agregar el nuevo mensaje del usuario
         messages.append({"role": "user", "content": prompt})
         
-        # 3. Llamar al LLM con el historial completo
-        response = self.llm.invoke(messages)
+        # 3. Llamar al LLM con el historial completo (una sola llamada por prompt identico en curso)
+        key = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+        content = self.flight.do(key, lambda: self.llm.invoke(messages).content)
         
         # 4. Guardar el mensaje del usuario y la respuesta
         print("providers.py --> Clases OpenAIProvider --> chat_completion --> save_message")
         save_message("user", prompt, DEFAULT_CHAT_ID)
-        save_message("assistant", response.content, DEFAULT_CHAT_ID)
+        save_message("assistant", content, DEFAULT_CHAT_ID)
         
-        return response.content
\ No newline at end of file
+        return content
\ No newline at end of file
@@ -1,8 +1,7 @@
 from langchain.agents import initialize_agent, AgentType
 from src.app.infrastructure.tools import TOOLS
 from config.settings import settings
-from src.app.infrastructure.vector_store.faiss import FaissStore
-from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+from src.app.infrastructure.vector_store import registry
 import numpy as np
 
 # Modificar 24-06-2025: Modificar librerias
@@ -16,8 +15,8 @@ from src.app.utils.memory import save_message, get_history, DEFAULT_CHAT_ID
 
 class RAGAgent:
     def __init__(self, vector_dir="vector_db"):
-        self.embedder = EmbeddingAdapter()
-        self.vector_store = FaissStore(self.embedder, persistence_dir=vector_dir)
+        # Same embedder and store as RAGChain: loaded once, and new documents are visible at once
+        self.vector_store = registry.get_vector_store(persistence_dir=vector_dir, embedder=registry.get_embedder())
         
         # Modificar 24-06-2025: Modificar llm
         #self.llm = ChatOpenAI(
@@ -43,6 +42,10 @@ class RAGAgent:
         )
         ##
 
+    @property
+    def embedder(self):
+        return self.vector_store.embedder
+
     def run(self, question: str, use_history: bool = True) -> str:
         # 1) Pregunta directo al agente.  Si él necesita la vector-db, la tool, etc.
         try:
@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from typing import List, Optional, Tuple
+import logging
+logger = logging.getLogger("genai")
+
+
+def pack_requests(token_counts: List[int], max_inputs: int, max_tokens: int) -> List[List[int]]:
+    """
+    Group consecutive inputs into requests of at most max_inputs inputs and
+    max_tokens tokens (an input larger than max_tokens goes alone).
+    Returns the input positions of each request, in order.
+    """
+    requests, current, used = [], [], 0
+    for i, tokens in enumerate(token_counts):
+        if current and (len(current) >= max_inputs or used + tokens > max_tokens):
+            requests.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        requests.append(current)
+    return requests
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient(error: Exception) -> bool:
+    """Worth retrying: rate limits, 5xx and connection / timeout errors"""
+    status = getattr(error, "status_code", None)
+    return (
+        is_rate_limited(error)
+        or (status is not None and status >= 500)
+        or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+    )
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server backoff hint of an API error (retry-after-ms / retry-after headers)"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token / request buckets refilled at the configured per-minute limits
+    (0 = unlimited), shared by every thread calling one API.
+
+    A rate-limit response pauses all callers for the server's retry-after (or
+    an exponential backoff) and halves `scale`, which shrinks both the request
+    size (limits()) and the refill rate; each success grows it back slowly.
+    """
+
+    def __init__(self, tokens_per_minute: int = 0, requests_per_minute: int = 0, min_scale: float = 1 / 16):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._tokens = float(tokens_per_minute)
+        self._requests = float(requests_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def limits(self, max_inputs: int, max_tokens: int) -> Tuple[int, int]:
+        """Per-request input / token limits at the current scale"""
+        scale = self.scale
+        return max(1, int(max_inputs * scale)), max(1, int(max_tokens * scale))
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.tokens_per_minute:
+            rate = self.tokens_per_minute * self.scale / 60.0
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * rate)
+        if self.requests_per_minute:
+            rate = self.requests_per_minute * self.scale / 60.0
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * rate)
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        wait = self._paused_until - now
+        if self.tokens_per_minute and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) / (self.tokens_per_minute * self.scale / 60.0))
+        if self.requests_per_minute and self._requests < 1:
+            wait = max(wait, (1 - self._requests) / (self.requests_per_minute * self.scale / 60.0))
+        return wait
+
+    def acquire(self, tokens: int):
+        """Block until a request of `tokens` tokens may be sent"""
+        if self.tokens_per_minute:
+            # A request larger than the whole bucket waits for a full bucket
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._tokens -= tokens
+                    self._requests -= 1
+                    return
+            time.sleep(min(wait, 1.0))
+
+    def on_success(self):
+        with self._lock:
+            self.scale = min(1.0, self.scale + 0.05)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None, attempt: int = 0):
+        with self._lock:
+            self.throttled += 1
+            self.scale = max(self.min_scale, self.scale / 2)
+            delay = retry_after if retry_after else min(60.0, 2.0 ** attempt) * (0.5 + random.random() / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            # The server says we are over its limit: no burst once the pause ends
+            self._tokens = min(self._tokens, 0.0)
+            self._requests = min(self._requests, 0.0)
+        logger.warning(f"Rate limited: pausing {delay:.1f}s, request scale {self.scale:.3f}")
+
+    def on_error(self, attempt: int = 0):
+        """Back off after a transient non-rate-limit failure, without shrinking requests"""
+        delay = min(30.0, 2.0 ** attempt) * (0.5 + random.random() / 2)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
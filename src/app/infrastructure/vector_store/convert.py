@@ -0,0 +1,143 @@
+"""
+Convert a FAISS index to another index type / storage mode and report the
+memory saved and the recall lost against exact float32 search.
+Converting a store rewrites its index checkpoint: stop ingestion first and
+restart the API afterwards so it loads the new index.
+
+    python -m src.app.infrastructure.vector_store.convert --store vector_db --storage sq8
+    python -m src.app.infrastructure.vector_store.convert --index faiss_index.bin --out faiss_index_pq.bin --storage pq
+"""
+import argparse
+import json
+import faiss
+import numpy as np
+from typing import Dict, List, Optional
+from config.settings import settings
+from src.app.infrastructure.vector_store import index_factory
+from src.app.infrastructure.vector_store.scan import knn_over_chunks
+from src.app.infrastructure.vector_store.segments import SegmentStore
+import logging
+logger = logging.getLogger("genai")
+
+
+def exact_knn(queries: np.ndarray, chunks: List[np.ndarray], k: int) -> np.ndarray:
+    """Exact top-k row ids over row-ordered chunks, without stacking them in memory"""
+    return knn_over_chunks(queries, chunks, k)[1]
+
+
+def measure_recall(
+    index: faiss.Index,
+    chunks: List[np.ndarray],
+    k: int = 10,
+    n_queries: int = 256,
+    labels: Optional[np.ndarray] = None,
+    **search,
+) -> float:
+    """
+    recall@k of `index` against exact search, using sampled stored vectors as
+    queries. labels maps row positions to index labels when they differ.
+    """
+    total = sum(len(c) for c in chunks)
+    queries = index_factory.sample_training_vectors(chunks, total, min(n_queries, total), seed=99)
+    truth = exact_knn(queries, chunks, k)
+    if labels is not None:
+        truth = labels[truth]
+    params = index_factory.search_parameters(index, **search)
+    _, found = index.search(queries, k, params=params)
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / float(truth.size)
+
+
+def convert(
+    chunks: List[np.ndarray],
+    index_type: str,
+    storage: str,
+    k: int,
+    n_queries: int,
+    ids: Optional[List[np.ndarray]] = None,
+):
+    dimension = int(chunks[0].shape[1])
+    params = {
+        "nlist": settings.faiss_nlist,
+        "pq_m": settings.faiss_pq_m,
+        "hnsw_m": settings.faiss_hnsw_m,
+    }
+    index = index_factory.build_from_vectors(
+        index_type,
+        dimension,
+        chunks,
+        storage=storage,
+        sample_size=settings.faiss_train_sample_size,
+        ids=ids,
+        **params,
+    )
+    labels = None
+    if ids is not None and index_factory.uses_native_ids(index_type):
+        labels = np.concatenate(ids)
+    storage = index_factory.effective_storage(index_type, storage)
+    rows = int(index.ntotal)
+    before = index_factory.bytes_per_vector(dimension, "float32") * rows
+    after = index_factory.bytes_per_vector(dimension, storage, settings.faiss_pq_m) * rows
+    report: Dict = {
+        "rows": rows,
+        "dimension": dimension,
+        "index_type": index_type,
+        "storage": storage,
+        "vector_bytes_before": int(before),
+        "vector_bytes_after": int(after),
+        "compression": round(before / after, 2) if after else None,
+        f"recall@{k}": round(
+            measure_recall(
+                index, chunks, k, n_queries, labels=labels,
+                nprobe=settings.faiss_nprobe, ef_search=settings.faiss_ef_search,
+            ),
+            4,
+        ),
+    }
+    return index, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a FAISS index to a quantized storage mode")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", help="segment store directory (e.g. vector_db); converted in place")
+    source.add_argument("--index", help="standalone faiss_index.bin to convert")
+    parser.add_argument("--out", help="output path when converting --index")
+    parser.add_argument("--index-type", default="flat", choices=index_factory.INDEX_TYPES)
+    parser.add_argument("--storage", required=True, choices=index_factory.STORAGE_MODES)
+    parser.add_argument("--k", type=int, default=10, help="k used for the recall report")
+    parser.add_argument("--queries", type=int, default=256, help="sampled queries for the recall report")
+    args = parser.parse_args(argv)
+
+    if args.index:
+        if not args.out:
+            parser.error("--out is required with --index")
+        source_index = faiss.read_index(args.index)
+        chunks = [source_index.reconstruct_n(0, source_index.ntotal)]
+        index, report = convert(chunks, args.index_type, args.storage, args.k, args.queries)
+        faiss.write_index(index, args.out)
+        report["output"] = args.out
+    else:
+        segments = SegmentStore(args.store)
+        chunks, ids = segments.live_vectors()
+        kept = [n for n, chunk in enumerate(chunks) if len(chunk)]
+        chunks, ids = [chunks[n] for n in kept], [ids[n] for n in kept]
+        if not chunks:
+            parser.error(f"{args.store} holds no vectors")
+        index, report = convert(chunks, args.index_type, args.storage, args.k, args.queries, ids=ids)
+        label_ids = None if index_factory.uses_native_ids(args.index_type) else np.concatenate(ids)
+        segments.write_index(
+            index,
+            segments.manifest["next_chunk_id"],
+            args.index_type,
+            report["storage"],
+            label_ids=label_ids,
+        )
+        report["output"] = segments.manifest["index"]["file"]
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,133 +1,855 @@
 import faiss
+import json
 import pickle
 import os
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Dict, Optional, Any, Tuple, Union
+from config.settings import settings
+from src.app.infrastructure.vector_store.segments import SegmentStore
+from src.app.infrastructure.vector_store.metadata import DocumentTable, content_hashes
+from src.app.infrastructure.vector_store.scan import SegmentScanIndex
+from src.app.infrastructure.vector_store.snapshot import (
+    IndexSnapshot,
+    add_to_index,
+    ids_to_labels,
+    remove_from_index,
+)
+from src.app.infrastructure.vector_store import index_factory
+from src.app.utils.stages import threaded
 import logging
 logger = logging.getLogger("genai")
 
+# Rebuild the main index once this share of its vectors is deleted
+REBUILD_DEAD_FRACTION = 0.25
+
+
 class FaissStore:
-    def __init__(self, embedder, dimension: int = None, persistence_dir: str = "vector_store"):
+    """
+    Vector store over append-only segments. Searches run on an immutable
+    IndexSnapshot; writes publish a new snapshot, and a background rebuild
+    folds new chunks into the main index (training / compacting as needed)
+    and swaps it in atomically, so queries never wait on ingestion.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        dimension: int = None,
+        persistence_dir: str = "vector_store",
+        batch_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        index_type: Optional[str] = None,
+        storage: Optional[str] = None,
+        read_only: Optional[bool] = None,
+    ):
         logger.warning("🧠 FaissStore __init__ triggered")
         self.embedder = embedder
         self.persistence_dir = persistence_dir
-        os.makedirs(self.persistence_dir, exist_ok=True)
-        
-        # Get embedding dimension from model if not provided
-        self.dimension = dimension or self._get_embedding_dimension()
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.max_in_flight = max_in_flight or settings.embedding_max_in_flight
+        self.index_type = index_type or settings.faiss_index_type
+        self.storage = index_factory.effective_storage(
+            self.index_type, storage or settings.faiss_storage
+        )
+        index_factory.validate(self.index_type, self.storage)
+        # Read-only stores map the index instead of copying it and never write
+        self.read_only = settings.vector_store_read_only if read_only is None else read_only
+        if not self.read_only:
+            os.makedirs(self.persistence_dir, exist_ok=True)
         
-        # Initialize empty structures
-        self.index = None
-        self.documents = []
-        self.is_trained = False
+        # Taken from the store manifest on load; the embedder is only asked for new stores
+        self.dimension = dimension
         
-        # Try to load existing data
-        self._load_persisted_data()
+        # Writers serialize on this lock; readers only ever read self._snapshot
+        self._write_lock = threading.RLock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._last_refresh = time.monotonic()
+        # One thread reloads a read-only store at a time (see _refresh_if_idle)
+        self._refresh_lock = threading.Lock()
+        # Called after every published write or reload (see subscribe)
+        self._subscribers: List[Callable[[], None]] = []
         
-        # Create new index if none loaded
-        if self.index is None:
-            self._create_new_index()
+        # Try to load existing data (creates an empty flat index if there is none)
+        self._snapshot = self._load_persisted_data()
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        return self._snapshot
+
+    @property
+    def index(self):
+        return self._snapshot.index if self._snapshot else None
+
+    @property
+    def index_kind(self):
+        return self._snapshot.index_kind
+
+    @property
+    def documents(self) -> DocumentTable:
+        return self._snapshot.documents
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self._snapshot.index.is_trained) and self._snapshot.index_kind != ("flat", "float32")
+
+    def subscribe(self, callback: Callable[[], None]):
+        """Register a callback run after every write to the store (or reload of it)"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Vector store subscriber {callback} failed: {e}")
 
     def _get_embedding_dimension(self) -> int:
-        """Get embedding dimension from the embedder"""
+        """Get embedding dimension from the embedder (no API call for known models)"""
+        dimension = getattr(self.embedder, "embedding_dim", None)
+        if dimension:
+            return int(dimension)
         test_embedding = self.embedder.get_embedding("test")
         return len(test_embedding)
 
-    def _create_new_index(self):
+    def _check_embedding(self):
+        """
+        Validate the embedder against the model / dimension recorded in the store
+        manifest, so startup makes no embedding calls.
+        """
+        recorded = self.segments.embedding or {}
+        model = getattr(self.embedder, "model", None)
+        stored_dim = self.segments.manifest.get("dimension")
+
+        if recorded.get("model") and model and recorded["model"] != model:
+            embedder = self._reindexed_embedder()
+            if embedder is None:
+                raise ValueError(
+                    f"Vector store {self.persistence_dir} was built with embedding model "
+                    f"'{recorded['model']}', but the embedder uses '{model}' (to change the "
+                    f"dimension of a store, re-index it: POST /api/v1/vector-store/reindex, "
+                    f"or vector_store.reindex --offline)"
+                )
+            # Re-indexed at a shorter dimension: follow it, as read-only readers do on refresh
+            logger.warning(
+                f"Vector store {self.persistence_dir} was re-indexed to '{recorded['model']}'; "
+                f"using it instead of '{model}' (set EMBEDDING_TARGET_DIMENSION={recorded['dimension']})"
+            )
+            self.embedder = embedder
+            model = embedder.model
+        if stored_dim and recorded.get("model") == model and model:
+            self.dimension = stored_dim
+            return
+
+        # Nothing recorded yet (new or older store): check the dimension, then record it
+        dimension = self.dimension or self._get_embedding_dimension()
+        if stored_dim and stored_dim != dimension:
+            raise ValueError(
+                f"Embedding dimension mismatch: index={stored_dim}, embedder={dimension}"
+            )
+        self.dimension = stored_dim or dimension
+        if not self.read_only:
+            self.segments.record_embedding(model, self.dimension)
+
+    def _empty_snapshot(self, documents: DocumentTable) -> IndexSnapshot:
         """Initialize a new FAISS index with correct dimension"""
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.is_trained = False
+        # Always start flat; the configured ANN type is trained once the corpus is big enough
         logger.info(f"Created new FAISS index with dimension {self.dimension}")
-    
-    def _persist_data(self):
-        """Persist both FAISS index and documents to disk"""
-        index_path = os.path.join(self.persistence_dir, "faiss_index.bin")
-        docs_path = os.path.join(self.persistence_dir, "documents.pkl")
+        return IndexSnapshot(
+            documents,
+            faiss.IndexFlatL2(self.dimension),
+            ("flat", "float32"),
+            np.zeros(0, dtype=np.int64),
+            covered_id=0,
+        )
+
+    def _index_params(self) -> Dict[str, int]:
+        return {
+            "nlist": settings.faiss_nlist,
+            "pq_m": settings.faiss_pq_m,
+            "hnsw_m": settings.faiss_hnsw_m,
+        }
+
+    def _migration_threshold(self) -> int:
+        """Rows needed before the flat float32 index is replaced by the configured one"""
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            return settings.faiss_train_threshold
+        if self.storage in ("sq8", "pq"):
+            # Quantizers need a training sample, but far fewer rows than IVF
+            return settings.faiss_quantizer_train_rows
+        if self.index_type == "hnsw":
+            return settings.faiss_train_threshold
+        return 1  # flat fp16: nothing to train, compress from the first row
+
+    def _migration_due(self, snapshot: IndexSnapshot) -> bool:
+        target = (self.index_type, self.storage)
+        return (
+            target != ("flat", "float32")
+            and snapshot.index_kind == ("flat", "float32")
+            and snapshot.documents.live_count >= self._migration_threshold()
+        )
+
+    def _rebuild_due(self, snapshot: IndexSnapshot) -> bool:
+        return (
+            snapshot.delta_rows >= settings.vector_store_delta_rows
+            or len(snapshot.deltas) >= settings.vector_store_max_deltas
+            or len(snapshot.dead_labels) > REBUILD_DEAD_FRACTION * max(snapshot.index.ntotal, 1)
+            or self._migration_due(snapshot)
+        )
+
+    def _next_covered_id(self, documents: DocumentTable) -> int:
+        chunk_ids = documents.chunk_ids
+        return int(chunk_ids[-1]) + 1 if len(chunk_ids) else 0
 
-        faiss.write_index(self.index, index_path)
+    def _build_main_index(self, snapshot: IndexSnapshot):
+        """
+        Build the next main index from a snapshot without touching it: train the
+        configured type once the corpus is big enough, otherwise copy the current
+        index and fold in the deltas and deletions.
+        Returns (index, kind, label_ids, dead_labels).
+        """
+        documents = snapshot.documents
+        migrate = self._migration_due(snapshot)
+        # HNSW cannot drop vectors, so heavy deletion means building it again
+        compact = (
+            snapshot.index_kind != ("flat", "float32")
+            and len(snapshot.dead_labels) > REBUILD_DEAD_FRACTION * max(snapshot.index.ntotal, 1)
+        )
+        if (migrate or compact) and documents.live_count:
+            index_type, storage = (self.index_type, self.storage) if migrate else snapshot.index_kind
+            chunks, ids = zip(*documents.live_chunks())
+            index = index_factory.build_from_vectors(
+                index_type,
+                self.dimension,
+                list(chunks),
+                storage=storage,
+                sample_size=settings.faiss_train_sample_size,
+                ids=list(ids),
+                **self._index_params(),
+            )
+            label_ids = None if index_factory.uses_native_ids(index_type) else np.concatenate(ids)
+            logger.info(
+                f"{'Migrated flat index to' if migrate else 'Compacted'} {index_type}/{storage} "
+                f"with {index.ntotal} vectors"
+            )
+            return index, (index_type, storage), label_ids, np.zeros(0, dtype=np.int64)
 
-        with open(docs_path, "wb") as f:
-            pickle.dump(self.documents, f)
+        if snapshot.index_kind == ("flat", "float32"):
+            # Exact vectors are in the segments already: a fresh copy is cheaper than remove_ids
+            index = faiss.IndexFlatL2(self.dimension)
+            label_ids = np.zeros(0, dtype=np.int64)
+            for vectors, ids in documents.live_chunks():
+                label_ids = add_to_index(index, label_ids, vectors, ids)
+            return index, snapshot.index_kind, label_ids, np.zeros(0, dtype=np.int64)
 
-        logger.info(f"Persisted FAISS index and {len(self.documents)} documents to disk")
+        index = faiss.clone_index(snapshot.index)
+        label_ids = None if snapshot.label_ids is None else np.array(snapshot.label_ids)
+        for _, ids in snapshot.deltas:
+            if len(ids):
+                label_ids = add_to_index(index, label_ids, documents.vectors(documents.rows_of(ids)), ids)
+        tombstones = documents.tombstones
+        # Every tombstone the index covers is removed again (or, for HNSW, returned as
+        # dead), so the old dead labels are not carried over: removal compacts a
+        # positional index and they would now point at other, live chunks
+        label_ids, dead = remove_from_index(index, label_ids, tombstones[tombstones < snapshot.covered_id])
+        return index, snapshot.index_kind, label_ids, dead
 
-    def _load_persisted_data(self):
-        """Load both FAISS index and documents"""
+    def rebuild(self, wait: bool = True):
+        """Fold deltas and deletions into a new main index and swap it in"""
+        self._check_writable()
+        with self._write_lock:
+            thread = self._rebuild_thread
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._rebuild, name="faiss-rebuild", daemon=True)
+                self._rebuild_thread = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _maybe_rebuild(self):
+        if self._rebuild_due(self._snapshot):
+            self.rebuild(wait=False)
+
+    def _rebuild(self):
+        try:
+            base = self._snapshot
+            index, kind, label_ids, dead = self._build_main_index(base)
+            covered = self._next_covered_id(base.documents)
+
+            with self._write_lock:
+                current = self._snapshot
+                # Chunks written while we were building stay in the newer deltas
+                later = current.deltas[len(base.deltas):]
+                deleted = np.setdiff1d(current.documents.tombstones, base.documents.tombstones)
+                deleted = deleted[deleted < covered]
+                dead = np.union1d(dead, ids_to_labels(label_ids, deleted))
+                # Re-read the table so segments merged since the load are picked up
+                documents = self._read_table(current.documents.tombstones)
+                self._snapshot = IndexSnapshot(
+                    documents, index, kind, label_ids, covered, deltas=later, dead_labels=dead
+                )
+            logger.info(
+                f"Swapped in rebuilt {kind[0]}/{kind[1]} index with {index.ntotal} vectors "
+                f"({len(later)} newer deltas kept)"
+            )
+            self._maybe_checkpoint_index(self._snapshot, force=kind != base.index_kind)
+        except Exception as e:
+            logger.error(f"FAISS index rebuild failed: {e}")
+
+    def _maybe_checkpoint_index(self, snapshot: IndexSnapshot, force: bool = False):
+        """Re-save a trained index once enough rows exist only in segments"""
+        if snapshot.index_kind == ("flat", "float32"):
+            return  # segments already hold the exact vectors
+        written = self.segments.index_covered_id
+        if force or snapshot.covered_id - written >= settings.vector_store_index_checkpoint_rows:
+            self.segments.write_index(
+                snapshot.index,
+                snapshot.covered_id,
+                *snapshot.index_kind,
+                label_ids=snapshot.label_ids,
+            )
+
+    def _read_table(self, tombstones: Optional[np.ndarray] = None) -> DocumentTable:
+        documents = self.segments.new_table()
+        if tombstones is not None:
+            documents.set_tombstones(tombstones)
+        with self.segments._lock:
+            # Opened under the lock; the mappings stay valid if a merge later removes the files
+            opened = list(self.segments.iter_segments())
+        for _, columns in opened:
+            documents.append_segment(columns)
+        return documents
+
+    def _load_persisted_data(self) -> IndexSnapshot:
+        """Load FAISS index and documents from the segment manifest"""
         logger.warning("📦 Loading documents from disk...")
+        self.segments = SegmentStore(self.persistence_dir, read_only=self.read_only)
+        self._manifest_mtime = self._read_manifest_mtime()
+
+        if not self.segments.exists:
+            if self.read_only:
+                logger.warning(f"No segment store in {self.persistence_dir}; open it read-write once to create or import it")
+            else:
+                self._import_legacy_files()
+        self._check_embedding()
+
+        documents = self._read_table()
+        if not self.segments.segments:
+            return self._empty_snapshot(documents)
+
+        if self.read_only:
+            snapshot = self._open_shared_index(documents)
+        else:
+            snapshot = self._open_private_index(documents)
+        logger.info(
+            f"Loaded FAISS index with dimension {self.dimension} and "
+            f"{documents.live_count} document metadata records "
+            f"from {len(self.segments.segments)} segments"
+        )
+        return snapshot
+
+    def _checkpoint_state(self, index: faiss.Index, label_ids: Optional[np.ndarray]):
+        entry = self.segments.manifest["index"]
+        index_kind = (entry["type"], entry.get("storage", "float32"))
+        if label_ids is None and not index_factory.uses_native_ids(index_kind[0]):
+            # Older checkpoints: labels were row positions, which were the chunk ids
+            label_ids = np.arange(index.ntotal, dtype=np.int64)
+        if index_kind != (self.index_type, self.storage):
+            logger.warning(
+                f"Store index is {index_kind}, configured {(self.index_type, self.storage)}; "
+                f"keeping the stored one (use vector_store.convert to change it)"
+            )
+        return index_kind, label_ids
+
+    def _open_private_index(self, documents: DocumentTable) -> IndexSnapshot:
+        """Copy the checkpoint into memory and bring it up to date with the segments"""
+        index, covered, label_ids = self.segments.read_index()
+        if index is None:
+            index = faiss.IndexFlatL2(self.dimension)
+            index_kind, label_ids = ("flat", "float32"), np.zeros(0, dtype=np.int64)
+        else:
+            index_kind, label_ids = self._checkpoint_state(index, label_ids)
+
+        # Chunks added after the last index checkpoint are only in segments
+        tombstones = documents.tombstones
+        for vectors, chunk_ids in documents.live_chunks():
+            tail = chunk_ids >= covered
+            if tail.any():
+                label_ids = add_to_index(index, label_ids, vectors[tail], chunk_ids[tail])
+        # ...and chunks deleted after it are still in the checkpoint
+        label_ids, dead = remove_from_index(index, label_ids, tombstones[tombstones < covered])
+
+        snapshot = IndexSnapshot(
+            documents, index, index_kind, label_ids,
+            self._next_covered_id(documents), dead_labels=dead,
+        )
+        if self._migration_due(snapshot):
+            index, index_kind, label_ids, dead = self._build_main_index(snapshot)
+            snapshot = IndexSnapshot(documents, index, index_kind, label_ids, snapshot.covered_id, dead_labels=dead)
+            self._maybe_checkpoint_index(snapshot, force=True)
+        return snapshot
+
+    def _open_shared_index(self, documents: DocumentTable) -> IndexSnapshot:
+        """
+        Map the checkpoint (or, for flat float32 stores, the segment vectors)
+        read-only so every worker on the host shares one copy of the pages.
+        Chunks added after the checkpoint go to a small private delta index.
+        """
+        index, covered, label_ids = self.segments.read_index(mmap=True)
+        if index is None:
+            # Segments hold the exact vectors already: scan their mappings directly
+            index = SegmentScanIndex([seg.vectors for seg in documents.segments])
+            index_kind, label_ids = ("flat", "float32"), documents.chunk_ids
+            covered = self._next_covered_id(documents)
+        else:
+            index_kind, label_ids = self._checkpoint_state(index, label_ids)
+
+        # A mapped index cannot be modified: deleted chunks are skipped at search time
+        dead = np.unique(ids_to_labels(label_ids, documents.tombstones))
+        snapshot = IndexSnapshot(documents, index, index_kind, label_ids, covered, dead_labels=dead)
+
+        tail_vectors, tail_ids = [], []
+        for vectors, chunk_ids in documents.live_chunks():
+            tail = chunk_ids >= covered
+            if tail.any():
+                tail_vectors.append(vectors[tail])
+                tail_ids.append(chunk_ids[tail])
+        if tail_ids:
+            snapshot = snapshot.with_added(documents, np.vstack(tail_vectors), np.concatenate(tail_ids))
+            logger.info(f"{snapshot.delta_rows} chunks newer than the shared index kept in a private delta")
+        return snapshot
+
+    def _read_manifest_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.segments.manifest_path)
+        except OSError:
+            return None
+
+    def reload(self, embedder=None):
+        """
+        Re-open the store from disk (e.g. after a re-index swapped its
+        directory), optionally switching to another embedder
+        """
+        with self._write_lock:
+            if embedder is not None:
+                self.embedder = embedder
+                self.dimension = None
+            self._snapshot = self._load_persisted_data()
+        logger.info(f"Reloaded vector store from {self.persistence_dir} (dimension {self.dimension})")
+        self._notify()
+
+    def refresh(self) -> bool:
+        """Reload when another process changed the store on disk; True if reloaded"""
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh_if_idle(self):
+        """refresh() from a query thread, unless another thread is already reloading"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # keep serving the current snapshot
+        try:
+            if time.monotonic() - self._last_refresh >= settings.vector_store_refresh_seconds:
+                self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self) -> bool:
+        self._last_refresh = time.monotonic()
+        if self._read_manifest_mtime() == self._manifest_mtime:
+            return False
+        segments = self.segments
+        try:
+            snapshot = self._load_persisted_data()
+        except OSError as e:
+            # The writer replaced a file between reading the manifest and opening it
+            logger.warning(f"Vector store changed while reloading ({e}); retrying on next refresh")
+            self._manifest_mtime = None
+            return False
+        except ValueError as e:
+            # The writer re-indexed the store at a shorter dimension (vector_store.reindex)
+            embedder = self._reindexed_embedder()
+            if embedder is None:
+                logger.error(f"Cannot follow {self.persistence_dir} to its new embedding ({e}); keeping the loaded snapshot")
+                self.segments = segments
+                return False
+            self.reload(embedder)
+            return True
+        # In-flight searches keep using the snapshot they started with
+        self._snapshot = snapshot
+        logger.info(f"Reloaded vector store from {self.persistence_dir}")
+        self._notify()
+        return True
+
+    def _reindexed_embedder(self):
+        """Our embedder shortened to the model a re-index recorded, or None if it cannot produce it"""
+        from src.app.infrastructure.vector_store.reindex import shortened_embedder
+
+        recorded = self.segments.embedding or {}
+        if not recorded.get("model") or not recorded.get("dimension"):
+            return None
+        embedder = shortened_embedder(self.embedder, recorded["dimension"])
+        if embedder is None or embedder.model != recorded["model"]:
+            return None
+        return embedder
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"Vector store {self.persistence_dir} is opened read-only")
+
+    def _import_legacy_files(self):
+        """Convert a pre-segment faiss_index.bin + documents.pkl into the first segment"""
         index_path = os.path.join(self.persistence_dir, "faiss_index.bin")
         docs_path = os.path.join(self.persistence_dir, "documents.pkl")
+        if not (os.path.exists(index_path) and os.path.exists(docs_path)):
+            return
 
-        if os.path.exists(index_path):
-            try:
-                self.index = faiss.read_index(index_path)
-                self.dimension = self.index.d
-                self.is_trained = True
-                logger.info(f"Loaded FAISS index with dimension {self.dimension}")
-            except Exception as e:
-                logger.error(f"Failed to load FAISS index: {e}")
+        try:
+            index = faiss.read_index(index_path)
+            with open(docs_path, "rb") as f:
+                documents = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load legacy FAISS index: {e}")
+            return
 
-        if os.path.exists(docs_path):
-            try:
-                with open(docs_path, "rb") as f:
-                    self.documents = pickle.load(f)
-                logger.info(f"Loaded {len(self.documents)} document metadata records")
-            except Exception as e:
-                logger.error(f"Failed to load documents metadata: {e}")
+        if index.ntotal != len(documents):
+            logger.error(
+                f"Legacy index has {index.ntotal} vectors but {len(documents)} documents; skipping import"
+            )
+            return
+        if documents:
+            metadatas = [doc.get("metadata", {}) for doc in documents]
+            self.segments.append(
+                index.reconstruct_n(0, index.ntotal),
+                [doc.get("text", "") for doc in documents],
+                metadatas,
+                chunk_ids=np.array([m.get("chunk_id", i) for i, m in enumerate(metadatas)], dtype=np.int64),
+            )
+            logger.info(f"Imported {len(documents)} legacy documents into segment storage")
 
-        # Dimension consistency check
-        if self.index and self.documents:
-            test_embedding = self.embedder.get_embedding("test")
-            if len(test_embedding) != self.dimension:
-                raise ValueError(
-                    f"Embedding dimension mismatch: index={self.dimension}, embedder={len(test_embedding)}"
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in size-limited batches, keeping the input order"""
+        batches = [
+            texts[i:i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+
+        if len(batches) == 1 or self.max_in_flight <= 1:
+            results = [self.embedder.embed(batch) for batch in batches]
+        else:
+            # pool.map yields in submission order, so chunk ids still line up
+            workers = min(self.max_in_flight, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self.embedder.embed, batches))
+
+        embeddings = np.asarray(
+            [emb for batch in results for emb in batch], dtype=np.float32
+        )
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.dimension:
+            got = embeddings.shape[1] if embeddings.ndim == 2 else None
+            raise ValueError(
+                f"Embedding dimension mismatch: "
+                f"expected {self.dimension}, got {got}"
+            )
+        if len(embeddings) != len(texts):
+            raise ValueError(
+                f"Embedder returned {len(embeddings)} vectors for {len(texts)} texts"
+            )
+        logger.info(f"Embedded {len(texts)} chunks in {len(batches)} batches")
+        return embeddings
+
+    def _new_chunks(self, documents: DocumentTable, hashes: np.ndarray) -> np.ndarray:
+        """Positions of hashes that are neither stored already nor repeated earlier in the batch"""
+        _, first = np.unique(hashes, return_index=True)
+        new = np.zeros(len(hashes), dtype=bool)
+        new[first] = True
+        new &= ~np.isin(hashes, documents.live_hashes())
+        return np.flatnonzero(new)
+
+    def _prepare(self, texts: List[str], metadatas: List[Dict]):
+        """Dedup and embed outside the write lock; returns (texts, metadatas, hashes, embeddings)"""
+        hashes = content_hashes(texts, metadatas)
+        picked = self._new_chunks(self._snapshot.documents, hashes)
+        texts = [texts[i] for i in picked]
+        metadatas = [metadatas[i] for i in picked]
+        embeddings = self._embed_texts(texts) if texts else None
+        return texts, metadatas, hashes[picked], embeddings
+
+    def _apply(self, prepared=None, delete_ids: Optional[np.ndarray] = None):
+        """
+        Persist a prepared add and/or a deletion and publish both in a single new
+        snapshot. Returns (added chunk ids, number of chunks deleted).
+        """
+        added = np.zeros(0, dtype=np.int64)
+        deleted = 0
+        with self._write_lock:
+            snapshot = self._snapshot
+            documents = snapshot.documents
+
+            if prepared is not None and prepared[0]:
+                texts, metadatas, hashes, embeddings = prepared
+                # Another writer may have stored some of these while we were embedding
+                keep = ~np.isin(hashes, documents.live_hashes())
+                if keep.any():
+                    picked = np.flatnonzero(keep)
+                    segment = self.segments.append(
+                        embeddings[picked],
+                        [texts[i] for i in picked],
+                        [metadatas[i] for i in picked],
+                        hashes[picked],
+                    )
+                    added = np.asarray(segment.chunk_ids)
+                    documents = documents.with_segment(segment)
+                    snapshot = snapshot.with_added(documents, embeddings[picked], added)
+                    logger.info(f"Persisted {len(added)} new documents (total: {documents.live_count})")
+
+            if delete_ids is not None and len(delete_ids):
+                delete_ids = np.intersect1d(
+                    np.asarray(delete_ids, dtype=np.int64), documents.chunk_ids[documents.live]
                 )
+                if len(delete_ids):
+                    self.segments.add_tombstones(delete_ids)
+                    documents = documents.with_tombstones(delete_ids)
+                    snapshot = snapshot.with_deleted(documents, delete_ids)
+                    deleted = len(delete_ids)
+                    logger.info(f"Deleted {deleted} chunks (total: {documents.live_count})")
 
-    def add_documents(self, texts: List[str], metadata: Optional[Dict] = None):
-        """Safe document addition with dimension validation"""
+            self._snapshot = snapshot
+
+        if len(added):
+            self.segments.merge_in_background(settings.vector_store_merge_threshold)
+        if len(added) or deleted:
+            self._notify()
+        self._maybe_rebuild()
+        return added, deleted
+
+    def add_documents(
+        self,
+        texts: List[str],
+        metadata: Optional[Dict] = None,
+        metadatas: Optional[List[Dict]] = None,
+    ) -> List[int]:
+        """
+        Safe document addition with dimension validation. Chunks whose content
+        hash (doc_id + section + text) is already stored are skipped before
+        embedding. Returns the chunk ids that were actually added.
+        """
+        self._check_writable()
         if not texts:
             raise ValueError("Cannot add empty list of texts")
-        
-        # Generate embeddings with validation
-        embeddings = []
-        for text in texts:
-            embedding = np.array(self.embedder.get_embedding(text), dtype=np.float32)
-            if len(embedding) != self.dimension:
-                raise ValueError(
-                    f"Embedding dimension mismatch: "
-                    f"expected {self.dimension}, got {len(embedding)}"
-                )
-            embeddings.append(embedding)
-        
-        embeddings = np.array(embeddings)
-        
-        # Add to index
-        if not self.is_trained and len(self.documents) > 0:
-            self.index.train(embeddings)
-            self.is_trained = True
-        
-        self.index.add(embeddings)
-        
-        # Store documents metadata
-        default_meta = metadata or {}
-        new_docs = [
-            {"text": text, "metadata": {**default_meta, "chunk_id": len(self.documents) + i}}
-            for i, text in enumerate(texts)
-        ]
-        self.documents.extend(new_docs)
-        self._persist_data()
-        logger.info(f"Added {len(texts)} documents (total: {len(self.documents)})")
+        if metadatas is None:
+            metadatas = [metadata or {}] * len(texts)
+        if len(metadatas) != len(texts):
+            raise ValueError(f"Got {len(metadatas)} metadata records for {len(texts)} texts")
 
-    def search(self, query_embedding, top_k=5):
-        if not self.documents:
-            logger.error("Vector store is empty - no documents to search")
+        prepared = self._prepare(texts, metadatas)
+        if not prepared[0]:
+            logger.info(f"All {len(texts)} chunks already stored; nothing to add")
             return []
-        
-        distances, indices = self.index.search(query_embedding, top_k)
+        added, _ = self._apply(prepared)
+        logger.info(f"Added {len(added)} documents (total: {self.count()})")
+        return added.tolist()
+
+    def delete_chunks(self, chunk_ids: List[int]) -> int:
+        """Tombstone chunks and hide them from searches; returns how many were live"""
+        self._check_writable()
+        _, deleted = self._apply(delete_ids=np.asarray(chunk_ids, dtype=np.int64))
+        return deleted
+
+    def delete_document(self, doc_id: str) -> int:
+        """Delete every chunk of a document; returns the number of chunks removed"""
+        documents = self._snapshot.documents
+        return self.delete_chunks(documents.chunk_ids[documents.doc_rows(doc_id)])
+
+    def replace_document(
+        self,
+        doc_id: str,
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ) -> Dict[str, int]:
+        """
+        Make the stored chunks of doc_id equal to texts: unchanged chunks are kept
+        as they are, new ones embedded and added, stale ones deleted. Searches see
+        either the old or the new version, never a mix.
+        """
+        self._check_writable()
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        metadatas = [{**m, "doc_id": doc_id} for m in metadatas]
+
+        documents = self._snapshot.documents
+        old_rows = documents.doc_rows(doc_id)
+        old_ids = documents.chunk_ids[old_rows]
+        old_hashes = documents.hashes[old_rows]
+        new_hashes = content_hashes(texts, metadatas)
+
+        # Embedding happens before anything is published, so a failure leaves the old version
+        prepared = self._prepare(texts, metadatas) if texts else None
+        added, deleted = self._apply(prepared, delete_ids=old_ids[~np.isin(old_hashes, new_hashes)])
+        result = {
+            "added": len(added),
+            "deleted": deleted,
+            "unchanged": int(np.isin(np.unique(new_hashes), old_hashes).sum()),
+        }
+        logger.info(f"Replaced document {doc_id}: {result}")
+        return result
+
+    def replace_document_stream(
+        self,
+        doc_id: str,
+        batches: Iterable[Tuple[List[str], List[Dict]]],
+        queue_size: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        replace_document() for documents too large to hold at once: batches of
+        (texts, metadatas) are embedded on a background thread while earlier
+        batches are being indexed, so only a few batches are in memory. New
+        chunks become searchable batch by batch; stale chunks are deleted once
+        the last batch is in. On failure the chunks added so far are removed,
+        leaving the previous version. progress, if given, is called with the
+        number of chunks processed after each batch.
+        """
+        self._check_writable()
+        queue_size = settings.ingest_queue_size if queue_size is None else queue_size
+        documents = self._snapshot.documents
+        old_rows = documents.doc_rows(doc_id)
+        old_ids = documents.chunk_ids[old_rows]
+        old_hashes = documents.hashes[old_rows]
+        new_hashes: List[np.ndarray] = []
+        processed = 0
+
+        def embedded():
+            for texts, metadatas in batches:
+                metadatas = [{**m, "doc_id": doc_id} for m in metadatas]
+                new_hashes.append(content_hashes(texts, metadatas))
+                yield len(texts), self._prepare(texts, metadatas) if texts else None
+
+        added: List[np.ndarray] = []
+        try:
+            for size, prepared in threaded(embedded(), queue_size, name=f"embed-{doc_id}"):
+                if prepared is not None:
+                    added.append(self._apply(prepared)[0])
+                processed += size
+                if progress is not None:
+                    progress(processed)
+        except BaseException:
+            if added:
+                self._apply(delete_ids=np.concatenate(added))
+            raise
+
+        new_hashes = np.concatenate(new_hashes) if new_hashes else np.zeros(0, dtype=np.uint64)
+        _, deleted = self._apply(delete_ids=old_ids[~np.isin(old_hashes, new_hashes)])
+        result = {
+            "added": int(sum(len(a) for a in added)),
+            "deleted": deleted,
+            "unchanged": int(np.isin(np.unique(new_hashes), old_hashes).sum()),
+        }
+        logger.info(f"Replaced document {doc_id} (streamed): {result}")
+        return result
+
+    def count(self) -> int:
+        """Number of live (not deleted) chunks"""
+        return self._snapshot.documents.live_count
+
+    def search(
+        self,
+        query_embedding,
+        top_k=5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        rescore: Optional[int] = None,
+    ):
+        """
+        Nearest chunks; nprobe / ef_search tune IVF / HNSW indexes per query.
+        filters (section, section_prefix, doc_id) are applied inside the search,
+        so up to top_k matching chunks come back whenever that many exist.
+        With quantized storage, rescore=N fetches N*top_k candidates and re-ranks
+        them on the exact float32 vectors (default: faiss_rescore_factor).
+        """
+        query_embedding = np.ascontiguousarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        return self.search_many(
+            query_embedding, top_k, filters=filters,
+            nprobe=nprobe, ef_search=ef_search, rescore=rescore,
+        )[0]
+
+    def search_many(
+        self,
+        query_embeddings,
+        top_k=5,
+        filters: Optional[Union[Dict, List[Optional[Dict]]]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        rescore: Optional[int] = None,
+    ) -> List[List[Dict]]:
+        """
+        Batched search over an (n, d) query matrix. filters is one filter for all
+        queries or a list with one (possibly None) filter per query; queries that
+        share a filter go to FAISS in a single call.
+        """
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if self.read_only and time.monotonic() - self._last_refresh >= settings.vector_store_refresh_seconds:
+            self._refresh_if_idle()
+
+        # Everything below reads this one snapshot, whatever writers publish meanwhile
+        snapshot = self._snapshot
+        if not snapshot.documents:
+            logger.error("Vector store is empty - no documents to search")
+            return [[] for _ in range(len(queries))]
+
+        if filters is None or isinstance(filters, dict):
+            filters = [filters] * len(queries)
+        if len(filters) != len(queries):
+            raise ValueError(f"Got {len(filters)} filters for {len(queries)} queries")
+
+        rescore = settings.faiss_rescore_factor if rescore is None else rescore
+        if snapshot.index_kind[1] == "float32":
+            rescore = 0
+        fetch_k = top_k * rescore if rescore > 1 else top_k
+        nprobe = nprobe or settings.faiss_nprobe
+        ef_search = ef_search or settings.faiss_ef_search
+
+        # Group queries by identical filter so each group is one FAISS call
+        groups: Dict[str, List[int]] = {}
+        for qi, f in enumerate(filters):
+            groups.setdefault(json.dumps(f or {}, sort_keys=True), []).append(qi)
+
+        distances = np.full((len(queries), fetch_k), np.inf, dtype=np.float32)
+        indices = np.full((len(queries), fetch_k), -1, dtype=np.int64)
+        for qis in groups.values():
+            group = queries[qis]
+            rows = snapshot.documents.filter_rows(filters[qis[0]])
+            if rows is not None:
+                d, i = self._search_filtered(snapshot, group, fetch_k, rows, nprobe, ef_search)
+            else:
+                d, i = snapshot.search(group, fetch_k, nprobe, ef_search)
+            distances[qis, :d.shape[1]] = d
+            indices[qis, :i.shape[1]] = i
+
+        results = []
+        for qi in range(len(queries)):
+            d, i = distances[qi], indices[qi]
+            if rescore:
+                d, i = self._rescore(snapshot, queries[qi], i, top_k)
+            results.append(self._to_results(snapshot, d, i))
+        return results
+
+    def _to_results(self, snapshot: IndexSnapshot, distances: np.ndarray, indices: np.ndarray) -> List[Dict]:
         results = []
         
         # modificado 2025-06-25: Se agrega el score
         #for idx in indices[0]:
-        for i, idx in enumerate(indices[0]):
+        for i, idx in enumerate(indices):
         ##
             if idx == -1:  # FAISS returns -1 for invalid indices
                 continue
@@ -135,8 +857,8 @@ class FaissStore:
                 # modificado 2025-06-25: Se agrega el score
                 #results.append(self.documents[idx])
                 
-                doc = self.documents[idx].copy()
-                doc["score"] = float(1 / (1 + distances[0][i]))  # el score inversamente proporcional a distancia
+                doc = snapshot.documents[idx]
+                doc["score"] = float(1 / (1 + distances[i]))  # el score inversamente proporcional a distancia
                 results.append(doc)
                 
                 ##
@@ -146,6 +868,36 @@ class FaissStore:
                 
         return results
 
+    def _rescore(self, snapshot: IndexSnapshot, query: np.ndarray, indices: np.ndarray, top_k: int):
+        """Re-rank ANN candidates of one query by exact L2 distance on the stored float32 vectors"""
+        candidates = indices[indices != -1]
+        exact = ((snapshot.documents.vectors(candidates) - query) ** 2).sum(axis=1)
+        order = np.argsort(exact)[:top_k]
+        return exact[order], candidates[order]
+
+    def _search_filtered(self, snapshot: IndexSnapshot, queries: np.ndarray, top_k, rows: np.ndarray, nprobe=None, ef_search=None):
+        """
+        Search restricted to the given (live) rows, via an ID selector or an exact
+        scan of the subset. Returns table rows, not FAISS labels.
+        """
+        if len(rows) == 0:
+            return (
+                np.empty((len(queries), 0), dtype=np.float32),
+                np.empty((len(queries), 0), dtype=np.int64),
+            )
+
+        wanted = min(top_k, len(rows))
+        scan = isinstance(snapshot.index, SegmentScanIndex)  # already exact, and has no selectors
+        if len(rows) > settings.vector_store_exact_filter_rows and not scan:
+            distances, indices = snapshot.search(queries, top_k, nprobe, ef_search, rows=rows)
+            if ((indices != -1).sum(axis=1) >= wanted).all():
+                return distances, indices
+            logger.info("Filtered ANN search came back short; rescanning the subset exactly")
+
+        # Small subsets: an exact scan over just these vectors is cheaper than the index
+        distances, positions = faiss.knn(queries, snapshot.documents.vectors(rows), wanted)
+        return distances, rows[positions]
+
     def save_index(self, path: str):
         """Persist the FAISS index to disk"""
         faiss.write_index(self.index, path)
@@ -153,6 +905,19 @@ class FaissStore:
 
     def load_index(self, path: str):
         """Load a persisted FAISS index"""
-        self.index = faiss.read_index(path)
-        self.is_trained = True
+        index = faiss.read_index(path)
+        index_kind = (
+            index_factory.index_type_of(index),
+            index_factory.storage_of(index),
+        )
+        with self._write_lock:
+            documents = self._snapshot.documents
+            # A standalone index file carries no label map: assume it holds the chunks in order
+            label_ids = (
+                None if index_factory.uses_native_ids(index_kind[0])
+                else documents.chunk_ids[:index.ntotal]
+            )
+            self._snapshot = IndexSnapshot(
+                documents, index, index_kind, label_ids, self._next_covered_id(documents)
+            )
         logger.info(f"Loaded FAISS index from {path}")
@@ -0,0 +1,189 @@
+import math
+import faiss
+import numpy as np
+from typing import Iterable, List, Optional
+import logging
+logger = logging.getLogger("genai")
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# How vectors are encoded inside the index; float32 keeps them exact
+STORAGE_MODES = ("float32", "fp16", "sq8", "pq")
+
+# Bytes per stored vector component, used to report index memory
+_BYTES_PER_DIM = {"float32": 4.0, "fp16": 2.0, "sq8": 1.0}
+
+# FAISS recommends at least ~39 training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def auto_nlist(n_vectors: int) -> int:
+    """IVF list count for a corpus size: ~4*sqrt(n), bounded by the training data"""
+    nlist = int(4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def _pq_subquantizers(dimension: int, pq_m: int) -> int:
+    """Largest sub-quantizer count <= pq_m that divides the dimension"""
+    for m in range(min(pq_m, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def validate(index_type: str, storage: str = "float32"):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown FAISS storage mode '{storage}', expected one of {STORAGE_MODES}")
+
+
+def effective_storage(index_type: str, storage: str) -> str:
+    """ivf_pq always stores PQ codes, whatever storage mode was asked for"""
+    return "pq" if index_type == "ivf_pq" else storage
+
+
+def factory_string(
+    index_type: str,
+    dimension: int,
+    n_vectors: int,
+    storage: str = "float32",
+    nlist: int = 0,
+    pq_m: int = 64,
+    hnsw_m: int = 32,
+) -> str:
+    """Translate a configured index type + storage mode into a faiss.index_factory description"""
+    validate(index_type, storage)
+    storage = effective_storage(index_type, storage)
+
+    nlist = nlist or auto_nlist(n_vectors)
+    codec = {
+        "float32": "Flat",
+        "fp16": "SQfp16",
+        "sq8": "SQ8",
+        "pq": f"PQ{_pq_subquantizers(dimension, pq_m)}",
+    }[storage]
+
+    if index_type == "flat":
+        return codec
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return f"IVF{nlist},{codec}"
+    return f"HNSW{hnsw_m}" if storage == "float32" else f"HNSW{hnsw_m}_{codec}"
+
+
+def uses_native_ids(index_type: str) -> bool:
+    """IVF indexes label vectors with chunk ids; flat / HNSW number them by position"""
+    return index_type in ("ivf_flat", "ivf_pq")
+
+
+def bytes_per_vector(dimension: int, storage: str, pq_m: int = 64) -> float:
+    """Approximate code size of one vector (graph links / list ids not included)"""
+    if storage == "pq":
+        return float(_pq_subquantizers(dimension, pq_m))
+    return _BYTES_PER_DIM[storage] * dimension
+
+
+def build_index(index_type: str, dimension: int, n_vectors: int = 0, **params) -> faiss.Index:
+    description = factory_string(index_type, dimension, n_vectors, **params)
+    logger.info(f"Building FAISS index '{description}' (d={dimension}, n={n_vectors})")
+    return faiss.index_factory(dimension, description, faiss.METRIC_L2)
+
+
+def sample_training_vectors(chunks: Iterable[np.ndarray], total: int, sample_size: int, seed: int = 1234) -> np.ndarray:
+    """Uniformly sample rows across vector chunks without materializing all of them"""
+    chunks = list(chunks)
+    if total <= sample_size:
+        return np.vstack([np.asarray(c, dtype=np.float32) for c in chunks])
+
+    rng = np.random.default_rng(seed)
+    picked = np.sort(rng.choice(total, size=sample_size, replace=False))
+    sample, start = [], 0
+    for chunk in chunks:
+        end = start + len(chunk)
+        lo, hi = np.searchsorted(picked, [start, end])
+        if hi > lo:
+            sample.append(np.asarray(chunk[picked[lo:hi] - start], dtype=np.float32))
+        start = end
+    return np.vstack(sample)
+
+
+def build_from_vectors(
+    index_type: str,
+    dimension: int,
+    chunks: List[np.ndarray],
+    storage: str = "float32",
+    sample_size: int = 65_536,
+    ids: Optional[List[np.ndarray]] = None,
+    **params,
+) -> faiss.Index:
+    """
+    Build, train on a sample if needed, and fill an index from row-ordered vector
+    chunks. With ids (one array per chunk), IVF indexes use them as labels.
+    """
+    total = sum(len(c) for c in chunks)
+    index = build_index(index_type, dimension, total, storage=storage, **params)
+    if not index.is_trained:
+        sample = sample_training_vectors(chunks, total, sample_size)
+        logger.info(f"Training {index_type}/{storage} index on {len(sample)} sampled vectors")
+        index.train(sample)
+    native = ids is not None and uses_native_ids(index_type)
+    for n, chunk in enumerate(chunks):
+        if not len(chunk):
+            continue
+        vectors = np.ascontiguousarray(chunk, dtype=np.float32)
+        if native:
+            index.add_with_ids(vectors, np.asarray(ids[n], dtype=np.int64))
+        else:
+            index.add(vectors)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Best-effort reverse mapping from a FAISS index to a configured type"""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return "flat"
+    return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+
+
+def storage_of(index: faiss.Index) -> str:
+    """Best-effort reverse mapping from a FAISS index to its storage mode"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    elif index_type_of(index) != "flat":
+        index = faiss.downcast_index(faiss.extract_index_ivf(index))
+
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    return "float32"
+
+
+def search_parameters(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector: Optional[faiss.IDSelector] = None,
+) -> Optional[faiss.SearchParameters]:
+    """Per-query search knobs for the given index type (None when nothing to set)"""
+    kind = index_type_of(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        # SearchParameters start from FAISS defaults, not the index's own settings
+        params = faiss.SearchParametersIVF()
+        params.nprobe = int(nprobe or faiss.extract_index_ivf(index).nprobe)
+    elif kind == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = int(ef_search or index.hnsw.efSearch)
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if selector is not None:
+        params.sel = selector
+    return params
@@ -0,0 +1,391 @@
+import hashlib
+import mmap
+import os
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import logging
+logger = logging.getLogger("genai")
+
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+DOC_IDS_FILE = "doc_ids.npy"
+SECTIONS_FILE = "sections.npy"
+CHUNK_IDS_FILE = "chunk_ids.npy"
+HASHES_FILE = "hashes.npy"
+VECTORS_FILE = "vectors.npy"
+
+# Metadata filters accepted by DocumentTable.filter_rows / FaissStore.search
+FILTER_KEYS = ("section", "section_prefix", "doc_id")
+
+# Code used for rows whose metadata has no doc_id / section
+MISSING = -1
+
+
+class Vocabulary:
+    """Append-only string <-> int32 code mapping for one metadata column"""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = list(values or [])
+        self._codes: Dict[str, int] = {v: i for i, v in enumerate(self.values)}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def lookup(self, value: str) -> int:
+        """Code of an existing value, or MISSING without adding it"""
+        return self._codes.get(value, MISSING)
+
+    def decode(self, code: int) -> Optional[str]:
+        return None if code == MISSING else self.values[code]
+
+
+def content_hash(doc_id: Optional[str], section: Optional[str], text: str) -> int:
+    """64-bit hash identifying a chunk's content within its document section"""
+    key = f"{doc_id or ''}\x1f{section or ''}\x1f{text}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def content_hashes(texts: Sequence[str], metadatas: Sequence[Dict]) -> np.ndarray:
+    return np.array(
+        [content_hash(m.get("doc_id"), m.get("section"), t) for t, m in zip(texts, metadatas)],
+        dtype=np.uint64,
+    )
+
+
+def _save_array(path: str, array: np.ndarray):
+    with open(path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_columns(
+    path: str,
+    texts: Sequence[str],
+    doc_codes: np.ndarray,
+    section_codes: np.ndarray,
+    chunk_ids: np.ndarray,
+    hashes: np.ndarray,
+):
+    """Write one segment's metadata as a text blob plus fixed-width columns"""
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    with open(os.path.join(path, TEXTS_FILE), "wb") as f:
+        for b in encoded:
+            f.write(b)
+        f.flush()
+        os.fsync(f.fileno())
+
+    _save_array(os.path.join(path, OFFSETS_FILE), offsets)
+    _save_array(os.path.join(path, DOC_IDS_FILE), np.asarray(doc_codes, dtype=np.int32))
+    _save_array(os.path.join(path, SECTIONS_FILE), np.asarray(section_codes, dtype=np.int32))
+    _save_array(os.path.join(path, CHUNK_IDS_FILE), np.asarray(chunk_ids, dtype=np.int64))
+    _save_array(os.path.join(path, HASHES_FILE), np.asarray(hashes, dtype=np.uint64))
+
+
+def concat_columns(path: str, segments: Iterable["ColumnarSegment"], keep: Optional[List[np.ndarray]] = None):
+    """
+    Write the columns of several segments, in order, as one segment.
+    keep optionally gives a boolean row mask per segment (False = drop the row).
+    """
+    segments = list(segments)
+    if keep is None:
+        keep = [np.ones(len(seg), dtype=bool) for seg in segments]
+    offsets = [np.zeros(1, dtype=np.int64)]
+    base = 0
+
+    with open(os.path.join(path, TEXTS_FILE), "wb") as f:
+        for seg, mask in zip(segments, keep):
+            if mask.all():
+                f.write(seg.blob[:])
+                offsets.append(np.asarray(seg.offsets[1:]) + base)
+                base += int(seg.offsets[-1])
+                continue
+            for row in np.flatnonzero(mask):
+                data = seg.blob[int(seg.offsets[row]):int(seg.offsets[row + 1])]
+                f.write(data)
+                base += len(data)
+                offsets.append(np.array([base], dtype=np.int64))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def column(name):
+        return np.concatenate([np.asarray(getattr(seg, name))[mask] for seg, mask in zip(segments, keep)])
+
+    _save_array(os.path.join(path, OFFSETS_FILE), np.concatenate(offsets))
+    _save_array(os.path.join(path, DOC_IDS_FILE), column("doc_codes"))
+    _save_array(os.path.join(path, SECTIONS_FILE), column("section_codes"))
+    _save_array(os.path.join(path, CHUNK_IDS_FILE), column("chunk_ids"))
+    _save_array(os.path.join(path, HASHES_FILE), column("hashes"))
+
+
+def backfill_hashes(path: str, doc_vocab: "Vocabulary", section_vocab: "Vocabulary"):
+    """Compute the hash column of a segment written before content hashes existed"""
+    offsets = np.load(os.path.join(path, OFFSETS_FILE))
+    doc_codes = np.load(os.path.join(path, DOC_IDS_FILE))
+    section_codes = np.load(os.path.join(path, SECTIONS_FILE))
+    with open(os.path.join(path, TEXTS_FILE), "rb") as f:
+        blob = f.read()
+
+    texts = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+    metadatas = [
+        {"doc_id": doc_vocab.decode(int(d)), "section": section_vocab.decode(int(c))}
+        for d, c in zip(doc_codes, section_codes)
+    ]
+    # Written under a temporary name so an interrupted upgrade is simply redone
+    tmp_path = os.path.join(path, f"{HASHES_FILE}.tmp")
+    _save_array(tmp_path, content_hashes(texts, metadatas))
+    os.replace(tmp_path, os.path.join(path, HASHES_FILE))
+
+
+class ColumnarSegment:
+    """Read-only, memory-mapped view over one segment's vectors and metadata columns"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self.doc_codes = np.load(os.path.join(path, DOC_IDS_FILE), mmap_mode="r")
+        self.section_codes = np.load(os.path.join(path, SECTIONS_FILE), mmap_mode="r")
+        self.chunk_ids = np.load(os.path.join(path, CHUNK_IDS_FILE), mmap_mode="r")
+        self.hashes = np.load(os.path.join(path, HASHES_FILE), mmap_mode="r")
+
+        texts_path = os.path.join(path, TEXTS_FILE)
+        if os.path.getsize(texts_path) == 0:
+            self.blob = b""
+        else:
+            with open(texts_path, "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def text(self, i: int) -> str:
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+    def texts(self) -> Iterable[str]:
+        for i in range(len(self)):
+            yield self.text(i)
+
+
+class DocumentTable:
+    """
+    Chunk texts and metadata for the whole store, backed by mmap'd segments.
+
+    Rows are addressed by their position in the table (segment order); each
+    row also carries a stable chunk id that FAISS labels map to. Deleted chunks
+    stay in their segment as tombstones until a merge drops them.
+    """
+
+    def __init__(self, doc_vocab: Vocabulary, section_vocab: Vocabulary):
+        self.doc_vocab = doc_vocab
+        self.section_vocab = section_vocab
+        self.segments: List[ColumnarSegment] = []
+        self.tombstones = np.zeros(0, dtype=np.int64)
+        self._starts = np.zeros(1, dtype=np.int64)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._live: Optional[np.ndarray] = None
+
+    def append_segment(self, segment: ColumnarSegment):
+        self.segments.append(segment)
+        self._starts = np.append(self._starts, self._starts[-1] + len(segment))
+        self._columns = {}
+        self._live = None
+
+    def set_tombstones(self, chunk_ids: np.ndarray):
+        self.tombstones = np.unique(np.asarray(chunk_ids, dtype=np.int64))
+        self._live = None
+
+    def _copy(self) -> "DocumentTable":
+        table = DocumentTable(self.doc_vocab, self.section_vocab)
+        table.segments = list(self.segments)
+        table.tombstones = self.tombstones
+        table._starts = self._starts
+        table._columns = dict(self._columns)
+        table._live = self._live
+        return table
+
+    def with_segment(self, segment: ColumnarSegment) -> "DocumentTable":
+        """Copy of the table with one more segment; the original stays untouched"""
+        table = self._copy()
+        table.segments.append(segment)
+        table._starts = np.append(self._starts, self._starts[-1] + len(segment))
+        # Extend the cached columns instead of re-concatenating every segment
+        table._columns = {
+            name: np.concatenate([values, getattr(segment, name)])
+            for name, values in self._columns.items()
+        }
+        table._live = None
+        return table
+
+    def with_tombstones(self, chunk_ids: np.ndarray) -> "DocumentTable":
+        """Copy of the table with extra deleted chunk ids"""
+        table = self._copy()
+        table.set_tombstones(np.union1d(self.tombstones, np.asarray(chunk_ids, dtype=np.int64)))
+        return table
+
+    def __len__(self) -> int:
+        """Physical rows, including tombstoned ones"""
+        return int(self._starts[-1])
+
+    def __bool__(self) -> bool:
+        return self.live_count > 0
+
+    @property
+    def live(self) -> np.ndarray:
+        """Boolean mask of rows that are not deleted"""
+        if self._live is None:
+            self._live = ~np.isin(self.chunk_ids, self.tombstones)
+        return self._live
+
+    @property
+    def live_count(self) -> int:
+        return int(self.live.sum())
+
+    def _locate(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Row {i} out of range for {len(self)} documents")
+        seg_no = int(np.searchsorted(self._starts, i, side="right")) - 1
+        return self.segments[seg_no], i - int(self._starts[seg_no])
+
+    def text(self, i: int) -> str:
+        seg, row = self._locate(i)
+        return seg.text(row)
+
+    def doc_id(self, i: int) -> Optional[str]:
+        seg, row = self._locate(i)
+        return self.doc_vocab.decode(int(seg.doc_codes[row]))
+
+    def section(self, i: int) -> Optional[str]:
+        seg, row = self._locate(i)
+        return self.section_vocab.decode(int(seg.section_codes[row]))
+
+    def metadata(self, i: int) -> Dict:
+        seg, row = self._locate(i)
+        meta = {}
+        doc_id = self.doc_vocab.decode(int(seg.doc_codes[row]))
+        section = self.section_vocab.decode(int(seg.section_codes[row]))
+        if section is not None:
+            meta["section"] = section
+        if doc_id is not None:
+            meta["doc_id"] = doc_id
+        meta["chunk_id"] = int(seg.chunk_ids[row])
+        return meta
+
+    def rows_of(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Table rows holding the given chunk ids (chunk ids increase with row order)"""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        rows = np.searchsorted(self.chunk_ids, chunk_ids)
+        rows = np.minimum(rows, max(len(self) - 1, 0))
+        if len(self) == 0 or not np.array_equal(self.chunk_ids[rows], chunk_ids):
+            raise KeyError("Unknown chunk id")
+        return rows
+
+    def __getitem__(self, i: int) -> Dict:
+        """Materialize one row in the legacy {"text", "metadata"} shape"""
+        seg, row = self._locate(i)
+        return {"text": seg.text(row), "metadata": self.metadata(i)}
+
+    @property
+    def doc_codes(self) -> np.ndarray:
+        """int32 doc_id codes for every row, in table order"""
+        return self._column("doc_codes", np.int32)
+
+    @property
+    def section_codes(self) -> np.ndarray:
+        """int32 section codes for every row, in table order"""
+        return self._column("section_codes", np.int32)
+
+    @property
+    def chunk_ids(self) -> np.ndarray:
+        """int64 stable chunk ids for every row, in table order"""
+        return self._column("chunk_ids", np.int64)
+
+    @property
+    def hashes(self) -> np.ndarray:
+        """uint64 content hashes for every row, in table order"""
+        return self._column("hashes", np.uint64)
+
+    def live_chunks(self):
+        """(vectors, chunk ids) of the live rows, segment by segment"""
+        for seg in self.segments:
+            keep = ~np.isin(seg.chunk_ids, self.tombstones)
+            if keep.all():
+                yield seg.vectors, np.asarray(seg.chunk_ids)
+            elif keep.any():
+                yield seg.vectors[keep], np.asarray(seg.chunk_ids)[keep]
+
+    def live_hashes(self) -> np.ndarray:
+        return self.hashes[self.live]
+
+    def doc_rows(self, doc_id: str) -> np.ndarray:
+        """Live rows belonging to one document"""
+        code = self.doc_vocab.lookup(doc_id)
+        if code == MISSING:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero((self.doc_codes == code) & self.live).astype(np.int64)
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Gather the stored float32 vectors of the given rows, in the given order"""
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), self.segments[0].vectors.shape[1]), dtype=np.float32)
+        seg_nos = np.searchsorted(self._starts, rows, side="right") - 1
+        for seg_no in np.unique(seg_nos):
+            picked = seg_nos == seg_no
+            out[picked] = self.segments[seg_no].vectors[rows[picked] - self._starts[seg_no]]
+        return out
+
+    def filter_rows(self, filters: Optional[Dict[str, Union[str, List[str]]]]) -> Optional[np.ndarray]:
+        """
+        Live rows matching all given filters, or None when nothing is filtered.
+        Supported keys: section, section_prefix (e.g. "annex_") and doc_id;
+        each value may be a string or a list of alternatives. section and
+        section_prefix both match the section column and are OR-ed together.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v not in (None, "", [])}
+        if not filters:
+            return None
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unsupported metadata filters {sorted(unknown)}, expected {FILTER_KEYS}")
+
+        def as_list(value):
+            return [value] if isinstance(value, str) else list(value)
+
+        mask = self.live.copy()
+        if "section" in filters or "section_prefix" in filters:
+            codes = set()
+            for name in as_list(filters.get("section", [])):
+                codes.add(self.section_vocab.lookup(name))
+            for prefix in as_list(filters.get("section_prefix", [])):
+                codes.update(
+                    code for code, name in enumerate(self.section_vocab.values)
+                    if name.startswith(prefix)
+                )
+            codes.discard(MISSING)
+            mask &= np.isin(self.section_codes, list(codes))
+        if "doc_id" in filters:
+            codes = {self.doc_vocab.lookup(d) for d in as_list(filters["doc_id"])}
+            codes.discard(MISSING)
+            mask &= np.isin(self.doc_codes, list(codes))
+        return np.flatnonzero(mask).astype(np.int64)
+
+    def _column(self, column: str, dtype) -> np.ndarray:
+        if column not in self._columns:
+            if self.segments:
+                values = np.concatenate([getattr(seg, column) for seg in self.segments])
+            else:
+                values = np.zeros(0, dtype=dtype)
+            self._columns[column] = values
+        return self._columns[column]
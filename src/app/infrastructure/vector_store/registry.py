@@ -0,0 +1,84 @@
+"""
+Process-wide registry of embedders and vector stores.
+
+Every consumer (RAGChain, RAGAgent, ...) asks here instead of constructing its
+own FaissStore, so a store directory is loaded once per process and all of
+them see each write as soon as it is published.
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from config.settings import settings
+from src.app.infrastructure.vector_store import index_factory
+from src.app.infrastructure.vector_store.faiss import FaissStore
+import logging
+logger = logging.getLogger("genai")
+
+_lock = threading.Lock()
+_embedders: Dict[Tuple, object] = {}
+_stores: Dict[Tuple, FaissStore] = {}
+
+
+def get_embedder(model: Optional[str] = None, backend: Optional[str] = None):
+    """Shared EmbeddingAdapter for a backend / model (defaults from settings)"""
+    # Imported here: the adapter pulls in the embedding backends and Redis
+    from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+    from src.app.infrastructure.llm.embeddings import create_backend
+
+    backend = backend or settings.embedding_backend
+    model = model or (settings.embedding_model if backend == "openai" else None)
+    with _lock:
+        embedder = _embedders.get((backend, model))
+        if embedder is None:
+            embedder = EmbeddingAdapter(backend=create_backend(backend, model))
+            _embedders[(backend, model)] = embedder
+        return embedder
+
+
+def store_key(
+    persistence_dir: str,
+    model: Optional[str],
+    index_type: Optional[str] = None,
+    storage: Optional[str] = None,
+    read_only: Optional[bool] = None,
+) -> Tuple:
+    """Registry key: same directory and configuration means the same store"""
+    index_type = index_type or settings.faiss_index_type
+    storage = index_factory.effective_storage(index_type, storage or settings.faiss_storage)
+    read_only = settings.vector_store_read_only if read_only is None else read_only
+    return (os.path.realpath(persistence_dir), model, index_type, storage, bool(read_only))
+
+
+def get_vector_store(
+    persistence_dir: str = "vector_db",
+    embedder=None,
+    index_type: Optional[str] = None,
+    storage: Optional[str] = None,
+    read_only: Optional[bool] = None,
+) -> FaissStore:
+    """
+    The process's FaissStore for a directory and configuration, created on
+    first use with the shared embedder unless one is given.
+    """
+    embedder = embedder or get_embedder()
+    key = store_key(persistence_dir, getattr(embedder, "model", None), index_type, storage, read_only)
+    with _lock:
+        store = _stores.get(key)
+        if store is None:
+            store = FaissStore(
+                embedder=embedder,
+                persistence_dir=persistence_dir,
+                index_type=index_type,
+                storage=storage,
+                read_only=read_only,
+            )
+            _stores[key] = store
+            logger.info(f"Registered vector store {key}")
+        return store
+
+
+def clear():
+    """Forget every shared store and embedder (the next get_* call reloads)"""
+    with _lock:
+        _stores.clear()
+        _embedders.clear()
@@ -0,0 +1,283 @@
+"""
+Re-index a vector store at another embedding dimension (see
+settings.embedding_target_dimension) and report the recall kept against the
+full-dimension vectors.
+
+The new store is written next to the old one from the stored vectors
+(truncated and renormalized, which is what text-embedding-3 returns for
+shortened embeddings) or by re-embedding the texts (--reembed, for backends
+where truncation is not equivalent). Chunks written meanwhile are caught up
+under the store's write lock, then the directories are swapped and the store
+reloads; the old one is kept as <store>.full-<timestamp>.
+
+A running API re-indexes its own store through POST /api/v1/vector-store/reindex
+(reindex_in_background): read-only API processes then follow the swap on their
+next refresh, switching to the shortened embedder, and any process opening it
+later does the same (set EMBEDDING_TARGET_DIMENSION to make it explicit). The
+command line is for a store no API or ingestion worker has open: a running
+writer would keep writing to the old directory's manifest, so it refuses to
+run unless --offline confirms they are stopped (restart them afterwards).
+
+    python -m src.app.infrastructure.vector_store.reindex --store vector_db --dimension 512 --offline
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from config.settings import settings
+from src.app.infrastructure.vector_store import index_factory
+from src.app.infrastructure.vector_store.faiss import FaissStore
+from src.app.infrastructure.vector_store.scan import knn_over_chunks
+from src.app.infrastructure.vector_store.segments import SegmentStore
+import logging
+logger = logging.getLogger("genai")
+
+_running: Dict[str, threading.Thread] = {}
+_running_lock = threading.Lock()
+
+
+def dimension_recall(chunks: List[np.ndarray], dimension: int, k: int = 10, n_queries: int = 256) -> float:
+    """
+    recall@k of exact search on truncated vectors against exact search on the
+    full vectors, using sampled stored vectors as queries.
+    """
+    from src.app.infrastructure.llm.embeddings import truncate_embeddings
+
+    total = sum(len(c) for c in chunks)
+    queries = index_factory.sample_training_vectors(chunks, total, min(n_queries, total), seed=99)
+    truth = knn_over_chunks(queries, chunks, k)[1]
+    reduced = [truncate_embeddings(c, dimension) for c in chunks]
+    found = knn_over_chunks(truncate_embeddings(queries, dimension), reduced, k)[1]
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / float(truth.size)
+
+
+def _copy_rows(
+    source: SegmentStore,
+    dest: SegmentStore,
+    embedder,
+    reembed: bool,
+    since_id: int = 0,
+    until_id: Optional[int] = None,
+) -> int:
+    """Append live source rows with since_id <= chunk id < until_id to dest at the embedder's dimension"""
+    from src.app.infrastructure.llm.embeddings import truncate_embeddings
+
+    with source._lock:
+        # Opened under the lock; the mappings stay valid if a merge later removes the files
+        opened = list(source.iter_segments())
+        tombstones = source.tombstones
+
+    copied = 0
+    for vectors, columns in opened:
+        chunk_ids = np.asarray(columns.chunk_ids)
+        wanted = (chunk_ids >= since_id) & ~np.isin(chunk_ids, tombstones)
+        if until_id is not None:
+            wanted &= chunk_ids < until_id
+        rows = np.flatnonzero(wanted)
+        for start in range(0, len(rows), settings.embedding_batch_size * 16):
+            batch = rows[start:start + settings.embedding_batch_size * 16]
+            texts = [columns.text(int(i)) for i in batch]
+            metadatas = [
+                {
+                    "doc_id": source.doc_vocab.decode(int(columns.doc_codes[i])),
+                    "section": source.section_vocab.decode(int(columns.section_codes[i])),
+                }
+                for i in batch
+            ]
+            if reembed:
+                new_vectors = np.asarray(embedder.embed(texts), dtype=np.float32)
+            else:
+                new_vectors = truncate_embeddings(vectors[batch], embedder.embedding_dim)
+            dest.append(new_vectors, texts, metadatas, np.asarray(columns.hashes)[batch], chunk_ids[batch])
+            copied += len(batch)
+    return copied
+
+
+def _quiesce(store: FaissStore):
+    """Take the write lock with no background rebuild or segment merge running"""
+    while True:
+        store._write_lock.acquire()
+        thread = store._rebuild_thread
+        merging = store.segments._merging
+        if not merging and (thread is None or not thread.is_alive()):
+            return
+        store._write_lock.release()
+        if thread is not None:
+            thread.join()
+        time.sleep(0.05)
+
+
+def shortened_embedder(embedder, dimension: int):
+    """
+    `embedder` with its vectors cut down to `dimension`, as a store re-indexed
+    by truncation expects them (None if it has no backend to wrap)
+    """
+    from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+    from src.app.infrastructure.llm.embeddings import TruncatedBackend
+
+    backend = getattr(embedder, "embedder", None)
+    if backend is None:
+        return None
+    return EmbeddingAdapter(backend=TruncatedBackend(backend, dimension))
+
+
+def _check_reindex(store: FaissStore, embedder, reembed: bool) -> str:
+    """Raise if `store` cannot be re-indexed for `embedder`; returns the new store's directory"""
+    store._check_writable()
+    if embedder.embedding_dim > store.dimension:
+        raise ValueError(f"Cannot grow embeddings from {store.dimension} to {embedder.embedding_dim} dimensions")
+    source_model = (store.segments.embedding or {}).get("model") or store.embedder.model
+    if not reembed and not embedder.model.startswith(f"{source_model}@"):
+        raise ValueError(f"{embedder.model} is not a shortened {source_model}; use reembed=True")
+    dest_root = f"{os.path.normpath(store.persistence_dir)}.reindex-{embedder.embedding_dim}"
+    if os.path.exists(dest_root):
+        raise ValueError(f"{dest_root} already exists (an interrupted re-index?); remove it first")
+    return dest_root
+
+
+def reindex(store: FaissStore, embedder, reembed: bool = False, k: int = 10, n_queries: int = 256) -> Dict:
+    """
+    Rebuild `store` for `embedder` (e.g. one with a reduced target dimension)
+    and swap it in. Searches keep using the old snapshot until the swap; writes
+    are only blocked while the last chunks are caught up.
+    """
+    dest_root = _check_reindex(store, embedder, reembed)
+    root = os.path.normpath(store.persistence_dir)
+    dimension_before = store.dimension
+
+    chunks, _ = store.segments.live_vectors()
+    chunks = [c for c in chunks if len(c)]
+    recall = dimension_recall(chunks, embedder.embedding_dim, k, n_queries) if chunks and not reembed else None
+
+    swapped = False
+    try:
+        dest = SegmentStore(dest_root)
+        dest.record_embedding(embedder.model, embedder.embedding_dim)
+        copied_upto = store.segments.manifest["next_chunk_id"]
+        rows = _copy_rows(store.segments, dest, embedder, reembed, until_id=copied_upto)
+        logger.info(f"Re-index copied {rows} chunks into {dest_root}")
+
+        _quiesce(store)
+        try:
+            # Catch up with writes made during the copy
+            rows += _copy_rows(store.segments, dest, embedder, reembed, since_id=copied_upto)
+            deleted = np.intersect1d(store.segments.tombstones, np.concatenate(
+                [np.asarray(columns.chunk_ids) for _, columns in dest.iter_segments()] or [np.zeros(0, dtype=np.int64)]
+            ))
+            if len(deleted):
+                dest.add_tombstones(deleted)
+
+            backup = f"{root}.full-{time.strftime('%Y%m%d%H%M%S')}"
+            os.rename(root, backup)
+            try:
+                os.rename(dest_root, root)
+            except OSError:
+                os.rename(backup, root)
+                raise
+            swapped = True
+            store.reload(embedder)
+        finally:
+            store._write_lock.release()
+    except Exception:
+        # The store is untouched until the swap; a half-built copy would block every later attempt
+        if not swapped:
+            shutil.rmtree(dest_root, ignore_errors=True)
+        raise
+
+    report = {
+        "rows": int(store.count()),
+        "dimension_before": int(dimension_before),
+        "dimension_after": int(embedder.embedding_dim),
+        "model": embedder.model,
+        "vector_bytes_before": int(dimension_before * 4 * store.count()),
+        "vector_bytes_after": int(embedder.embedding_dim * 4 * store.count()),
+        "method": "reembed" if reembed else "truncate",
+        f"recall@{k}": round(recall, 4) if recall is not None else None,
+        "backup": backup,
+    }
+    logger.info(f"Re-index done: {report}")
+    return report
+
+
+def reindex_in_background(
+    store: FaissStore,
+    embedder,
+    reembed: bool = False,
+    done: Optional[Callable[[Optional[Dict], Optional[Exception]], None]] = None,
+) -> threading.Thread:
+    """
+    Run reindex() on a daemon thread, one per store at a time. Invalid
+    requests raise here (ValueError, RuntimeError); done(report, error) is
+    called when the thread finishes.
+    """
+    _check_reindex(store, embedder, reembed)
+    root = os.path.realpath(store.persistence_dir)
+
+    def run():
+        report, error = None, None
+        try:
+            report = reindex(store, embedder, reembed)
+        except Exception as e:
+            logger.error(f"Re-index of {store.persistence_dir} failed: {e}")
+            error = e
+        finally:
+            with _running_lock:
+                _running.pop(root, None)
+        if done is not None:
+            done(report, error)
+
+    with _running_lock:
+        running = _running.get(root)
+        if running is not None and running.is_alive():
+            raise RuntimeError(f"A re-index of {store.persistence_dir} is already running")
+        thread = threading.Thread(target=run, name="vector-reindex", daemon=True)
+        _running[root] = thread
+        thread.start()
+    return thread
+
+
+def main(argv=None):
+    from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+    from src.app.infrastructure.llm.embeddings import create_backend
+
+    parser = argparse.ArgumentParser(description="Re-index a vector store at another embedding dimension")
+    parser.add_argument("--store", required=True, help="segment store directory (e.g. vector_db)")
+    parser.add_argument("--dimension", type=int, default=None,
+                        help="target dimension (default: settings.embedding_target_dimension)")
+    parser.add_argument("--reembed", action="store_true", help="re-embed the texts instead of truncating")
+    parser.add_argument("--k", type=int, default=10, help="k used for the recall report")
+    parser.add_argument("--queries", type=int, default=256, help="sampled queries for the recall report")
+    parser.add_argument("--offline", action="store_true",
+                        help="confirm no API process has the store open (a running API re-indexes "
+                             "through POST /api/v1/vector-store/reindex instead)")
+    args = parser.parse_args(argv)
+
+    if not args.offline:
+        parser.error(
+            "re-indexing swaps the store directory under any process using it: stop the API and pass "
+            "--offline, or call POST /api/v1/vector-store/reindex on the running API"
+        )
+
+    target = args.dimension if args.dimension is not None else settings.embedding_target_dimension
+    if not target:
+        parser.error("no target dimension (--dimension or EMBEDDING_TARGET_DIMENSION)")
+
+    # Open the store with the embedder it was built with, then move it to the new one
+    current = SegmentStore(args.store, read_only=True).embedding or {}
+    full = EmbeddingAdapter(backend=create_backend(target_dimension=0))
+    if current.get("model") and current["model"] != full.model:
+        parser.error(f"{args.store} holds {current['model']} vectors, configured backend is {full.model}")
+    store = FaissStore(full, persistence_dir=args.store, read_only=False)
+    reduced = EmbeddingAdapter(backend=create_backend(target_dimension=target))
+    report = reindex(store, reduced, reembed=args.reembed, k=args.k, n_queries=args.queries)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
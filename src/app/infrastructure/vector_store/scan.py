@@ -0,0 +1,65 @@
+import faiss
+import numpy as np
+from typing import List, Optional, Tuple
+import logging
+logger = logging.getLogger("genai")
+
+
+def knn_over_chunks(
+    queries: np.ndarray,
+    chunks: List[np.ndarray],
+    k: int,
+    exclude: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k (distances, row ids) over row-ordered vector chunks, without
+    stacking them in memory. Rows listed in the sorted `exclude` array are skipped.
+    """
+    exclude = np.zeros(0, dtype=np.int64) if exclude is None else exclude
+    best_d = np.full((len(queries), 0), np.inf, dtype=np.float32)
+    best_i = np.zeros((len(queries), 0), dtype=np.int64)
+    start = 0
+    for chunk in chunks:
+        end = start + len(chunk)
+        lo, hi = np.searchsorted(exclude, [start, end])
+        # Fetch enough extra neighbours to still have k after dropping excluded rows
+        wanted = min(k + int(hi - lo), len(chunk))
+        if wanted:
+            d, i = faiss.knn(queries, np.ascontiguousarray(chunk, dtype=np.float32), wanted)
+            i = i + start
+            if hi > lo:
+                dead = np.isin(i, exclude[lo:hi])
+                d[dead] = np.inf
+                i[dead] = -1
+            best_d = np.hstack([best_d, d])
+            best_i = np.hstack([best_i, i])
+            order = np.argsort(best_d, axis=1, kind="stable")[:, :k]
+            best_d = np.take_along_axis(best_d, order, axis=1)
+            best_i = np.take_along_axis(best_i, order, axis=1)
+        start = end
+
+    if best_i.shape[1] < k:
+        pad = k - best_i.shape[1]
+        best_d = np.hstack([best_d, np.full((len(queries), pad), np.inf, dtype=np.float32)])
+        best_i = np.hstack([best_i, np.full((len(queries), pad), -1, dtype=np.int64)])
+    best_i[np.isinf(best_d)] = -1
+    return best_d, best_i
+
+
+class SegmentScanIndex:
+    """
+    Read-only exact L2 "index" over the memory-mapped segment vectors.
+
+    Nothing is copied into process memory: every search scans the vectors.npy
+    mappings, so all workers on a host share the same page-cache pages. Labels
+    are row positions in segment order.
+    """
+
+    def __init__(self, chunks: List[np.ndarray]):
+        self.chunks = list(chunks)
+        self.d = int(self.chunks[0].shape[1]) if self.chunks else 0
+        self.ntotal = sum(len(c) for c in self.chunks)
+        self.is_trained = True
+
+    def search(self, queries: np.ndarray, k: int, exclude: Optional[np.ndarray] = None):
+        return knn_over_chunks(queries, self.chunks, k, exclude)
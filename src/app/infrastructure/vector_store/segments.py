@@ -0,0 +1,492 @@
+import io
+import json
+import os
+import pickle
+import shutil
+import threading
+import faiss
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from src.app.infrastructure.vector_store.metadata import (
+    HASHES_FILE,
+    ColumnarSegment,
+    DocumentTable,
+    Vocabulary,
+    backfill_hashes,
+    concat_columns,
+    content_hashes,
+    write_columns,
+)
+import logging
+logger = logging.getLogger("genai")
+
+MANIFEST_NAME = "manifest.json"
+SEGMENTS_DIR = "segments"
+TOMBSTONES_NAME = "tombstones.npy"
+FORMAT_VERSION = 3
+
+# Distance every index in the store uses (faiss.METRIC_L2)
+METRIC = "l2"
+
+
+def _fsync_dir(path: str):
+    """Flush a directory entry to disk (no-op where unsupported, e.g. Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Write a file so readers see either the old or the new content, never a mix"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(path) or ".")
+
+
+def atomic_save_array(path: str, array: np.ndarray):
+    buf = io.BytesIO()
+    np.save(buf, array)
+    atomic_write_bytes(path, buf.getvalue())
+
+
+class SegmentStore:
+    """
+    Append-only on-disk layout for a vector store.
+
+    Every add is written as a new immutable segment directory. The manifest
+    lists the live segments in row order and is replaced atomically, so a crash
+    mid-write leaves at most an orphaned segment that is removed on next open.
+    Deleted chunk ids are kept in tombstones.npy until a merge drops their rows.
+    The manifest also records the embedding model, dimension, metric and live
+    chunk count, so a store can be validated at startup without embedding calls.
+
+    A read-only store never touches the directory (no orphan cleanup, upgrades
+    or writes), so query workers can open it while another process ingests.
+    """
+
+    def __init__(self, root: str, read_only: bool = False):
+        self.root = root
+        self.read_only = read_only
+        self.segments_dir = os.path.join(root, SEGMENTS_DIR)
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.tombstones_path = os.path.join(root, TOMBSTONES_NAME)
+        if not read_only:
+            os.makedirs(self.segments_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._merging = False
+        self.manifest = self._read_manifest()
+        self.doc_vocab = Vocabulary(self.manifest["vocab"]["doc_id"])
+        self.section_vocab = Vocabulary(self.manifest["vocab"]["section"])
+        if read_only:
+            if self.manifest["format_version"] < FORMAT_VERSION:
+                raise ValueError(
+                    f"Vector store {root} uses format {self.manifest['format_version']}; "
+                    f"open it once read-write to upgrade it to {FORMAT_VERSION}"
+                )
+        else:
+            self._remove_orphans()
+            if self.manifest["format_version"] < FORMAT_VERSION:
+                self._upgrade_segments()
+        self.tombstones = (
+            np.load(self.tombstones_path) if os.path.exists(self.tombstones_path)
+            else np.zeros(0, dtype=np.int64)
+        )
+        if "count" not in self.manifest:
+            self._count_live_chunks()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    @property
+    def segments(self) -> List[Dict]:
+        return list(self.manifest["segments"])
+
+    def _read_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {
+                "format_version": FORMAT_VERSION,
+                "dimension": None,
+                "next_segment": 1,
+                "next_chunk_id": 0,
+                "count": 0,
+                "embedding": None,
+                "segments": [],
+                "vocab": {"doc_id": [], "section": []},
+            }
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version", 0) > FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported vector store format {manifest['format_version']} "
+                f"(this build reads up to {FORMAT_VERSION})"
+            )
+        manifest.setdefault("vocab", {"doc_id": [], "section": []})
+        return manifest
+
+    def _write_manifest(self, manifest: Dict):
+        if self.read_only:
+            raise RuntimeError(f"Vector store {self.root} is opened read-only")
+        manifest["vocab"] = {
+            "doc_id": list(self.doc_vocab.values),
+            "section": list(self.section_vocab.values),
+        }
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        atomic_write_bytes(self.manifest_path, data)
+        self.manifest = manifest
+
+    def _count_live_chunks(self):
+        """Fill in the live chunk count for manifests written before it was recorded"""
+        count = 0
+        for seg in self.manifest["segments"]:
+            chunk_ids = np.load(os.path.join(self._segment_path(seg["name"]), "chunk_ids.npy"), mmap_mode="r")
+            count += int((~np.isin(chunk_ids, self.tombstones)).sum())
+        manifest = dict(self.manifest)
+        manifest["count"] = count
+        if self.read_only:
+            self.manifest = manifest
+        else:
+            self._write_manifest(manifest)
+
+    @property
+    def embedding(self) -> Optional[Dict]:
+        """{"model", "dimension", "metric"} of the vectors in this store, if recorded"""
+        return self.manifest.get("embedding")
+
+    def record_embedding(self, model: Optional[str], dimension: int):
+        with self._lock:
+            info = {"model": model, "dimension": int(dimension), "metric": METRIC}
+            if self.manifest.get("embedding") == info:
+                return
+            manifest = dict(self.manifest)
+            manifest["embedding"] = info
+            manifest["dimension"] = manifest.get("dimension") or int(dimension)
+            self._write_manifest(manifest)
+        logger.info(f"Recorded embedding {info} in {self.manifest_path}")
+
+    def _remove_orphans(self):
+        """Delete segment dirs and index files left behind by an interrupted write or merge"""
+        live = {seg["name"] for seg in self.manifest["segments"]}
+        for name in os.listdir(self.segments_dir):
+            if name not in live:
+                shutil.rmtree(os.path.join(self.segments_dir, name), ignore_errors=True)
+                logger.warning(f"Removed orphaned segment {name}")
+
+        entry = self.manifest.get("index") or {}
+        live_index = {entry.get("file"), entry.get("label_ids")}
+        for name in os.listdir(self.root):
+            if name.startswith("index_") and name not in live_index:
+                os.remove(os.path.join(self.root, name))
+                logger.warning(f"Removed orphaned index file {name}")
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.segments_dir, name)
+
+    def _write_segment_files(self, name: str, vectors: np.ndarray, write_metadata):
+        """Write segment files into a temp dir and rename it into place"""
+        tmp_dir = self._segment_path(f".tmp_{name}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        with open(os.path.join(tmp_dir, "vectors.npy"), "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+            f.flush()
+            os.fsync(f.fileno())
+
+        write_metadata(tmp_dir)
+
+        os.rename(tmp_dir, self._segment_path(name))
+        _fsync_dir(self.segments_dir)
+
+    def append(
+        self,
+        vectors: np.ndarray,
+        texts: Sequence[str],
+        metadatas: Sequence[Dict],
+        hashes: Optional[np.ndarray] = None,
+        chunk_ids: Optional[np.ndarray] = None,
+    ) -> ColumnarSegment:
+        """
+        Persist only the new rows as a segment and publish it in the manifest.
+        New rows get the next stable chunk ids unless explicit ids are given.
+        """
+        if not (len(vectors) == len(texts) == len(metadatas)):
+            raise ValueError(
+                f"Segment size mismatch: {len(vectors)} vectors, {len(texts)} texts"
+            )
+        if hashes is None:
+            hashes = content_hashes(texts, metadatas)
+
+        with self._lock:
+            manifest = dict(self.manifest)
+            dimension = int(vectors.shape[1])
+            if manifest["dimension"] not in (None, dimension):
+                raise ValueError(
+                    f"Embedding dimension mismatch: store={manifest['dimension']}, new={dimension}"
+                )
+
+            if chunk_ids is None:
+                start = manifest["next_chunk_id"]
+                chunk_ids = np.arange(start, start + len(texts), dtype=np.int64)
+            chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+            if len(chunk_ids) and chunk_ids[0] < manifest["next_chunk_id"]:
+                raise ValueError("Chunk ids must increase across segments")
+
+            doc_codes = np.array(
+                [self.doc_vocab.encode(m.get("doc_id")) for m in metadatas], dtype=np.int32
+            )
+            section_codes = np.array(
+                [self.section_vocab.encode(m.get("section")) for m in metadatas], dtype=np.int32
+            )
+
+            name = f"seg_{manifest['next_segment']:06d}"
+            self._write_segment_files(
+                name,
+                vectors,
+                lambda path: write_columns(path, texts, doc_codes, section_codes, chunk_ids, hashes),
+            )
+
+            manifest["dimension"] = dimension
+            manifest["next_segment"] = manifest["next_segment"] + 1
+            if len(chunk_ids):
+                manifest["next_chunk_id"] = int(chunk_ids[-1]) + 1
+            manifest["segments"] = manifest["segments"] + [{"name": name, "count": len(texts)}]
+            manifest["count"] = manifest.get("count", 0) + len(texts)
+            self._write_manifest(manifest)
+
+        logger.info(f"Wrote segment {name} with {len(texts)} rows")
+        return ColumnarSegment(self._segment_path(name))
+
+    def add_tombstones(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Mark chunk ids as deleted; returns the full tombstone set"""
+        with self._lock:
+            chunk_ids = np.setdiff1d(np.asarray(chunk_ids, dtype=np.int64), self.tombstones)
+            tombstones = np.union1d(self.tombstones, chunk_ids)
+            self._write_tombstones(tombstones)
+            manifest = dict(self.manifest)
+            manifest["count"] = max(manifest.get("count", 0) - len(chunk_ids), 0)
+            self._write_manifest(manifest)
+            return tombstones
+
+    def _write_tombstones(self, tombstones: np.ndarray):
+        atomic_save_array(self.tombstones_path, tombstones.astype(np.int64))
+        self.tombstones = tombstones
+
+    def read_segment(self, name: str, mmap: bool = True) -> Tuple[np.ndarray, ColumnarSegment]:
+        path = self._segment_path(name)
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        return vectors, ColumnarSegment(path)
+
+    def iter_segments(self) -> Iterator[Tuple[np.ndarray, ColumnarSegment]]:
+        for seg in self.segments:
+            yield self.read_segment(seg["name"])
+
+    def live_vectors(self) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Vectors and chunk ids of every non-deleted row, segment by segment"""
+        with self._lock:
+            chunks, ids = [], []
+            for seg in self.manifest["segments"]:
+                vectors, columns = self.read_segment(seg["name"])
+                chunk_ids = np.asarray(columns.chunk_ids)
+                keep = ~np.isin(chunk_ids, self.tombstones)
+                chunks.append(vectors if keep.all() else vectors[keep])
+                ids.append(chunk_ids[keep])
+            return chunks, ids
+
+    def write_index(
+        self,
+        index: faiss.Index,
+        covered_id: int,
+        index_type: str,
+        storage: str = "float32",
+        label_ids: Optional[np.ndarray] = None,
+    ):
+        """
+        Checkpoint a trained index holding every chunk id below covered_id.
+        Chunks added after the checkpoint stay only in segments and are re-added
+        on load. label_ids maps FAISS labels to chunk ids for indexes that number
+        their vectors by position.
+        """
+        with self._lock:
+            manifest = dict(self.manifest)
+            number = manifest.get("next_index", 1)
+            name = f"index_{number:06d}.faiss"
+            path = os.path.join(self.root, name)
+
+            faiss.write_index(index, f"{path}.tmp")
+            with open(f"{path}.tmp", "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(f"{path}.tmp", path)
+
+            ids_name = None
+            if label_ids is not None:
+                ids_name = f"index_{number:06d}.ids.npy"
+                atomic_save_array(os.path.join(self.root, ids_name), np.asarray(label_ids, dtype=np.int64))
+
+            previous = manifest.get("index") or {}
+            manifest["next_index"] = number + 1
+            manifest["index"] = {
+                "file": name,
+                "label_ids": ids_name,
+                "type": index_type,
+                "storage": storage,
+                "covered_id": int(covered_id),
+            }
+            self._write_manifest(manifest)
+
+        for old in (previous.get("file"), previous.get("label_ids")):
+            if old:
+                try:
+                    os.remove(os.path.join(self.root, old))
+                except OSError:
+                    pass
+        logger.info(f"Checkpointed {index_type}/{storage} index up to chunk {covered_id} to {name}")
+
+    def read_index(self, mmap: bool = False) -> Tuple[Optional[faiss.Index], int, Optional[np.ndarray]]:
+        """
+        Return the checkpointed index, the chunk id it covers up to, and its label
+        map. With mmap=True the index is mapped read-only instead of copied, so
+        processes on one host share its pages; it must then never be modified.
+        """
+        entry = self.manifest.get("index")
+        if not entry:
+            return None, 0, None
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(os.path.join(self.root, entry["file"]), flags)
+        label_ids = None
+        if entry.get("label_ids"):
+            label_ids = np.load(
+                os.path.join(self.root, entry["label_ids"]), mmap_mode="r" if mmap else None
+            )
+        return index, self.index_covered_id, label_ids
+
+    @property
+    def index_covered_id(self) -> int:
+        """Chunk ids below this are in the index checkpoint (unless deleted)"""
+        entry = self.manifest.get("index") or {}
+        # Format 2 checkpoints counted rows, which were also the chunk ids
+        return int(entry.get("covered_id", entry.get("rows", 0)))
+
+    def new_table(self) -> DocumentTable:
+        table = DocumentTable(self.doc_vocab, self.section_vocab)
+        table.set_tombstones(self.tombstones)
+        return table
+
+    def _upgrade_segments(self):
+        """
+        Bring older segments up to the current format: format 1 pickled its
+        documents (rewritten as columns), format 2 had no content hashes.
+        """
+        with self._lock:
+            next_chunk_id = 0
+            for seg in self.segments:
+                path = self._segment_path(seg["name"])
+                docs_path = os.path.join(path, "documents.pkl")
+                if os.path.exists(docs_path):
+                    with open(docs_path, "rb") as f:
+                        documents = pickle.load(f)
+                    texts = [doc.get("text", "") for doc in documents]
+                    metadatas = [doc.get("metadata", {}) for doc in documents]
+                    write_columns(
+                        path,
+                        texts,
+                        np.array([self.doc_vocab.encode(m.get("doc_id")) for m in metadatas], dtype=np.int32),
+                        np.array([self.section_vocab.encode(m.get("section")) for m in metadatas], dtype=np.int32),
+                        np.array([m.get("chunk_id", i) for i, m in enumerate(metadatas)], dtype=np.int64),
+                        content_hashes(texts, metadatas),
+                    )
+                    os.remove(docs_path)
+                elif not os.path.exists(os.path.join(path, HASHES_FILE)):
+                    backfill_hashes(path, self.doc_vocab, self.section_vocab)
+
+                chunk_ids = np.load(os.path.join(path, "chunk_ids.npy"), mmap_mode="r")
+                if len(chunk_ids):
+                    next_chunk_id = max(next_chunk_id, int(chunk_ids[-1]) + 1)
+
+            manifest = dict(self.manifest)
+            manifest.setdefault("next_chunk_id", next_chunk_id)
+            manifest["format_version"] = FORMAT_VERSION
+            self._write_manifest(manifest)
+        logger.info(f"Upgraded {len(self.segments)} segments to format {FORMAT_VERSION}")
+
+    def merge(self, max_segments: int = 1) -> bool:
+        """
+        Compact the oldest segments into one, dropping tombstoned rows. New
+        segments appended while the merge runs are kept after the merged one,
+        so row order is preserved.
+        """
+        with self._lock:
+            if self._merging:
+                return False
+            segments = self.segments
+            if len(segments) <= max_segments:
+                return False
+            self._merging = True
+            to_merge = segments[:len(segments) - max_segments + 1]
+            name = f"seg_{self.manifest['next_segment']:06d}"
+            manifest = dict(self.manifest)
+            manifest["next_segment"] = manifest["next_segment"] + 1
+            self._write_manifest(manifest)
+
+            tombstones = self.tombstones
+
+        try:
+            vectors, columns, keep = [], [], []
+            for seg in to_merge:
+                seg_vectors, seg_columns = self.read_segment(seg["name"])
+                mask = ~np.isin(seg_columns.chunk_ids, tombstones)
+                vectors.append(np.asarray(seg_vectors)[mask])
+                columns.append(seg_columns)
+                keep.append(mask)
+            self._write_segment_files(
+                name, np.vstack(vectors), lambda path: concat_columns(path, columns, keep)
+            )
+            count = int(sum(mask.sum() for mask in keep))
+            dropped = np.concatenate(
+                [np.asarray(c.chunk_ids)[~mask] for c, mask in zip(columns, keep)]
+            )
+
+            with self._lock:
+                merged_names = {seg["name"] for seg in to_merge}
+                manifest = dict(self.manifest)
+                manifest["segments"] = [{"name": name, "count": count}] + [
+                    seg for seg in manifest["segments"] if seg["name"] not in merged_names
+                ]
+                self._write_manifest(manifest)
+                # The index checkpoint may still hold deleted chunks it covers;
+                # their tombstones stay so the next load removes them again
+                dropped = dropped[dropped >= self.index_covered_id]
+                if len(dropped):
+                    self._write_tombstones(np.setdiff1d(self.tombstones, dropped))
+
+            for seg in to_merge:
+                shutil.rmtree(self._segment_path(seg["name"]), ignore_errors=True)
+            logger.info(f"Merged {len(to_merge)} segments into {name} ({count} rows)")
+            return True
+        except Exception as e:
+            shutil.rmtree(self._segment_path(f".tmp_{name}"), ignore_errors=True)
+            logger.error(f"Segment merge failed: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._merging = False
+
+    def merge_in_background(self, threshold: int) -> Optional[threading.Thread]:
+        """Start a merge thread once the segment count passes the threshold"""
+        if len(self.manifest["segments"]) <= threshold or self._merging:
+            return None
+        thread = threading.Thread(target=self.merge, name="segment-merge", daemon=True)
+        thread.start()
+        return thread
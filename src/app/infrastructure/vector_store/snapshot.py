@@ -0,0 +1,184 @@
+import faiss
+import numpy as np
+from typing import Optional, Sequence, Tuple
+from src.app.infrastructure.vector_store import index_factory
+from src.app.infrastructure.vector_store.metadata import DocumentTable
+from src.app.infrastructure.vector_store.scan import SegmentScanIndex
+import logging
+logger = logging.getLogger("genai")
+
+EMPTY_IDS = np.zeros(0, dtype=np.int64)
+
+
+def add_to_index(index: faiss.Index, label_ids: Optional[np.ndarray], vectors: np.ndarray, chunk_ids: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Add vectors to an index that is not published yet. IVF indexes are labeled
+    with chunk ids (label_ids is None); others number vectors by position and
+    the returned label_ids maps each label to its chunk id.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+    if label_ids is None:
+        index.add_with_ids(vectors, chunk_ids)
+        return None
+    index.add(vectors)
+    return np.concatenate([label_ids, chunk_ids])
+
+
+def ids_to_labels(label_ids: Optional[np.ndarray], chunk_ids: np.ndarray) -> np.ndarray:
+    """FAISS labels of the given chunk ids; ids not in the index are dropped"""
+    chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+    if label_ids is None:
+        return chunk_ids
+    if not len(label_ids):
+        return EMPTY_IDS
+    # label_ids grows with chunk ids and removals keep its order
+    labels = np.minimum(np.searchsorted(label_ids, chunk_ids), len(label_ids) - 1)
+    return labels[label_ids[labels] == chunk_ids]
+
+
+def remove_from_index(index: faiss.Index, label_ids: Optional[np.ndarray], chunk_ids: np.ndarray):
+    """
+    Drop chunks from an index that is not published yet. Returns the new
+    label_ids and the labels that could not be removed (HNSW graphs), which
+    searches must then exclude.
+    """
+    labels = ids_to_labels(label_ids, chunk_ids)
+    if not len(labels):
+        return label_ids, EMPTY_IDS
+    try:
+        index.remove_ids(faiss.IDSelectorBatch(labels))
+    except RuntimeError:
+        return label_ids, np.unique(labels)
+    if label_ids is not None:
+        label_ids = np.delete(label_ids, labels)
+    return label_ids, EMPTY_IDS
+
+
+class IndexSnapshot:
+    """
+    Immutable search state: the document table, the main index and small flat
+    delta indexes holding chunks added since the main index was built.
+
+    Queries take the current snapshot once and only use it, so they never see
+    a half-applied write. Writers never touch a published snapshot: they derive
+    the next one (with_added / with_deleted, or a background rebuild that folds
+    the deltas into a new main index) and swap it in with one assignment.
+    """
+
+    def __init__(
+        self,
+        documents: DocumentTable,
+        index,
+        index_kind: Tuple[str, str],
+        label_ids: Optional[np.ndarray],
+        covered_id: int,
+        deltas: Sequence[Tuple[faiss.Index, np.ndarray]] = (),
+        dead_labels: Optional[np.ndarray] = None,
+    ):
+        self.documents = documents
+        self.index = index
+        self.index_kind = index_kind
+        self.label_ids = label_ids  # None: FAISS labels are the chunk ids (IVF)
+        self.covered_id = covered_id  # chunk ids below this were built into `index`
+        self.deltas = tuple(deltas)
+        self.dead_labels = EMPTY_IDS if dead_labels is None else dead_labels
+
+    @property
+    def delta_rows(self) -> int:
+        return sum(delta.ntotal for delta, _ in self.deltas)
+
+    def _replace(self, **changes) -> "IndexSnapshot":
+        state = dict(
+            documents=self.documents,
+            index=self.index,
+            index_kind=self.index_kind,
+            label_ids=self.label_ids,
+            covered_id=self.covered_id,
+            deltas=self.deltas,
+            dead_labels=self.dead_labels,
+        )
+        state.update(changes)
+        return IndexSnapshot(**state)
+
+    def with_added(self, documents: DocumentTable, vectors: np.ndarray, chunk_ids: np.ndarray) -> "IndexSnapshot":
+        delta = faiss.IndexFlatL2(int(vectors.shape[1]))
+        delta.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        return self._replace(
+            documents=documents,
+            deltas=self.deltas + ((delta, np.asarray(chunk_ids, dtype=np.int64)),),
+        )
+
+    def with_deleted(self, documents: DocumentTable, chunk_ids: np.ndarray) -> "IndexSnapshot":
+        """Main-index labels are excluded at search time; deltas are copied without the chunks"""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        in_main = chunk_ids[chunk_ids < self.covered_id]
+        dead = np.union1d(self.dead_labels, ids_to_labels(self.label_ids, in_main))
+
+        deltas = []
+        for delta, ids in self.deltas:
+            gone = np.isin(ids, chunk_ids)
+            if gone.any():
+                delta = faiss.clone_index(delta)
+                delta.remove_ids(faiss.IDSelectorBatch(np.flatnonzero(gone)))
+                ids = ids[~gone]
+            deltas.append((delta, ids))
+        return self._replace(documents=documents, deltas=deltas, dead_labels=dead)
+
+    def labels_to_rows(self, labels: np.ndarray) -> np.ndarray:
+        """Table rows of FAISS result labels, keeping -1 for empty slots"""
+        rows = np.full(labels.shape, -1, dtype=np.int64)
+        found = labels != -1
+        ids = labels[found] if self.label_ids is None else self.label_ids[labels[found]]
+        rows[found] = self.documents.rows_of(ids)
+        return rows
+
+    def search(self, queries: np.ndarray, k: int, nprobe=None, ef_search=None, rows: Optional[np.ndarray] = None):
+        """
+        ANN search over the main index plus the deltas, optionally limited to the
+        given live rows. Returns distances and table rows.
+        """
+        if not self.index.ntotal:
+            # FAISS answers k=1 on an empty flat index with label 0, not -1
+            distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+            labels = np.full((len(queries), k), -1, dtype=np.int64)
+        elif isinstance(self.index, SegmentScanIndex):
+            distances, labels = self.index.search(queries, k, exclude=self.dead_labels)
+        else:
+            if rows is not None:
+                selector = faiss.IDSelectorBatch(ids_to_labels(self.label_ids, self.documents.chunk_ids[rows]))
+            elif len(self.dead_labels):
+                dead = faiss.IDSelectorBatch(self.dead_labels)
+                selector = faiss.IDSelectorNot(dead)
+            else:
+                selector = None
+            params = index_factory.search_parameters(
+                self.index, nprobe=nprobe, ef_search=ef_search, selector=selector
+            )
+            distances, labels = self.index.search(queries, k, params=params)
+        found = self.labels_to_rows(labels)
+        distances = np.where(found == -1, np.inf, distances)
+
+        wanted_ids = None if rows is None else self.documents.chunk_ids[rows]
+        for delta, ids in self.deltas:
+            if not delta.ntotal:
+                continue
+            params = None
+            if wanted_ids is not None:
+                positions = np.flatnonzero(np.isin(ids, wanted_ids))
+                if not len(positions):
+                    continue
+                params = index_factory.search_parameters(delta, selector=faiss.IDSelectorBatch(positions))
+            delta_d, positions = delta.search(queries, min(k, delta.ntotal), params=params)
+            delta_rows = np.full(positions.shape, -1, dtype=np.int64)
+            hit = positions != -1
+            delta_rows[hit] = self.documents.rows_of(ids[positions[hit]])
+            delta_d = np.where(hit, delta_d, np.inf)
+
+            # Keep the k nearest of both result sets
+            all_d = np.hstack([distances, delta_d])
+            all_rows = np.hstack([found, delta_rows])
+            order = np.argsort(all_d, axis=1, kind="stable")[:, :k]
+            distances = np.take_along_axis(all_d, order, axis=1)
+            found = np.take_along_axis(all_rows, order, axis=1)
+        return distances, found
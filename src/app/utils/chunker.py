@@ -0,0 +1,145 @@
+import re
+from functools import lru_cache
+from typing import List, Optional
+import numpy as np
+from config.settings import settings
+from src.app.utils.tokenizer import get_encoding, token_byte_lengths
+import logging
+logger = logging.getLogger("genai")
+
+# Candidate cut points (byte offsets, end of the text before the break), strongest first
+_PARAGRAPH_RE = re.compile(rb"\S(?=[ \t\r]*\n[ \t\r]*\n)")
+_SENTENCE_RE = re.compile(rb"[.!?;:][\"')\]]*(?=\s)")
+_WORD_RE = re.compile(rb"\S(?=\s)")
+SNAP_LEVELS = {
+    "paragraph": (_PARAGRAPH_RE, _SENTENCE_RE, _WORD_RE),
+    "sentence": (_SENTENCE_RE, _WORD_RE),
+    "word": (_WORD_RE,),
+    "none": (),
+}
+# Without a tiktoken encoding, ~4 byte pieces stand in for tokens
+_APPROX_TOKEN_RE = re.compile(rb"\s*\S{1,4}|\s+")
+
+
+def _character_boundaries(data: bytes, ends: np.ndarray) -> np.ndarray:
+    """Move byte offsets that fall inside a UTF-8 character back to its first byte"""
+    if not len(ends):
+        return ends
+    continuation = (np.frombuffer(data, dtype=np.uint8) & 0xC0) == 0x80
+    continuation = np.append(continuation, False)  # len(data) is a boundary
+    for _ in range(3):  # at most 3 continuation bytes per character
+        inside = continuation[ends]
+        if not inside.any():
+            break
+        ends = np.where(inside, ends - 1, ends)
+    return ends
+
+
+class TextChunker:
+    """
+    Splits texts into windows of at most max_tokens tokens, consecutive
+    windows sharing `overlap` tokens. A window ends at the last paragraph /
+    sentence / word break in its second half (per `snap`), else at the token
+    limit. Token offsets come from one batched encode plus a cumsum over a
+    per-token byte length table, and chunks are slices of the original text,
+    so nothing is decoded back. Token ends inside a multibyte character (byte
+    level BPE tokens, ~4 byte pieces) are moved back to the character's start,
+    so every slice decodes whole.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        overlap: Optional[int] = None,
+        snap: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        self.max_tokens = max_tokens or settings.chunk_max_tokens
+        self.overlap = settings.chunk_overlap_tokens if overlap is None else overlap
+        self.snap = snap or settings.chunk_snap
+        if not 0 <= self.overlap < self.max_tokens:
+            raise ValueError(f"Chunk overlap {self.overlap} must be in [0, {self.max_tokens})")
+        if self.snap not in SNAP_LEVELS:
+            raise ValueError(f"Unknown chunk snap '{self.snap}' (one of {sorted(SNAP_LEVELS)})")
+        self.model = model or settings.embedding_model
+
+    @property
+    def encoding(self):
+        # Looked up per batch, so a tokenizer that could not be loaded at first is picked up later
+        return get_encoding(self.model)
+
+    def _token_ends(self, texts: List[str], data: List[bytes]) -> List[np.ndarray]:
+        """Byte offset where each token of each text ends, on a character boundary"""
+        encoding = self.encoding
+        if encoding is None:
+            ends = [
+                np.fromiter((m.end() for m in _APPROX_TOKEN_RE.finditer(d)), dtype=np.int64)
+                for d in data
+            ]
+        else:
+            lengths = token_byte_lengths(encoding)
+            ends = [
+                np.cumsum(lengths[np.asarray(tokens, dtype=np.int64)])
+                for tokens in encoding.encode_ordinary_batch(texts)
+            ]
+        return [_character_boundaries(d, e) for d, e in zip(data, ends)]
+
+    def _cut(self, data: bytes, breaks: dict, ends: np.ndarray, start: int) -> int:
+        """Token count of the window starting at token `start`"""
+        limit = start + self.max_tokens
+        if limit >= len(ends):
+            return len(ends) - start
+        low, high = ends[start + max(1, self.max_tokens // 2) - 1], ends[limit - 1]
+        for pattern in SNAP_LEVELS[self.snap]:
+            if pattern not in breaks:
+                breaks[pattern] = np.fromiter((m.end() for m in pattern.finditer(data)), dtype=np.int64)
+            points = breaks[pattern]
+            i = np.searchsorted(points, high, side="right") - 1
+            if i >= 0 and points[i] > low:
+                # First token that reaches the break (a token may carry the break's whitespace)
+                end = int(np.searchsorted(ends, points[i], side="left")) + 1
+                return min(end, limit) - start
+        return self.max_tokens
+
+    def _next_start(self, data: bytes, breaks: dict, ends: np.ndarray, start: int, size: int) -> int:
+        """Start of the next window: `overlap` tokens back, moved forward to a word start"""
+        stop = start + size
+        begin = max(start + 1, stop - self.overlap)
+        if not self.overlap or self.snap == "none":
+            return begin
+        if _WORD_RE not in breaks:
+            breaks[_WORD_RE] = np.fromiter((m.end() for m in _WORD_RE.finditer(data)), dtype=np.int64)
+        points = breaks[_WORD_RE]
+        i = np.searchsorted(points, ends[begin - 1], side="left")
+        if i < len(points) and points[i] < ends[stop - 1]:
+            return int(np.searchsorted(ends, points[i], side="left")) + 1
+        return begin
+
+    def _split(self, data: bytes, ends: np.ndarray) -> List[str]:
+        chunks = []
+        breaks: dict = {}
+        start = 0
+        while start < len(ends):
+            size = self._cut(data, breaks, ends, start)
+            begin = ends[start - 1] if start else 0
+            chunk = data[begin:ends[start + size - 1]].decode("utf-8").strip()
+            if chunk:
+                chunks.append(chunk)
+            if start + size >= len(ends):
+                break
+            start = self._next_start(data, breaks, ends, start, size)
+        return chunks
+
+    def split_many(self, texts: List[str]) -> List[List[str]]:
+        """Chunks of each text, tokenizing all of them in one batch"""
+        data = [t.encode("utf-8") for t in texts]
+        return [self._split(d, ends) for d, ends in zip(data, self._token_ends(texts, data))]
+
+    def split(self, text: str) -> List[str]:
+        return self.split_many([text])[0]
+
+
+@lru_cache(maxsize=None)
+def get_chunker(max_tokens: Optional[int] = None) -> TextChunker:
+    """Process-wide chunker with the configured settings (and optionally another window size)"""
+    return TextChunker(max_tokens=max_tokens)
@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+logger = logging.getLogger("genai")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller (the leader)
+    runs the upstream call, the others wait for and share its result or error.
+
+    With a RedisCache, do() also coalesces across processes: the leader holds a
+    short Redis lock and publishes the result under a key that expires soon after;
+    callers in other processes poll for it, and run the call themselves if the
+    lock holder goes away without a result.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        cache=None,
+        lock_seconds: float = 30.0,
+        result_ttl: int = 10,
+        poll_interval: float = 0.05,
+    ):
+        self.namespace = namespace
+        self.cache = cache
+        self.lock_seconds = lock_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        """The in-flight call for key and whether this caller must run it"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key: str, call: _Call, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the leader's outcome to every waiter"""
+        call.result, call.error = result, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait()
+        try:
+            result = self._run_shared(key, fn) if self.cache is not None else fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    def _run_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        lock_key = f"singleflight:{self.namespace}:lock:{key}"
+        result_key = f"singleflight:{self.namespace}:result:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_seconds
+        lock_ms = int(self.lock_seconds * 1000)
+        try:
+            acquired = self.cache.client.set(lock_key, token, nx=True, px=lock_ms)
+            while not acquired and time.monotonic() < deadline:
+                # Another process is running it: take its result, or the lock if it gave up
+                time.sleep(self.poll_interval)
+                found = self.cache.get(result_key)
+                if found is not None:
+                    return found
+                acquired = self.cache.client.set(lock_key, token, nx=True, px=lock_ms)
+        except Exception as e:
+            # Redis trouble only costs the cross-process coalescing
+            logger.warning(f"Single-flight lock for {self.namespace} unavailable: {e}")
+            return fn()
+
+        try:
+            result = fn()
+            try:
+                self.cache.set(result_key, result, ex=self.result_ttl)
+            except Exception as e:
+                logger.warning(f"Single-flight result for {self.namespace} not shared: {e}")
+            return result
+        finally:
+            # Release now so waiters elsewhere stop polling (or retry after a failure)
+            try:
+                if self.cache.client.get(lock_key) == token.encode():
+                    self.cache.client.delete(lock_key)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,65 @@
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+import logging
+logger = logging.getLogger("genai")
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def threaded(items: Iterable[T], maxsize: int = 4, name: str = "stage") -> Iterator[T]:
+    """
+    Run an iterable on a background thread and yield its items through a
+    bounded queue, so consecutive pipeline stages overlap while at most
+    `maxsize` items wait between them. An error in the producer is re-raised
+    in the consumer; closing the generator early stops the producer.
+    """
+    out: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failed(e))
+            return
+        finally:
+            close = getattr(items, "close", None)
+            if stop.is_set() and close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = out.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
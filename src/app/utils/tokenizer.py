@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+import numpy as np
+from config.settings import settings
+
+# tiktoken reads (and on first use downloads) its BPE files through this cache
+# directory; shipping it with the deployment makes tokenization work offline.
+# A relative path is taken from the repository root, not the working directory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if settings.tiktoken_cache_dir:
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.path.join(REPO_ROOT, settings.tiktoken_cache_dir))
+import tiktoken
+import logging
+logger = logging.getLogger("genai")
+
+DEFAULT_ENCODING = "cl100k_base"
+# Rough characters per token, used only when no tiktoken encoding can be loaded
+CHARS_PER_TOKEN = 4
+# Seconds before an encoding that failed to load is tried again
+ENCODING_RETRY_SECONDS = 60
+
+_encodings: Dict[Optional[str], "tiktoken.Encoding"] = {}
+_failed_at: Dict[Optional[str], float] = {}
+_encodings_lock = threading.Lock()
+
+
+def _load_encoding(model: Optional[str]):
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def get_encoding(model: Optional[str] = None):
+    """
+    tiktoken encoding for a model, built once per process (loading the BPE ranks
+    is costly). Models tiktoken does not know use cl100k_base. Returns None when
+    the encoding cannot be loaded (e.g. offline without a tiktoken cache); only
+    successes are kept, a failure is retried after ENCODING_RETRY_SECONDS.
+    """
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        failed_at = _failed_at.get(model)
+        if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+            return None
+        try:
+            encoding = _load_encoding(model)
+        except Exception as e:
+            _failed_at[model] = time.monotonic()
+            logger.error(
+                f"tiktoken encoding for {model} unavailable ({e}): chunk sizes are estimated, not counted. "
+                f"Fill {os.environ.get('TIKTOKEN_CACHE_DIR')} with python -m src.app.utils.tokenizer "
+                f"(the Docker build does) and ship it"
+            )
+            return None
+        _failed_at.pop(model, None)
+        _encodings[model] = encoding
+        return encoding
+
+
+def count_tokens(texts: List[str], model: Optional[str] = None) -> List[int]:
+    """Token count of each text"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [max(1, len(t) // CHARS_PER_TOKEN) for t in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+@lru_cache(maxsize=None)
+def token_byte_lengths(encoding) -> np.ndarray:
+    """UTF-8 length of every token id, so token offsets in a text are a cumsum away"""
+    lengths = np.zeros(encoding.max_token_value + 1, dtype=np.int64)
+    for token in range(encoding.max_token_value + 1):
+        try:
+            lengths[token] = len(encoding.decode_single_token_bytes(token))
+        except KeyError:
+            pass
+    return lengths
+
+
+def main():
+    """Fill the tiktoken cache directory (run once with network access, then ship the directory)"""
+    encoding = get_encoding(settings.embedding_model)
+    if encoding is None:
+        raise SystemExit("could not load the tiktoken encoding")
+    print(f"{encoding.name} cached in {os.environ.get('TIKTOKEN_CACHE_DIR')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.app.api.v1.endpoints import chat, documents, status, graph
+from src.app.api.v1.endpoints import chat, documents, status, graph, jobs
 from src.app.utils.logging import init_logger
+from src.app.utils.tokenizer import get_encoding
+from config.settings import settings
 ##
 from importlib.metadata import version, PackageNotFoundError
 ##
@@ -22,6 +25,11 @@ def log_package_versions():
 log_package_versions()
 ##
 
+# Load the tokenizer now, so a missing tiktoken cache shows in the startup log
+# rather than at the first upload; off the import path, as without the cache
+# tiktoken downloads the BPE file and that can hang where egress is blocked
+threading.Thread(target=get_encoding, args=(settings.embedding_model,), name="tiktoken-load", daemon=True).start()
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="GenAI RAG Chatbot",
@@ -42,6 +50,7 @@ def create_app() -> FastAPI:
     app.include_router(documents.router, prefix="/api/v1", tags=["Upload"])
     app.include_router(status.router, prefix="/api/v1", tags=["Status"])
     app.include_router(graph.router, prefix="/api/v1", tags=["Graph"])
+    app.include_router(jobs.router, prefix="/api/v1", tags=["Jobs"])
     return app
 
 app = create_app()
@@ -0,0 +1,58 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional
+from config.settings import settings
+from src.worker import jobs
+import logging
+logger = logging.getLogger("genai")
+
+
+class LocalBroker:
+    """Runs jobs on a thread pool of this process (single node, tests)"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+
+    def submit(self, job_id: str, path: str, doc_id: str, filename: Optional[str] = None) -> Future:
+        from src.worker.tasks import run_ingest_job
+
+        return self._pool.submit(run_ingest_job, job_id, path, doc_id, filename)
+
+
+class CeleryBroker:
+    """Sends jobs to Celery workers (see src/worker/celery_app.py)"""
+
+    def __init__(self):
+        from src.worker.celery_app import celery_app
+
+        if celery_app is None:
+            raise RuntimeError("job_broker is 'celery' but celery is not installed")
+        self.app = celery_app
+
+    def submit(self, job_id: str, path: str, doc_id: str, filename: Optional[str] = None):
+        return self.app.send_task("genai.ingest_document", args=[job_id, path, doc_id, filename])
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    if settings.job_broker == "celery":
+        return CeleryBroker()
+    if settings.job_broker != "local":
+        raise ValueError(f"Unknown job broker '{settings.job_broker}' (local or celery)")
+    return LocalBroker(settings.worker_concurrency)
+
+
+def enqueue_ingest(path: str, doc_id: str, filename: Optional[str] = None) -> Dict:
+    """
+    Queue the ingestion of a spooled file (deleted once the job ends) and
+    return its job record
+    """
+    job = jobs.get_job_store().create(doc_id=doc_id, filename=filename)
+    try:
+        get_broker().submit(job["job_id"], path, doc_id, filename)
+    except Exception as e:
+        jobs.get_job_store().update(job["job_id"], status=jobs.FAILED, error=f"Could not queue job: {e}")
+        raise
+    logger.info(f"Queued ingestion job {job['job_id']} for {doc_id}")
+    return job
@@ -0,0 +1,232 @@
+"""
+Bulk-load a directory tree of documents into a vector store.
+
+Files are parsed and chunked in a process pool; chunks of many documents are
+embedded together in large batches and committed to the store once per batch.
+A checkpoint (JSON lines, one per finished file) lets an interrupted run pick
+up where it stopped: finished files are skipped, and chunks of a partly
+committed file are recognised by their content hash and not embedded again.
+A file whose doc_id is already in the store (changed since it was
+checkpointed, or uploaded through the API) replaces its old chunks when its
+batch commits, so the store always holds one whole version of it.
+
+    python -m src.worker.bulk_ingest /data/contratos --store vector_db --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+from config.settings import settings
+import logging
+logger = logging.getLogger("genai")
+
+
+def _signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def find_files(root: str) -> Iterator[str]:
+    """Supported files under root, in a stable order"""
+    from src.app.infrastructure.file_processing.sections import is_supported
+
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if is_supported(name):
+                yield os.path.join(directory, name)
+
+
+class Checkpoint:
+    """Append-only record of finished files: {"path", "doc_id", "signature", "chunks"} per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, Dict] = {}
+        # A line cut short by an interruption has no newline; the next record starts a new one
+        self._torn = False
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by the interruption
+                    self.done[entry["path"]] = entry
+
+    def is_done(self, path: str, signature: List[int]) -> bool:
+        entry = self.done.get(path)
+        return entry is not None and entry["signature"] == signature
+
+    def record(self, entries: List[Dict]):
+        if not entries:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            if self._torn:
+                f.write("\n")
+                self._torn = False
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+                self.done[entry["path"]] = entry
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _init_worker():
+    # One file per process: no nested page-range pools
+    settings.pdf_extract_workers = 1
+
+
+def parse_file(path: str) -> List[Tuple[str, List[str]]]:
+    """(section, chunks) of a file; runs in a pool worker"""
+    from src.app.infrastructure.file_processing.sections import iter_sections
+    from src.app.utils.chunker import get_chunker
+
+    sections: Dict[str, List[str]] = {}
+    for section, text in iter_sections(path):
+        sections.setdefault(section, []).append(text)
+    names = list(sections)
+    chunked = get_chunker().split_many(["\n".join(sections[name]) for name in names])
+    return list(zip(names, chunked))
+
+
+def _parsed(pool: ProcessPoolExecutor, files: List[Tuple[str, str, List[int]]], window: int):
+    """(path, doc_id, signature, sections or error) as files finish, at most `window` in flight"""
+    files = iter(files)
+    pending = {}
+    while True:
+        for path, doc_id, signature in files:
+            pending[pool.submit(parse_file, path)] = (path, doc_id, signature)
+            if len(pending) >= window:
+                break
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, doc_id, signature = pending.pop(future)
+            try:
+                yield path, doc_id, signature, future.result()
+            except Exception as e:
+                yield path, doc_id, signature, e
+
+
+def bulk_ingest(
+    root: str,
+    store,
+    checkpoint_path: str,
+    workers: Optional[int] = None,
+    batch_chunks: int = 4096,
+) -> Dict:
+    """Ingest every supported file under root into store; returns run totals"""
+    checkpoint = Checkpoint(checkpoint_path)
+    workers = workers or os.cpu_count() or 1
+    totals = {"files": 0, "skipped": 0, "failed": 0, "chunks": 0, "added": 0, "replaced": 0, "batches": 0}
+
+    todo, seen = [], {}
+    for path in find_files(root):
+        doc_id = os.path.splitext(os.path.basename(path))[0]  # same doc_id as /upload-pdf
+        if doc_id in seen:
+            logger.warning(f"Skipping {path}: doc_id {doc_id} already used by {seen[doc_id]}")
+            totals["skipped"] += 1
+            continue
+        seen[doc_id] = path
+        signature = _signature(path)
+        if checkpoint.is_done(path, signature):
+            totals["skipped"] += 1
+            continue
+        todo.append((path, doc_id, signature))
+    logger.info(f"Bulk ingest of {root}: {len(todo)} files to load, {totals['skipped']} skipped")
+
+    texts: List[str] = []
+    metadatas: List[Dict] = []
+    # (doc_id, texts, metadatas) of files whose doc_id already has chunks in the store
+    replacements: List[Tuple[str, List[str], List[Dict]]] = []
+    pending = 0
+    finished: List[Dict] = []
+    started = time.monotonic()
+
+    def commit():
+        nonlocal pending
+        if not finished:
+            return
+        if texts:
+            added = store.add_documents(texts, metadatas=metadatas)
+            totals["added"] += len(added)
+        for doc_id, doc_texts, doc_metadatas in replacements:
+            # Old and new version swap in one step; unchanged chunks are not embedded again
+            result = store.replace_document(doc_id, doc_texts, doc_metadatas)
+            totals["added"] += result["added"]
+            totals["replaced"] += 1
+        if texts or replacements:
+            totals["batches"] += 1
+        # Only now are the batch's files fully in the store
+        checkpoint.record(finished)
+        totals["files"] += len(finished)
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Committed batch {totals['batches']}: {totals['files']}/{len(todo)} files, "
+            f"{totals['chunks']} chunks ({totals['chunks'] / max(elapsed, 1e-9):.0f} chunks/s)"
+        )
+        texts.clear()
+        metadatas.clear()
+        replacements.clear()
+        finished.clear()
+        pending = 0
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        for path, doc_id, signature, sections in _parsed(pool, todo, workers * 2):
+            if isinstance(sections, Exception):
+                logger.error(f"Failed to parse {path}: {sections}")
+                totals["failed"] += 1
+                continue
+            doc_texts, doc_metadatas = [], []
+            for section, section_chunks in sections:
+                doc_texts.extend(section_chunks)
+                doc_metadatas.extend({"doc_id": doc_id, "section": section} for _ in section_chunks)
+            if len(store.documents.doc_rows(doc_id)):
+                replacements.append((doc_id, doc_texts, doc_metadatas))
+            else:
+                texts.extend(doc_texts)
+                metadatas.extend(doc_metadatas)
+            chunks = len(doc_texts)
+            pending += chunks
+            totals["chunks"] += chunks
+            finished.append({"path": path, "doc_id": doc_id, "signature": signature, "chunks": chunks})
+            if pending >= batch_chunks:
+                commit()
+        commit()
+
+    totals["seconds"] = round(time.monotonic() - started, 1)
+    logger.info(f"Bulk ingest done: {totals}")
+    return totals
+
+
+def main(argv=None):
+    from src.app.infrastructure.vector_store import registry
+
+    parser = argparse.ArgumentParser(description="Bulk-load a directory of documents into a vector store")
+    parser.add_argument("directory", help="directory tree to load (PDFs and other supported files)")
+    parser.add_argument("--store", default="vector_db", help="segment store directory (default: vector_db)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint file (default: <store>.bulk-ingest.jsonl)")
+    parser.add_argument("--workers", type=int, default=None, help="parsing processes (default: one per CPU)")
+    parser.add_argument("--batch-chunks", type=int, default=4096,
+                        help="chunks embedded and committed per batch")
+    args = parser.parse_args(argv)
+
+    store = registry.get_vector_store(
+        persistence_dir=args.store, embedder=registry.get_embedder(), read_only=False
+    )
+    checkpoint = args.checkpoint or f"{os.path.normpath(args.store)}.bulk-ingest.jsonl"
+    totals = bulk_ingest(args.directory, store, checkpoint, args.workers, args.batch_chunks)
+    print(json.dumps(totals, indent=2))
+    return totals
+
+
+if __name__ == "__main__":
+    main()
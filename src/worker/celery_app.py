@@ -0,0 +1,31 @@
+"""
+Celery application for ingestion jobs, used when settings.job_broker is
+"celery" (the default "local" broker runs jobs on threads of the API process).
+
+The vector store has a single writer, so run one worker process with a
+thread pool (embedding is network-bound, throughput grows with --concurrency),
+give it the upload spool directory, and serve the API read-only
+(VECTOR_STORE_READ_ONLY=true):
+
+    celery -A src.worker.celery_app:celery_app worker --pool threads --concurrency 8
+"""
+from config.settings import settings
+
+try:
+    from celery import Celery
+except ImportError:  # optional: only needed with job_broker = "celery"
+    Celery = None
+
+
+def broker_url() -> str:
+    return settings.celery_broker_url or f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/1"
+
+
+celery_app = None
+if Celery is not None:
+    celery_app = Celery("genai", broker=broker_url(), include=["src.worker.tasks"])
+    celery_app.conf.update(
+        task_acks_late=True,            # a job whose worker dies is redelivered
+        worker_prefetch_multiplier=1,   # long jobs: do not hoard queued ones
+        task_ignore_result=True,        # outcomes live in the job store
+    )
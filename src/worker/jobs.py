@@ -0,0 +1,96 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+from config.settings import settings
+import logging
+logger = logging.getLogger("genai")
+
+# queued -> running -> done | failed
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def new_job(**fields) -> Dict:
+    return {
+        "job_id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "progress": {"pages": 0, "chunks": 0},
+        "result": None,
+        "error": None,
+        **fields,
+    }
+
+
+class MemoryJobStore:
+    """Job records of this process (local broker); the oldest are dropped beyond max_jobs"""
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, **fields) -> Dict:
+        job = new_job(**fields)
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return dict(job)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+class RedisJobStore:
+    """
+    Job records in Redis, shared by the API and Celery workers. Only the worker
+    running a job updates it, so read-modify-write needs no locking.
+    """
+
+    def __init__(self, cache, ttl: int):
+        self.cache = cache
+        self.ttl = ttl or None
+
+    def _key(self, job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def create(self, **fields) -> Dict:
+        job = new_job(**fields)
+        self.cache.set(self._key(job["job_id"]), job, ex=self.ttl)
+        return job
+
+    def update(self, job_id: str, **fields) -> Optional[Dict]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        self.cache.set(self._key(job_id), job, ex=self.ttl)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.cache.get(self._key(job_id))
+
+
+@lru_cache(maxsize=None)
+def get_job_store():
+    """Jobs live in Redis when workers run in other processes (Celery), else in memory"""
+    if settings.job_broker == "celery":
+        from src.app.infrastructure.cache.redis import redis_client
+
+        return RedisJobStore(redis_client, settings.job_ttl_seconds)
+    return MemoryJobStore()
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+from src.worker import jobs
+from src.worker.celery_app import celery_app
+import logging
+logger = logging.getLogger("genai")
+
+# An entry lives only while a job holds or waits for its lock, so the map does
+# not grow with every document a long-running worker has seen
+_doc_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_doc_locks_guard = threading.Lock()
+
+
+def _doc_lock(doc_id: str) -> threading.Lock:
+    """Two uploads of one document are ingested one after the other"""
+    with _doc_locks_guard:
+        return _doc_locks.setdefault(doc_id, threading.Lock())
+
+
+def ingest_file(path: str, doc_id: str, filename: Optional[str] = None, progress=None) -> Dict:
+    """
+    Stream a file into the store as doc_id: its pages are read on one thread,
+    chunked on another and embedded on a third while indexing runs here.
+    progress(pages, chunks) is called after each indexed batch.
+    """
+    from config.settings import settings
+    from src.app.infrastructure.file_processing.sections import iter_sections
+    from src.app.infrastructure.llm.rag_container import rag_chain
+    from src.app.utils.stages import threaded
+
+    pages = 0
+
+    def counted():
+        nonlocal pages
+        for piece in iter_sections(path, filename):
+            pages += 1
+            yield piece
+
+    on_batch = (lambda chunks: progress(pages, chunks)) if progress is not None else None
+    sections = threaded(counted(), settings.ingest_queue_size, name=f"pages-{doc_id}")
+    return rag_chain.replace_document_stream(doc_id, sections, progress=on_batch)
+
+
+def run_ingest_job(job_id: str, path: str, doc_id: str, filename: Optional[str] = None, cleanup: bool = True) -> Optional[Dict]:
+    """Run one ingestion job, recording its progress and outcome in the job store"""
+    store = jobs.get_job_store()
+
+    def progress(pages: int, chunks: int):
+        store.update(job_id, progress={"pages": pages, "chunks": chunks})
+
+    try:
+        with _doc_lock(doc_id):
+            store.update(job_id, status=jobs.RUNNING, started_at=time.time())
+            result = ingest_file(path, doc_id, filename, progress)
+    except Exception as e:
+        logger.error(f"Ingestion job {job_id} ({doc_id}) failed: {e}")
+        store.update(job_id, status=jobs.FAILED, error=str(e), finished_at=time.time())
+        return None
+    finally:
+        if cleanup:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    sections = result.pop("sections")
+    chunks = sum(sections.values())
+    job = store.get(job_id) or {}
+    store.update(
+        job_id,
+        status=jobs.DONE,
+        finished_at=time.time(),
+        progress={**(job.get("progress") or {}), "chunks": chunks},
+        result={**result, "sections": sections, "chunks": chunks},
+    )
+    logger.info(f"Ingestion job {job_id} ({doc_id}) done: {result}")
+    return result
+
+
+if celery_app is not None:
+    ingest_task = celery_app.task(name="genai.ingest_document")(run_ingest_job)
@@ -0,0 +1,36 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# config.settings needs an API key; tests never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeEmbedder:
+    """Deterministic unit vectors per text, counting embedded texts and batch sizes"""
+
+    model = "fake"
+
+    def __init__(self, dimension: int = 32):
+        self.embedding_dim = dimension
+        self.calls = 0
+        self.batches = []
+
+    def get_embedding(self, text):
+        self.calls += 1
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.embedding_dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed(self, texts):
+        self.batches.append(len(texts))
+        return [self.get_embedding(t) for t in texts]
+
+
+@pytest.fixture
+def embedder():
+    return FakeEmbedder()
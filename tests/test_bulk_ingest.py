@@ -0,0 +1,95 @@
+import json
+import os
+
+import fitz
+
+from src.app.infrastructure.vector_store.faiss import FaissStore
+from src.worker.bulk_ingest import Checkpoint, bulk_ingest, find_files
+
+
+def _write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 60), text)
+    doc.save(str(path))
+    doc.close()
+
+
+def _tree(root):
+    os.makedirs(root / "b")
+    _write_pdf(root / "uno.pdf", "RESUMEN contrato uno")
+    _write_pdf(root / "b" / "dos.pdf", "RESUMEN contrato dos")
+    _write_pdf(root / "b" / "tres.pdf", "RESUMEN contrato tres")
+    (root / "b" / "notas.txt").write_text("not supported")
+
+
+def test_find_files_is_stable_and_filtered(tmp_path):
+    _tree(tmp_path)
+    assert [os.path.relpath(p, tmp_path) for p in find_files(str(tmp_path))] == [
+        "uno.pdf", os.path.join("b", "dos.pdf"), os.path.join("b", "tres.pdf"),
+    ]
+
+
+def test_rerun_skips_finished_files_and_reloads_changed_ones(tmp_path, embedder):
+    docs = tmp_path / "docs"
+    _tree(docs)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path / "store"))
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+
+    totals = bulk_ingest(str(docs), store, checkpoint, workers=1, batch_chunks=1)
+    assert totals["files"] == 3 and totals["failed"] == 0 and totals["added"] == 3
+    assert store.count() == 3
+    assert len(Checkpoint(checkpoint).done) == 3
+
+    calls = embedder.calls
+    totals = bulk_ingest(str(docs), store, checkpoint, workers=1)
+    assert totals["files"] == 0 and totals["skipped"] == 3
+    assert embedder.calls == calls
+
+    _write_pdf(docs / "b" / "dos.pdf", "RESUMEN contrato dos, segunda version")
+    stat = os.stat(docs / "b" / "dos.pdf")
+    os.utime(docs / "b" / "dos.pdf", (stat.st_atime, stat.st_mtime + 10))
+    totals = bulk_ingest(str(docs), store, checkpoint, workers=1)
+    assert totals["files"] == 1 and totals["skipped"] == 2 and totals["replaced"] == 1
+    found = store.search(embedder.get_embedding("x"), top_k=10, filters={"doc_id": "dos"})
+    assert [r["text"] for r in found] == ["RESUMEN contrato dos, segunda version"]
+
+
+def test_changed_file_keeps_its_old_version_until_replaced(tmp_path, embedder):
+    docs = tmp_path / "docs"
+    _tree(docs)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path / "store"))
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    bulk_ingest(str(docs), store, checkpoint, workers=1)
+
+    # A changed file that no longer parses: its loaded version stays
+    (docs / "uno.pdf").write_bytes(b"not a pdf")
+    totals = bulk_ingest(str(docs), store, checkpoint, workers=1)
+    assert totals["failed"] == 1
+    found = store.search(embedder.get_embedding("x"), top_k=10, filters={"doc_id": "uno"})
+    assert [r["text"] for r in found] == ["RESUMEN contrato uno"]
+
+
+def test_document_uploaded_through_the_api_is_replaced(tmp_path, embedder):
+    docs = tmp_path / "docs"
+    _tree(docs)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path / "store"))
+    store.add_documents(["old upload of tres"], metadata={"doc_id": "tres", "section": "summary"})
+
+    totals = bulk_ingest(str(docs), store, str(tmp_path / "checkpoint.jsonl"), workers=1)
+    assert totals["files"] == 3 and totals["replaced"] == 1
+    assert store.count() == 3
+    found = store.search(embedder.get_embedding("x"), top_k=10, filters={"doc_id": "tres"})
+    assert [r["text"] for r in found] == ["RESUMEN contrato tres"]
+
+
+def test_checkpoint_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    entry = {"path": "/a.pdf", "doc_id": "a", "signature": [1, 2], "chunks": 3}
+    path.write_text(json.dumps(entry) + "\n" + '{"path": "/b.pd')
+    checkpoint = Checkpoint(str(path))
+    assert checkpoint.is_done("/a.pdf", [1, 2])
+    assert not checkpoint.is_done("/a.pdf", [1, 3]) and not checkpoint.is_done("/b.pdf", [1, 2])
+
+    # The next entry is not glued onto the torn one
+    checkpoint.record([{**entry, "path": "/c.pdf", "doc_id": "c"}])
+    assert set(Checkpoint(str(path)).done) == {"/a.pdf", "/c.pdf"}
@@ -0,0 +1,105 @@
+import pytest
+import tiktoken
+
+from src.app.utils import chunker as chunker_module, tokenizer
+from src.app.utils.chunker import _APPROX_TOKEN_RE, TextChunker, get_chunker
+
+
+def _byte_encoding():
+    """Byte-level BPE without merges: every byte is a token, so CJK characters span three"""
+    return tiktoken.Encoding(
+        name="bytes",
+        pat_str=r"\s*\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+
+
+def _chunker(monkeypatch, encoding, **kwargs):
+    monkeypatch.setattr(chunker_module, "get_encoding", lambda model=None: encoding)
+    return TextChunker(**kwargs)
+
+
+ENCODINGS = [pytest.param(None, id="approx"), pytest.param(_byte_encoding(), id="byte-bpe")]
+
+
+def _prose(n):
+    # Unique words, a sentence every seven
+    return " ".join(f"w{i}." if i % 7 == 6 else f"w{i}" for i in range(n))
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_chunks_respect_size_and_overlap(monkeypatch, encoding):
+    chunker = _chunker(monkeypatch, encoding, max_tokens=40, overlap=8, snap="sentence")
+    text = _prose(400)
+    chunks = chunker.split(text)
+    assert len(chunks) > 1
+    if encoding is None:
+        assert all(len(_APPROX_TOKEN_RE.findall(c.encode())) <= 40 for c in chunks)
+    else:
+        assert all(len(encoding.encode_ordinary(c)) <= 40 for c in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # The next window starts inside the previous one, at a word
+        assert chunk.split()[0] in previous.split()[-8:]
+        assert text.index(chunk) < text.index(previous) + len(previous)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_chunks_without_overlap_cover_the_text(monkeypatch, encoding):
+    chunker = _chunker(monkeypatch, encoding, max_tokens=30, overlap=0, snap="word")
+    text = _prose(300)
+    assert " ".join(chunker.split(text)).split() == text.split()
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("snap", ["none", "word"])
+def test_multibyte_text_loses_no_characters(monkeypatch, encoding, snap):
+    text = "".join(chr(0x4E00 + i % 500) for i in range(600)) + " 数据🙂 émigré " * 20
+    chunker = _chunker(monkeypatch, encoding, max_tokens=25, overlap=0, snap=snap)
+    chunks = chunker.split(text)
+    assert len(chunks) > 1
+    assert "".join("".join(c.split()) for c in chunks) == "".join(text.split())
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=10, overlap=10)
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=10, overlap=2, snap="chapter")
+
+
+def test_get_chunker_is_shared_per_window_size():
+    assert get_chunker() is get_chunker()
+    assert get_chunker(50).max_tokens == 50 and get_chunker(50) is not get_chunker()
+
+
+def test_token_byte_lengths_and_counts(monkeypatch):
+    encoding = _byte_encoding()
+    assert tokenizer.token_byte_lengths(encoding)[:3].tolist() == [1, 1, 1]
+    monkeypatch.setattr(tokenizer, "get_encoding", lambda model=None: None)
+    assert tokenizer.count_tokens(["abcdefgh", ""]) == [2, 1]
+    monkeypatch.setattr(tokenizer, "get_encoding", lambda model=None: encoding)
+    assert tokenizer.count_tokens(["añb"]) == [4]
+
+
+def test_failed_encoding_load_is_retried(monkeypatch):
+    encoding = _byte_encoding()
+    attempts = []
+
+    def load(model):
+        attempts.append(model)
+        if len(attempts) == 1:
+            raise OSError("network unreachable")
+        return encoding
+
+    monkeypatch.setattr(tokenizer, "_load_encoding", load)
+    monkeypatch.setattr(tokenizer, "_encodings", {})
+    monkeypatch.setattr(tokenizer, "_failed_at", {})
+    assert tokenizer.get_encoding("m") is None
+    # Not retried on every call while offline
+    assert tokenizer.get_encoding("m") is None and len(attempts) == 1
+
+    monkeypatch.setattr(tokenizer, "ENCODING_RETRY_SECONDS", 0)
+    assert tokenizer.get_encoding("m") is encoding
+    monkeypatch.setattr(tokenizer, "_load_encoding", None)
+    assert tokenizer.get_encoding("m") is encoding and len(attempts) == 2
@@ -0,0 +1,33 @@
+import pickle
+
+import numpy as np
+
+from src.app.infrastructure.cache.codec import decode_embedding, encode_embedding
+
+
+def test_float32_round_trip_is_exact_and_compact():
+    vector = np.random.default_rng(0).standard_normal(1536).astype(np.float32)
+    data = encode_embedding(vector, "text-embedding-3-small")
+    assert len(data) < 1536 * 4 + 48
+    assert len(data) < len(pickle.dumps(vector.tolist())) / 2
+    decoded = decode_embedding(data, "text-embedding-3-small")
+    assert decoded.dtype == np.float32 and not decoded.flags.writeable
+    np.testing.assert_array_equal(decoded, vector)
+
+
+def test_float16_round_trip_is_close():
+    vector = np.random.default_rng(1).standard_normal(64).astype(np.float32)
+    data = encode_embedding(vector, "m", dtype="float16")
+    assert len(data) == len(encode_embedding(vector, "m")) - 64 * 2
+    np.testing.assert_allclose(decode_embedding(data, "m"), vector, rtol=1e-3, atol=1e-3)
+
+
+def test_unusable_entries_decode_to_none():
+    vector = np.ones(8, dtype=np.float32)
+    data = encode_embedding(vector, "model-a")
+    assert decode_embedding(None) is None
+    assert decode_embedding(data, "model-b") is None
+    assert decode_embedding(data[:-1], "model-a") is None
+    # Entries cached by older versions as pickled lists
+    assert decode_embedding(pickle.dumps([1.0, 2.0])) is None
+    np.testing.assert_array_equal(decode_embedding(data), vector)
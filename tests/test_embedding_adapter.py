@@ -0,0 +1,161 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+from src.app.infrastructure.llm.embeddings import HashingEmbedder
+
+
+class DictCache:
+    """RedisCache stand-in: raw values in a dict, counting round trips"""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def get(self, key, raw=False):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, raw=False):
+        self.round_trips += 1
+        self.data[key] = value
+
+    def get_many(self, keys, raw=False):
+        if not keys:
+            return []
+        self.round_trips += 1
+        return [self.data.get(k) for k in keys]
+
+    def set_many(self, items, ex=None, raw=False):
+        if not items:
+            return
+        self.round_trips += 1
+        self.data.update(items)
+
+
+class CountingBackend(HashingEmbedder):
+    def __init__(self, dimension=16):
+        super().__init__(dimension=dimension)
+        self.batches = []
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return super().embed_query(text)
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def backend():
+    return CountingBackend()
+
+
+@pytest.fixture
+def adapter(backend):
+    adapter = EmbeddingAdapter(backend=backend)
+    adapter.cache = DictCache()
+    return adapter
+
+
+def test_embed_keeps_order_and_embeds_each_miss_once(adapter, backend):
+    adapter.embed(["b", "d"])
+    adapter.memory.clear()  # "b" and "d" now only in Redis
+    adapter.cache.round_trips = 0
+
+    texts = ["a", "b", "a", "c", "d", "c"]
+    vectors = adapter.embed(texts)
+    # One lookup and one write-back round trip for the whole batch
+    assert adapter.cache.round_trips == 2
+    assert backend.batches[-1] == ["a", "c"]
+    expected = backend.embed_documents(texts)
+    for got, want in zip(vectors, expected):
+        np.testing.assert_allclose(got, want, rtol=1e-6)
+
+
+def test_embed_of_cached_batch_makes_no_backend_call(adapter, backend):
+    adapter.embed(["x", "y"])
+    calls = len(backend.batches)
+    adapter.memory.clear()
+    assert len(adapter.embed(["y", "x", "y"])) == 3
+    assert len(backend.batches) == calls
+
+
+def test_memory_tier_answers_before_redis(adapter, backend):
+    first = adapter.get_embedding("hot query")
+    adapter.cache.round_trips = 0
+    again = adapter.get_embedding("hot query")
+    assert again is first
+    assert adapter.cache.round_trips == 0
+    assert adapter.memory.stats()["hits"] >= 1
+
+    # Evicted from memory: read back from Redis, not embedded again
+    adapter.memory.clear()
+    np.testing.assert_array_equal(adapter.get_embedding("hot query"), first)
+    assert backend.queries == ["hot query"] and adapter.cache.round_trips == 1
+
+
+def test_concurrent_batches_embed_shared_texts_once(adapter, backend):
+    release = threading.Event()
+    embed_documents = backend.embed_documents
+
+    def slow_embed(texts):
+        release.wait(5)
+        return embed_documents(texts)
+
+    backend.embed_documents = slow_embed
+    results = {}
+    first = threading.Thread(target=lambda: results.update(first=adapter.embed(["p", "q"])))
+    first.start()
+    while adapter.flight.stats()["in_flight"] < 2:
+        release.wait(0.001)
+    second = threading.Thread(target=lambda: results.update(second=adapter.embed(["q", "r"])))
+    second.start()
+    while adapter.flight.stats()["in_flight"] < 3:
+        release.wait(0.001)
+    release.set()
+    first.join()
+    second.join()
+
+    assert sorted(t for batch in backend.batches for t in batch) == ["p", "q", "r"]
+    np.testing.assert_array_equal(results["first"][1], results["second"][0])
+
+
+def test_short_backend_answer_fails_the_batch_and_its_waiters(adapter, backend):
+    release = threading.Event()
+    embed_documents = backend.embed_documents
+
+    def short_embed(texts):
+        release.wait(5)
+        return embed_documents(texts)[:-1]
+
+    backend.embed_documents = short_embed
+    errors = {}
+
+    def run(name, texts):
+        try:
+            adapter.embed(texts)
+        except Exception as e:
+            errors[name] = e
+
+    first = threading.Thread(target=run, args=("first", ["p", "q"]))
+    first.start()
+    while adapter.flight.stats()["in_flight"] < 2:
+        release.wait(0.001)
+    # Waits for the first batch's "q"
+    second = threading.Thread(target=run, args=("second", ["q"]))
+    second.start()
+    while adapter.flight.stats()["coalesced"] < 1:
+        release.wait(0.001)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert isinstance(errors["first"], ValueError) and "1 vectors for 2 texts" in str(errors["first"])
+    assert errors["second"] is errors["first"]
+    assert adapter.flight.stats()["in_flight"] == 0
+    assert not adapter.cache.data and adapter.memory.get(adapter._hash("p")) is None
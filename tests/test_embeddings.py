@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.llm import embeddings
+from src.app.infrastructure.llm.embeddings import (
+    HashingEmbedder,
+    TruncatedBackend,
+    create_backend,
+    truncate_embeddings,
+)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    first, second = HashingEmbedder(dimension=64), HashingEmbedder(dimension=64)
+    vectors = np.asarray(first.embed_documents(["contrato de obra", "otro texto"]))
+    np.testing.assert_array_equal(vectors[0], second.embed_query("contrato de obra"))
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    assert first.model == "hashing-64" and first.dimension == 64
+
+
+def test_hashing_embedder_places_shared_words_closer():
+    embedder = HashingEmbedder(dimension=256)
+    query = np.asarray(embedder.embed_query("plazo de entrega del contrato"))
+    near = np.asarray(embedder.embed_query("el plazo de entrega"))
+    far = np.asarray(embedder.embed_query("tarifas de electricidad"))
+    assert query @ near > query @ far
+
+
+def test_truncation():
+    vectors = np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+    truncated = truncate_embeddings(vectors, 2)
+    np.testing.assert_allclose(truncated, [[0.6, 0.8], [0.0, 0.0]])
+
+    backend = TruncatedBackend(HashingEmbedder(dimension=64), 16)
+    assert backend.model == "hashing-64@16" and backend.dimension == 16
+    assert np.asarray(backend.embed_query("x")).shape == (16,)
+    assert backend.embed_documents([]) == []
+
+
+def test_create_backend(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_target_dimension", 0)
+    monkeypatch.setattr(settings, "local_embedding_dimension", 48)
+    assert create_backend("hashing").model == "hashing-48"
+    shortened = create_backend("hashing", target_dimension=12)
+    assert isinstance(shortened, TruncatedBackend) and shortened.model == "hashing-48@12"
+    with pytest.raises(ValueError):
+        create_backend("word2vec")
+
+
+def test_register_backend(monkeypatch):
+    monkeypatch.setattr(embeddings, "BACKENDS", dict(embeddings.BACKENDS))
+    embeddings.register_backend("custom", lambda model=None, dimension=None: HashingEmbedder("custom", 8))
+    backend = create_backend("custom", target_dimension=0)
+    assert backend.model == "custom" and backend.dimension == 8
@@ -0,0 +1,114 @@
+import logging
+import threading
+
+import numpy as np
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+
+def _texts(n):
+    return [f"chunk number {i}" for i in range(n)]
+
+
+@pytest.mark.parametrize("storage", ["fp16", "sq8"])
+def test_delete_rebuild_search_keeps_live_chunks(tmp_path, embedder, monkeypatch, storage):
+    monkeypatch.setattr(settings, "faiss_quantizer_train_rows", 16)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path), index_type="flat", storage=storage)
+    texts = _texts(40)
+    ids = store.add_documents(texts, metadata={"doc_id": "doc", "section": "summary"})
+    store.rebuild()
+    assert store.index_kind == ("flat", storage)
+
+    store.delete_chunks(ids[:5])
+    store.rebuild()
+    store.delete_chunks(ids[5:7])
+    store.rebuild()
+
+    query = np.zeros(embedder.embedding_dim, dtype=np.float32)
+    found = {r["text"] for r in store.search(query, top_k=100)}
+    assert found == set(texts[7:])
+    for text in texts[7:12]:
+        best = store.search(embedder.get_embedding(text), top_k=1)
+        assert best and best[0]["text"] == text
+
+
+def test_delete_rebuild_reopen(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    ids = store.add_documents(_texts(20), metadata={"doc_id": "doc", "section": "summary"})
+    store.delete_chunks(ids[:3])
+    store.rebuild()
+    assert store.count() == 17
+
+    reopened = FaissStore(embedder, persistence_dir=str(tmp_path))
+    assert reopened.count() == 17
+    query = np.zeros(embedder.embedding_dim, dtype=np.float32)
+    assert len(reopened.search(query, top_k=50)) == 17
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_searches_run_during_writes_and_rebuilds(tmp_path, embedder, monkeypatch, index_type):
+    monkeypatch.setattr(settings, "faiss_train_threshold", 500)
+    monkeypatch.setattr(settings, "faiss_nlist", 8)
+    monkeypatch.setattr(settings, "vector_store_delta_rows", 200)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path), index_type=index_type)
+    store.add_documents(_texts(100), metadata={"doc_id": "d0", "section": "summary"})
+    notified = []
+    store.subscribe(lambda: notified.append(1))
+    query = embedder.get_embedding(_texts(100)[5])
+    errors, stop = [], threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                assert store.search(query, top_k=1, nprobe=8)[0]["text"] == "chunk number 5"
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    held = store.snapshot
+    for k in range(1, 10):
+        store.add_documents([f"c{k}-{i}" for i in range(100)], metadata={"doc_id": f"d{k}", "section": "summary"})
+        if k % 3 == 0:
+            store.delete_document(f"d{k - 1}")
+    stop.set()
+    for reader in readers:
+        reader.join()
+    store.rebuild()
+
+    assert not errors
+    assert notified
+    # A snapshot taken earlier is unchanged by later writes
+    assert held.documents.live_count == 100
+    assert store.count() == 700
+    assert store.search(embedder.get_embedding("c9-3"), top_k=1, nprobe=8)[0]["text"] == "c9-3"
+    assert not any(r["text"].startswith("c2-") for r in store.search(embedder.get_embedding("c2-3"), top_k=5, nprobe=8))
+
+
+def test_rebuilds_survive_concurrent_merges(tmp_path, embedder, monkeypatch):
+    monkeypatch.setattr(settings, "vector_store_merge_threshold", 2)
+    failures = []
+    monkeypatch.setattr(logging.getLogger("genai"), "error", failures.append)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    stop = threading.Event()
+
+    def merge():
+        while not stop.is_set():
+            store.segments.merge()
+
+    merger = threading.Thread(target=merge)
+    merger.start()
+    try:
+        for k in range(40):
+            store.add_documents([f"c{k}-{i}" for i in range(5)], metadata={"doc_id": f"d{k}", "section": "summary"})
+            store.rebuild()
+    finally:
+        stop.set()
+        merger.join()
+
+    assert not failures
+    assert not store.snapshot.deltas
+    assert store.count() == 200
@@ -0,0 +1,101 @@
+import pytest
+
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+SUMMARY = {"doc_id": "doc", "section": "summary"}
+
+
+def _texts(n, prefix="chunk"):
+    return [f"{prefix} number {i}" for i in range(n)]
+
+
+def test_add_documents_embeds_in_bounded_batches(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path), batch_size=7, max_in_flight=3)
+    texts = _texts(50)
+    ids = store.add_documents(texts, metadata=SUMMARY)
+    assert ids == list(range(50))
+    assert sorted(embedder.batches) == sorted([7] * 7 + [1])
+    # Batches finishing out of order still land on their own texts
+    for text in texts[::5]:
+        assert store.search(embedder.get_embedding(text), top_k=1)[0]["text"] == text
+
+
+def test_add_documents_rejects_bad_input(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        store.add_documents([])
+    with pytest.raises(ValueError):
+        store.add_documents(["a", "b"], metadatas=[SUMMARY])
+
+
+def test_duplicate_chunks_are_not_embedded_again(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    store.add_documents(_texts(10), metadata=SUMMARY)
+    calls = embedder.calls
+    assert store.add_documents(_texts(10), metadata=SUMMARY) == []
+    assert store.add_documents(_texts(12), metadata=SUMMARY) == [10, 11]
+    assert embedder.calls == calls + 2
+    # Same text in another section is another chunk
+    assert len(store.add_documents(_texts(3), metadata={"doc_id": "doc", "section": "annex_1"})) == 3
+
+
+def test_delete_document_persists(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    store.add_documents(_texts(5, "keep"), metadata={"doc_id": "keep", "section": "summary"})
+    store.add_documents(_texts(5, "drop"), metadata={"doc_id": "drop", "section": "summary"})
+    assert store.delete_document("drop") == 5
+    assert store.delete_document("drop") == 0
+
+    for reopened in (store, FaissStore(embedder, persistence_dir=str(tmp_path))):
+        assert reopened.count() == 5
+        found = reopened.search(embedder.get_embedding("drop number 1"), top_k=10)
+        assert {r["metadata"]["doc_id"] for r in found} == {"keep"}
+
+    # A merge drops the deleted rows for good
+    assert store.segments.merge()
+    assert sum(seg["count"] for seg in store.segments.segments) == 5
+
+
+def test_replace_document_keeps_unchanged_chunks(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    store.add_documents(["a", "b", "c"], metadata=SUMMARY)
+    calls = embedder.calls
+    result = store.replace_document("doc", ["b", "c", "d"], [{"section": "summary"}] * 3)
+    assert result == {"added": 1, "deleted": 1, "unchanged": 2}
+    assert embedder.calls == calls + 1
+    found = store.search(embedder.get_embedding("a"), top_k=10)
+    assert sorted(r["text"] for r in found) == ["b", "c", "d"]
+
+    assert store.replace_document("doc", []) == {"added": 0, "deleted": 3, "unchanged": 0}
+    assert store.count() == 0
+
+
+def _batches(texts, size):
+    for start in range(0, len(texts), size):
+        batch = texts[start:start + size]
+        yield batch, [{"section": "summary"}] * len(batch)
+
+
+def test_replace_document_stream_indexes_batch_by_batch(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    store.add_documents(_texts(10, "old") + _texts(5), metadata=SUMMARY)
+    progress = []
+    result = store.replace_document_stream("doc", _batches(_texts(23), 5), queue_size=1, progress=progress.append)
+    assert result == {"added": 18, "deleted": 10, "unchanged": 5}
+    assert progress == [5, 10, 15, 20, 23]
+    assert store.count() == 23
+    assert store.search(embedder.get_embedding("old number 3"), top_k=30)[0]["text"].startswith("chunk")
+
+
+def test_replace_document_stream_rolls_back_on_failure(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    store.add_documents(_texts(4, "old"), metadata=SUMMARY)
+
+    def failing():
+        yield from _batches(_texts(10), 5)
+        raise OSError("upload truncated")
+
+    with pytest.raises(OSError):
+        store.replace_document_stream("doc", failing())
+    found = store.search(embedder.get_embedding("chunk number 1"), top_k=10)
+    assert sorted(r["text"] for r in found) == _texts(4, "old")
@@ -0,0 +1,68 @@
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.vector_store import index_factory
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+
+@pytest.fixture
+def small_training(monkeypatch):
+    monkeypatch.setattr(settings, "faiss_train_threshold", 300)
+    monkeypatch.setattr(settings, "faiss_nlist", 8)
+    monkeypatch.setattr(settings, "faiss_pq_m", 2)  # PQ training is the slow part
+
+
+def test_validate_rejects_unknown_types():
+    with pytest.raises(ValueError):
+        index_factory.validate("annoy")
+    with pytest.raises(ValueError):
+        index_factory.validate("flat", "int4")
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+def test_index_is_trained_past_the_threshold(tmp_path, embedder, small_training, index_type):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path), index_type=index_type)
+    store.add_documents([f"early {i}" for i in range(50)], metadata={"doc_id": "a", "section": "summary"})
+    # Too few vectors to train: searched exactly until the threshold
+    assert index_factory.index_type_of(store.index) == "flat"
+
+    for k in range(4):
+        store.add_documents([f"c{k}-{i}" for i in range(100)], metadata={"doc_id": f"d{k}", "section": "summary"})
+    store.rebuild()
+    assert store.is_trained
+    assert index_factory.index_type_of(store.index) == index_type
+    # Chunks added while the rebuild ran are searched as exact deltas
+    assert store.count() == 450
+    assert store.search(embedder.get_embedding("c3-5"), top_k=1)[0]["text"] == "c3-5"
+
+    reopened = FaissStore(embedder, persistence_dir=str(tmp_path), index_type=index_type)
+    assert index_factory.index_type_of(reopened.index) == index_type
+    found = [r["text"] for r in reopened.search(embedder.get_embedding("c2-7"), top_k=5, nprobe=8)]
+    if index_type == "ivf_pq":
+        assert "c2-7" in found
+    else:
+        assert found[0] == "c2-7"
+
+
+def test_bytes_per_vector():
+    assert index_factory.bytes_per_vector(32, "float32") == 128
+    assert index_factory.bytes_per_vector(32, "fp16") == 64
+    assert index_factory.bytes_per_vector(32, "sq8") == 32
+    assert index_factory.bytes_per_vector(32, "pq", pq_m=12) == 8
+
+
+@pytest.mark.parametrize("storage", ["fp16", "sq8"])
+def test_quantized_storage_searches_and_rescores(tmp_path, embedder, monkeypatch, storage):
+    monkeypatch.setattr(settings, "faiss_quantizer_train_rows", 64)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path), index_type="flat", storage=storage)
+    texts = [f"chunk {i}" for i in range(200)]
+    store.add_documents(texts, metadata={"doc_id": "doc", "section": "summary"})
+    store.rebuild()
+    assert index_factory.storage_of(store.index) == storage
+
+    reopened = FaissStore(embedder, persistence_dir=str(tmp_path), index_type="flat", storage=storage)
+    assert reopened.index_kind == ("flat", storage)
+    for text in texts[::40]:
+        best = reopened.search(embedder.get_embedding(text), top_k=3, rescore=4)[0]
+        # Re-ranked on the exact float32 vectors: the query's own chunk is at distance 0
+        assert best["text"] == text and best["score"] == pytest.approx(1.0, abs=1e-5)
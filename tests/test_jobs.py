@@ -0,0 +1,119 @@
+import copy
+
+import pytest
+
+from config.settings import settings
+from src.worker import broker, jobs, tasks
+
+
+class DictCache:
+    """RedisCache stand-in: values are copied in and out, as pickling does"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = copy.deepcopy(value)
+
+
+@pytest.mark.parametrize("make_store", [lambda: jobs.MemoryJobStore(), lambda: jobs.RedisJobStore(DictCache(), 60)])
+def test_job_store_records(make_store):
+    store = make_store()
+    job = store.create(doc_id="contrato")
+    assert job["status"] == jobs.QUEUED and job["doc_id"] == "contrato"
+    store.update(job["job_id"], status=jobs.RUNNING, progress={"pages": 3, "chunks": 0})
+    record = store.get(job["job_id"])
+    assert record["status"] == jobs.RUNNING and record["progress"]["pages"] == 3
+    record["status"] = "edited"
+    assert store.get(job["job_id"])["status"] == jobs.RUNNING
+    assert store.get("missing") is None and store.update("missing", status=jobs.DONE) is None
+
+
+def test_memory_job_store_drops_the_oldest():
+    store = jobs.MemoryJobStore(max_jobs=2)
+    first, second, third = (store.create() for _ in range(3))
+    assert store.get(first["job_id"]) is None
+    assert store.get(second["job_id"]) and store.get(third["job_id"])
+
+
+@pytest.fixture
+def job_store(monkeypatch):
+    store = jobs.MemoryJobStore()
+    monkeypatch.setattr(jobs, "get_job_store", lambda: store)
+    return store
+
+
+def test_run_ingest_job_records_progress_and_result(tmp_path, job_store, monkeypatch):
+    def ingest_file(path, doc_id, filename, progress):
+        progress(2, 10)
+        progress(4, 25)
+        return {"added": 25, "deleted": 0, "unchanged": 0, "sections": {"summary": 20, "annex_1": 5}}
+
+    monkeypatch.setattr(tasks, "ingest_file", ingest_file)
+    spooled = tmp_path / "upload.pdf"
+    spooled.write_bytes(b"%PDF")
+    job = job_store.create(doc_id="contrato")
+    tasks.run_ingest_job(job["job_id"], str(spooled), "contrato", "contrato.pdf")
+
+    record = job_store.get(job["job_id"])
+    assert record["status"] == jobs.DONE and record["error"] is None
+    assert record["progress"] == {"pages": 4, "chunks": 25}
+    assert record["result"]["chunks"] == 25 and record["result"]["sections"]["annex_1"] == 5
+    assert not spooled.exists()
+
+
+def test_failed_job_records_the_error(tmp_path, job_store, monkeypatch):
+    def ingest_file(path, doc_id, filename, progress):
+        raise ValueError("Unsupported file type '.txt'")
+
+    monkeypatch.setattr(tasks, "ingest_file", ingest_file)
+    spooled = tmp_path / "upload.txt"
+    spooled.write_text("x")
+    job = job_store.create(doc_id="notes")
+    assert tasks.run_ingest_job(job["job_id"], str(spooled), "notes") is None
+    record = job_store.get(job["job_id"])
+    assert record["status"] == jobs.FAILED and "Unsupported" in record["error"]
+    assert not spooled.exists()
+
+
+def test_document_locks_are_dropped_after_their_jobs(tmp_path, job_store, monkeypatch):
+    held = []
+
+    def ingest_file(path, doc_id, filename, progress):
+        held.append(len(tasks._doc_locks))
+        return {"added": 0, "deleted": 0, "unchanged": 0, "sections": {}}
+
+    monkeypatch.setattr(tasks, "ingest_file", ingest_file)
+    for n in range(20):
+        job = job_store.create(doc_id=f"doc{n}")
+        tasks.run_ingest_job(job["job_id"], str(tmp_path / "gone.pdf"), f"doc{n}")
+    assert held == [1] * 20
+    assert len(tasks._doc_locks) == 0
+    # The same document still gets the same lock while a job holds it
+    lock = tasks._doc_lock("a")
+    assert tasks._doc_lock("a") is lock and tasks._doc_lock("b") is not lock
+def test_enqueue_runs_the_job_on_the_local_broker(tmp_path, job_store, monkeypatch):
+    monkeypatch.setattr(tasks, "ingest_file", lambda *args: {"added": 1, "sections": {"summary": 1}})
+    local = broker.LocalBroker(workers=1)
+    monkeypatch.setattr(broker, "get_broker", lambda: local)
+    spooled = tmp_path / "upload.pdf"
+    spooled.write_bytes(b"%PDF")
+
+    job = broker.enqueue_ingest(str(spooled), "contrato", "contrato.pdf")
+    assert job["status"] == jobs.QUEUED
+    local._pool.shutdown(wait=True)
+    assert job_store.get(job["job_id"])["status"] == jobs.DONE
+
+
+def test_unknown_broker_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "job_broker", "kafka")
+    broker.get_broker.cache_clear()
+    try:
+        with pytest.raises(ValueError):
+            broker.get_broker()
+    finally:
+        broker.get_broker.cache_clear()
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from conftest import FakeEmbedder
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+
+class UnsizedEmbedder(FakeEmbedder):
+    """Has to embed a probe text to learn its dimension"""
+
+    def __init__(self):
+        super().__init__()
+        self.embedding_dim = None
+
+
+def _manifest(path):
+    with open(path / "manifest.json") as f:
+        return json.load(f)
+
+
+def test_manifest_records_embedding_and_count(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    store.add_documents(["a", "b", "c"], metadata={"doc_id": "x", "section": "summary"})
+    store.add_documents(["d"], metadata={"doc_id": "y", "section": "summary"})
+    store.delete_document("y")
+    manifest = _manifest(tmp_path)
+    assert manifest["embedding"] == {"model": "fake", "dimension": 32, "metric": "l2"}
+    assert manifest["count"] == 3
+
+    # Reopening validates against the manifest without embedding anything
+    unsized = UnsizedEmbedder()
+    reopened = FaissStore(unsized, persistence_dir=str(tmp_path))
+    assert unsized.calls == 0
+    assert reopened.dimension == 32 and reopened.count() == 3
+
+
+def test_other_embedding_model_is_rejected(tmp_path, embedder):
+    FaissStore(embedder, persistence_dir=str(tmp_path)).add_documents(["a"], metadata={"doc_id": "x"})
+    other = FakeEmbedder()
+    other.model = "other"
+    with pytest.raises(ValueError, match="other"):
+        FaissStore(other, persistence_dir=str(tmp_path))
+
+
+def test_older_manifest_is_upgraded(tmp_path, embedder):
+    FaissStore(embedder, persistence_dir=str(tmp_path)).add_documents(["a", "b"], metadata={"doc_id": "x"})
+    manifest = _manifest(tmp_path)
+    del manifest["count"], manifest["embedding"]
+    with open(tmp_path / "manifest.json", "w") as f:
+        json.dump(manifest, f)
+
+    assert FaissStore(embedder, persistence_dir=str(tmp_path), read_only=True).count() == 2
+    assert "embedding" not in _manifest(tmp_path)
+    FaissStore(embedder, persistence_dir=str(tmp_path))
+    manifest = _manifest(tmp_path)
+    assert manifest["embedding"]["model"] == "fake" and manifest["count"] == 2
@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.app.infrastructure.cache.memory import LRUCache, size_of
+
+
+def _vector(n=100):
+    return np.zeros(n, dtype=np.float32)
+
+
+def test_evicts_least_recently_used_within_the_byte_budget():
+    entry = size_of(_vector()) + 60
+    cache = LRUCache(max_bytes=entry * 3)
+    for key in ("a", "b", "c"):
+        cache.set(key, _vector())
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.set("d", _vector())
+    assert cache.get("b") is None
+    assert all(cache.get(k) is not None for k in ("a", "c", "d"))
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 3 and stats["bytes"] <= stats["max_bytes"]
+    assert stats["hits"] == 4 and stats["misses"] == 1
+
+
+def test_oversized_values_are_not_stored():
+    cache = LRUCache(max_bytes=1000)
+    cache.set("big", _vector(1000))
+    assert cache.get("big") is None and len(cache) == 0
+
+
+def test_views_count_their_whole_buffer():
+    data = bytes(4096)
+    view = np.frombuffer(data, dtype=np.float32, count=4)
+    assert size_of(view) >= 4096
+
+
+def test_replacing_a_key_keeps_the_byte_count():
+    cache = LRUCache(max_bytes=10_000)
+    cache.set("k", _vector())
+    size = cache.bytes
+    cache.set("k", _vector())
+    assert cache.bytes == size and len(cache) == 1
+    cache.clear()
+    assert cache.bytes == 0 and cache.get("k") is None
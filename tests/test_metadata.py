@@ -0,0 +1,54 @@
+import json
+import os
+import pickle
+
+import numpy as np
+
+from src.app.infrastructure.vector_store.faiss import FaissStore
+from src.app.infrastructure.vector_store.metadata import Vocabulary
+
+
+def test_vocabulary_round_trip():
+    vocab = Vocabulary()
+    assert vocab.encode("summary") == 0 and vocab.encode("annex_1") == 1 and vocab.encode("summary") == 0
+    assert vocab.decode(1) == "annex_1"
+    assert vocab.encode(None) == vocab.lookup("missing") == -1
+    assert vocab.decode(-1) is None
+
+
+def test_columns_round_trip_after_reopen(tmp_path, embedder):
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    texts = ["plain", "acentuación ñandú", "数据 🙂", ""]
+    metadatas = [
+        {"doc_id": "a", "section": "summary"},
+        {"doc_id": "a", "section": "annex_1"},
+        {"doc_id": "b", "section": "annex_1"},
+        {},
+    ]
+    store.add_documents(texts, metadatas=metadatas)
+
+    documents = FaissStore(embedder, persistence_dir=str(tmp_path)).documents
+    assert [documents.text(i) for i in range(4)] == texts
+    assert [documents.doc_id(i) for i in range(4)] == ["a", "a", "b", None]
+    assert [documents.section(i) for i in range(4)] == ["summary", "annex_1", "annex_1", None]
+    assert documents[2] == {"text": "数据 🙂", "metadata": {"doc_id": "b", "section": "annex_1", "chunk_id": 2}}
+    assert not os.path.exists(tmp_path / "documents.pkl")
+
+
+def test_pickled_segment_is_upgraded(tmp_path, embedder):
+    segment = tmp_path / "segments" / "seg_000001"
+    os.makedirs(segment)
+    np.save(segment / "vectors.npy", np.array([embedder.get_embedding("old ñ")], dtype=np.float32))
+    with open(segment / "documents.pkl", "wb") as f:
+        pickle.dump([{"text": "old ñ", "metadata": {"doc_id": "x", "section": "summary", "chunk_id": 0}}], f)
+    with open(tmp_path / "manifest.json", "w") as f:
+        json.dump({"format_version": 1, "dimension": embedder.embedding_dim, "next_segment": 2,
+                   "segments": [{"name": "seg_000001", "count": 1}]}, f)
+
+    store = FaissStore(embedder, persistence_dir=str(tmp_path))
+    assert store.documents[0]["text"] == "old ñ"
+    assert not os.path.exists(segment / "documents.pkl")
+    store.add_documents(["new"], metadata={"doc_id": "y", "section": "annex_1"})
+    reopened = FaissStore(embedder, persistence_dir=str(tmp_path))
+    assert reopened.documents.doc_id(1) == "y"
+    assert reopened.search(embedder.get_embedding("old ñ"), top_k=1)[0]["text"] == "old ñ"
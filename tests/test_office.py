@@ -0,0 +1,172 @@
+import zipfile
+
+import pytest
+
+from src.app.infrastructure.file_processing import office
+from src.app.infrastructure.file_processing.sections import is_supported, iter_sections
+
+R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+S = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+P = 'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" ' \
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+RELS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+
+
+def _rels(targets):
+    body = "".join(f'<Relationship Id="{rid}" Target="{target}"/>' for rid, target in targets.items())
+    return f"<Relationships {RELS}>{body}</Relationships>"
+
+
+def _zip(path, parts):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def _para(text, style=None):
+    props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{props}<w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def _docx(path, body):
+    document = f'<?xml version="1.0" encoding="UTF-8"?><w:document {W}><w:body>{body}<w:sectPr/></w:body></w:document>'
+    return _zip(path, {"word/document.xml": document})
+
+
+def _joined(pieces):
+    sections = {}
+    for section, text in pieces:
+        sections[section] = sections.get(section, "") + text
+    return sections
+
+
+def test_docx_body_tables_and_annexes(tmp_path):
+    table = (
+        "<w:tbl><w:tr>"
+        f"<w:tc>{_para('Precio')}</w:tc><w:tc>{_para('100 €')}</w:tc>"
+        "</w:tr></w:tbl>"
+    )
+    body = (
+        _para("Contrato de servicios", "Title")
+        + _para("Cláusula primera")
+        + _para("")
+        + table
+        # A long paragraph starting with "Anexo" is body text, not a title
+        + _para("Anexo citado en la cláusula " + "x" * office.ANNEX_TITLE_CHARS)
+        + _para("ANEXO I - Especificaciones", "Heading1")
+        + _para("spec 1")
+        + _para("Apéndice B")
+        + _para("tabla final")
+    )
+    sections = _joined(iter_sections(_docx(tmp_path / "contrato.docx", body)))
+
+    assert list(sections) == ["summary", "annex_1", "annex_2"]
+    assert sections["summary"].startswith("Contrato de servicios\nCláusula primera\nPrecio | 100 €\nAnexo citado")
+    assert sections["annex_1"] == "ANEXO I - Especificaciones\nspec 1\n"
+    assert sections["annex_2"] == "Apéndice B\ntabla final\n"
+
+
+def test_docx_long_body_is_split_into_pieces(tmp_path):
+    body = "".join(_para(f"Cláusula {i}: texto del contrato.") for i in range(500))
+    pieces = list(office.iter_docx_sections(_docx(tmp_path / "largo.docx", body)))
+
+    assert len(pieces) > 1
+    assert {section for section, _ in pieces} == {"summary"}
+    assert all(len(text) <= office.PIECE_CHARS + 100 for _, text in pieces)
+    assert "".join(text for _, text in pieces).count("Cláusula") == 500
+
+
+def _xlsx(path, sheets, shared=()):
+    workbook = "".join(
+        f'<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>' for n, name in enumerate(sheets, start=1)
+    )
+    parts = {
+        "xl/workbook.xml": f"<workbook {S} {R}><sheets>{workbook}</sheets></workbook>",
+        "xl/_rels/workbook.xml.rels": _rels(
+            {f"rId{n}": f"worksheets/sheet{n}.xml" for n in range(1, len(sheets) + 1)}
+        ),
+    }
+    if shared:
+        parts["xl/sharedStrings.xml"] = f"<sst {S}>{''.join(shared)}</sst>"
+    for n, rows in enumerate(sheets.values(), start=1):
+        parts[f"xl/worksheets/sheet{n}.xml"] = f"<worksheet {S}><sheetData>{rows}</sheetData></worksheet>"
+    return _zip(path, parts)
+
+
+def test_xlsx_rows_cell_types_and_header(tmp_path):
+    shared = [
+        "<si><t>Cliente</t></si>",
+        "<si><t>Importe</t></si>",
+        "<si><r><t>Acme </t></r><r><t>S.A.</t></r><rPh><t>x</t></rPh></si>",
+    ]
+    rows = (
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="C1" t="s"><v>1</v></c></row>'
+        '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2" t="b"><v>1</v></c><c r="C2"><v>12.5</v></c></row>'
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>Beta</t></is></c><c r="B3" t="b"><v>0</v></c></row>'
+        '<row r="4"><c r="A4"/></row>'
+    )
+    path = _xlsx(tmp_path / "datos.xlsx", {"Datos": rows, "Vacía": ""}, shared)
+    pieces = list(iter_sections(path))
+
+    assert pieces == [("sheet_1", "Datos\nCliente |  | Importe\nAcme S.A. | TRUE | 12.5\nBeta | FALSE\n")]
+
+
+def test_xlsx_header_heads_every_piece(tmp_path):
+    rows = '<row r="1"><c r="A1" t="inlineStr"><is><t>Nombre</t></is></c></row>'
+    rows += "".join(
+        f'<row r="{i}"><c r="A{i}" t="inlineStr"><is><t>fila {i} {"x" * 50}</t></is></c></row>'
+        for i in range(2, 300)
+    )
+    only_header = '<row r="1"><c r="A1"><v>7</v></c></row>'
+    path = _xlsx(tmp_path / "filas.xlsx", {"Hoja": rows, "Cabecera": only_header})
+    pieces = list(office.iter_xlsx_sections(path))
+
+    sheet_1 = [text for section, text in pieces if section == "sheet_1"]
+    assert len(sheet_1) > 1
+    assert all(text.startswith("Hoja\nNombre\n") for text in sheet_1)
+    assert sum(text.count("fila ") for text in sheet_1) == 298
+    # A sheet with nothing but its first row still yields it
+    assert pieces[-1] == ("sheet_2", "Cabecera\n7\n")
+
+
+def test_pptx_slides_in_presentation_order(tmp_path):
+    def slide(title):
+        return (
+            f"<p:sld {P}><p:cSld><p:spTree><p:sp><p:txBody>"
+            f"<a:p><a:r><a:t>{title}</a:t></a:r></a:p>"
+            "<a:p><a:r><a:t>punto </a:t></a:r><a:r><a:t>dos</a:t></a:r></a:p>"
+            "<a:p></a:p>"
+            "</p:txBody></p:sp></p:spTree></p:cSld></p:sld>"
+        )
+
+    path = _zip(tmp_path / "deck.pptx", {
+        # slide2.xml is shown first
+        "ppt/presentation.xml": (
+            f"<p:presentation {P} {R}><p:sldIdLst>"
+            '<p:sldId id="257" r:id="rId3"/><p:sldId id="256" r:id="rId2"/>'
+            "</p:sldIdLst></p:presentation>"
+        ),
+        "ppt/_rels/presentation.xml.rels": _rels(
+            {"rId2": "slides/slide1.xml", "rId3": "/ppt/slides/slide2.xml"}
+        ),
+        "ppt/slides/slide1.xml": slide("Segunda"),
+        "ppt/slides/slide2.xml": slide("Primera"),
+    })
+
+    assert list(iter_sections(path)) == [
+        ("slide_1", "Primera\npunto dos\n"),
+        ("slide_2", "Segunda\npunto dos\n"),
+    ]
+
+
+def test_extractor_is_picked_by_extension(tmp_path):
+    assert is_supported("informe.PDF") and is_supported("a.docx") and is_supported("b.xlsx")
+    assert not is_supported("notas.txt") and not is_supported("antiguo.doc")
+
+    # An upload is saved under a temporary name; the original filename decides
+    path = _docx(tmp_path / "upload.tmp", _para("hola"))
+    assert list(iter_sections(path, "original.docx")) == [("summary", "hola\n")]
+    with pytest.raises(ValueError, match="Unsupported file type '.txt'"):
+        iter_sections(path, "notas.txt")
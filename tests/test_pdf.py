@@ -0,0 +1,52 @@
+import fitz
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.file_processing import pdf
+
+
+def _write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        for n, line in enumerate(text.split("\n")):
+            page.insert_text((50, 60 + n * 14), line)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_parallel_min_pages", 4)
+    monkeypatch.setattr(settings, "pdf_pages_per_task", 3)
+    yield
+    pdf._reset_pool()
+
+
+def test_parallel_extraction_keeps_page_order(tmp_path, parallel):
+    path = _write_pdf(tmp_path / "doc.pdf", [f"page {i}" for i in range(20)])
+    sequential = list(pdf.extract_pages(path, workers=1))
+    assert [text.strip() for text in sequential] == [f"page {i}" for i in range(20)]
+    assert list(pdf.extract_pages(path, workers=2)) == sequential
+    assert pdf.extract_text_from_pdf(path) == "".join(sequential)
+
+    # Stopping early cancels the queued ranges
+    pages = pdf.extract_pages(path, workers=2)
+    assert next(pages).strip() == "page 0"
+    pages.close()
+
+
+def test_classify_pages():
+    pages = ["RESUMEN del contrato", "", "x" * 1200, "cuerpo", "ANEXO I tarifas", "Anexo II plazos", "RESUMEN final"]
+    assert [section for section, _ in pdf.classify_pages(pages)] == [
+        "summary", "summary", "annex_1", "annex_2", "summary",
+    ]
+
+
+def test_parse_pdf_with_annexes(tmp_path):
+    path = _write_pdf(tmp_path / "doc.pdf", ["RESUMEN\nobjeto del contrato", "ANEXO 1\ntarifas", "ANEXO 2\nplazos"])
+    parsed = pdf.parse_pdf_with_annexes(path)
+    assert parsed["summary"].startswith("RESUMEN") and "objeto del contrato" in parsed["summary"]
+    assert len(parsed["annexes"]) == 2 and "plazos" in parsed["annexes"][1]
+    assert [s for s, _ in pdf.iter_pdf_sections(path)] == ["summary", "annex_1", "annex_2"]
@@ -0,0 +1,94 @@
+import time
+from types import SimpleNamespace
+
+from config.settings import settings
+from src.app.infrastructure.llm.embeddings import OpenAIBackend
+from src.app.infrastructure.llm.ratelimit import (
+    AdaptiveRateLimiter,
+    is_transient,
+    pack_requests,
+    retry_after_seconds,
+)
+
+
+def test_pack_requests_respects_input_and_token_limits():
+    assert pack_requests([], 4, 100) == []
+    assert pack_requests([10] * 5, 2, 100) == [[0, 1], [2, 3], [4]]
+    assert pack_requests([60, 50, 30, 20, 90], 10, 100) == [[0], [1, 2, 3], [4]]
+    # An input over the token limit goes alone
+    assert pack_requests([10, 500, 10], 10, 100) == [[0], [1], [2]]
+    requests = pack_requests(list(range(1, 200)), 16, 300)
+    assert [i for request in requests for i in request] == list(range(199))
+
+
+def test_rate_limit_shrinks_requests_and_success_restores_them():
+    limiter = AdaptiveRateLimiter()
+    assert limiter.limits(64, 8000) == (64, 8000)
+    limiter.on_rate_limited(retry_after=0.01)
+    limiter.on_rate_limited(retry_after=0.01)
+    assert limiter.limits(64, 8000) == (16, 2000) and limiter.throttled == 2
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.scale == 1.0
+
+
+def test_scale_has_a_floor():
+    limiter = AdaptiveRateLimiter(min_scale=1 / 4)
+    for _ in range(10):
+        limiter.on_rate_limited(retry_after=0.001)
+    assert limiter.scale == 0.25 and limiter.limits(2, 2) == (1, 1)
+
+
+def test_acquire_waits_out_a_pause_and_the_bucket():
+    limiter = AdaptiveRateLimiter(tokens_per_minute=60_000)
+    started = time.monotonic()
+    limiter.acquire(1000)
+    assert time.monotonic() - started < 0.05
+
+    limiter.on_rate_limited(retry_after=0.2)
+    started = time.monotonic()
+    limiter.acquire(10)
+    # The pause, then refilling 10 tokens at half the rate (500 tokens/s)
+    assert time.monotonic() - started >= 0.2
+
+
+def test_error_classification():
+    assert is_transient(SimpleNamespace(status_code=429))
+    assert is_transient(SimpleNamespace(status_code=503))
+    assert not is_transient(SimpleNamespace(status_code=400))
+    assert not is_transient(ValueError("bad input"))
+    response = SimpleNamespace(headers={"retry-after-ms": "1500"})
+    assert retry_after_seconds(SimpleNamespace(response=response)) == 1.5
+    assert retry_after_seconds(SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "2"}))) == 2.0
+    assert retry_after_seconds(ValueError()) is None
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after-ms": "10"})
+
+
+class _FlakyClient:
+    """Embeddings client whose second request is rate limited"""
+
+    def __init__(self):
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        if len(self.requests) == 2:
+            raise _RateLimitError()
+        return [[float(len(t))] for t in texts]
+
+
+def test_openai_backend_retries_with_smaller_requests(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_request_max_inputs", 8)
+    monkeypatch.setattr(settings, "embedding_request_max_tokens", 100_000)
+    backend = OpenAIBackend(model="text-embedding-3-small")
+    backend.client = _FlakyClient()
+    texts = ["x" * n for n in range(1, 21)]
+
+    assert backend.embed_documents(texts) == [[float(n)] for n in range(1, 21)]
+    sizes = [len(r) for r in backend.client.requests]
+    assert sizes[:2] == [8, 8] and max(sizes[2:]) == 4
+    assert backend.limiter.throttled == 1
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+
+def _touch(path):
+    # Manifest mtimes written within one clock tick would look unchanged
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize("index_type, storage", [("flat", "float32"), ("ivf_flat", "float32"), ("flat", "sq8")])
+def test_reader_shares_the_writers_store(tmp_path, embedder, monkeypatch, index_type, storage):
+    monkeypatch.setattr(settings, "faiss_train_threshold", 300)
+    monkeypatch.setattr(settings, "faiss_nlist", 8)
+    monkeypatch.setattr(settings, "faiss_quantizer_train_rows", 64)
+    monkeypatch.setattr(settings, "vector_store_index_checkpoint_rows", 100)
+    monkeypatch.setattr(settings, "vector_store_refresh_seconds", 0)
+    kwargs = dict(persistence_dir=str(tmp_path), index_type=index_type, storage=storage)
+    writer = FaissStore(embedder, **kwargs)
+    for k in range(4):
+        writer.add_documents([f"c{k}-{i}" for i in range(100)], metadata={"doc_id": f"d{k}", "section": "summary"})
+    writer.rebuild()
+    writer.add_documents(["tail one"], metadata={"doc_id": "t", "section": "summary"})
+
+    reader = FaissStore(embedder, read_only=True, **kwargs)
+    assert reader.count() == writer.count() == 401
+    for text in ["c1-5", "c3-99", "tail one"]:
+        assert reader.search(embedder.get_embedding(text), top_k=1, nprobe=8)[0]["text"] == text
+    with pytest.raises(RuntimeError):
+        reader.add_documents(["x"])
+
+    writer.delete_document("d1")
+    writer.add_documents(["tail two"], metadata={"doc_id": "t", "section": "summary"})
+    _touch(tmp_path / "manifest.json")
+    # The next search notices the new manifest and reloads
+    found = reader.search(embedder.get_embedding("c1-5"), top_k=10, nprobe=8)
+    assert not any(r["metadata"]["doc_id"] == "d1" for r in found)
+    assert reader.search(embedder.get_embedding("tail two"), top_k=1, nprobe=8)[0]["text"] == "tail two"
+    assert reader.count() == writer.count()
+
+
+def test_reader_of_a_missing_store_is_empty(tmp_path, embedder):
+    reader = FaissStore(embedder, persistence_dir=str(tmp_path / "none"), read_only=True)
+    assert reader.count() == 0
+    assert reader.search(embedder.get_embedding("x"), top_k=3) == []
+    assert not os.path.exists(tmp_path / "none" / "manifest.json")
+
+
+def test_one_query_thread_reloads_while_others_keep_searching(tmp_path, embedder, monkeypatch):
+    monkeypatch.setattr(settings, "vector_store_refresh_seconds", 0)
+    writer = FaissStore(embedder, persistence_dir=str(tmp_path))
+    writer.add_documents([f"c{i}" for i in range(20)], metadata={"doc_id": "d", "section": "summary"})
+    reader = FaissStore(embedder, persistence_dir=str(tmp_path), read_only=True)
+
+    loads = []
+    load = reader._load_persisted_data
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.2)
+        return load()
+
+    monkeypatch.setattr(reader, "_load_persisted_data", slow_load)
+    writer.add_documents(["new"], metadata={"doc_id": "n", "section": "summary"})
+    _touch(tmp_path / "manifest.json")
+
+    results = []
+    query = embedder.get_embedding("c3")
+    threads = [threading.Thread(target=lambda: results.append(reader.search(query, top_k=1))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert [r[0]["text"] for r in results] == ["c3"] * 8
+    assert reader.count() == 21
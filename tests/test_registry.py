@@ -0,0 +1,41 @@
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.vector_store import registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def test_one_store_per_directory_and_configuration(tmp_path, embedder):
+    path = str(tmp_path)
+    store = registry.get_vector_store(path, embedder, read_only=False)
+    assert registry.get_vector_store(path, embedder, read_only=False) is store
+    # Same directory through another path spelling
+    assert registry.get_vector_store(f"{path}/.", embedder, read_only=False) is store
+
+    reader = registry.get_vector_store(path, embedder, read_only=True)
+    assert reader is not store and reader.read_only
+    flat_sq8 = registry.get_vector_store(path, embedder, storage="sq8", read_only=False)
+    assert flat_sq8 is not store
+
+    registry.clear()
+    assert registry.get_vector_store(path, embedder, read_only=False) is not store
+
+
+def test_writes_are_visible_to_every_consumer(tmp_path, embedder):
+    first = registry.get_vector_store(str(tmp_path), embedder, read_only=False)
+    second = registry.get_vector_store(str(tmp_path), embedder, read_only=False)
+    first.add_documents(["shared"], metadata={"doc_id": "x", "section": "summary"})
+    assert second.search(embedder.get_embedding("shared"), top_k=1)[0]["text"] == "shared"
+
+
+def test_shared_embedder(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_backend", "hashing")
+    embedder = registry.get_embedder()
+    assert registry.get_embedder() is embedder
+    assert registry.get_embedder(backend="hashing", model="hashing-8") is not embedder
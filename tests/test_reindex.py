@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import FakeEmbedder
+from src.app.infrastructure.llm.adapters import EmbeddingAdapter
+from src.app.infrastructure.llm.embeddings import HashingEmbedder, truncate_embeddings
+from src.app.infrastructure.vector_store import reindex
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+
+def _embedder(model, dimension):
+    embedder = FakeEmbedder(dimension)
+    embedder.model = model
+    return embedder
+
+
+def _texts(n):
+    return [f"chunk number {i}" for i in range(n)]
+
+
+def test_reindex_in_background_and_reader_follows(tmp_path):
+    root = str(tmp_path / "store")
+    full = _embedder("hashing-32", 32)
+    writer = FaissStore(full, persistence_dir=root, read_only=False)
+    texts = _texts(20)
+    writer.add_documents(texts, metadata={"doc_id": "doc", "section": "summary"})
+    # A read-only API process configured for the full-size model
+    reader = FaissStore(EmbeddingAdapter(backend=HashingEmbedder(dimension=32)), persistence_dir=root, read_only=True)
+    assert reader.count() == 20
+
+    outcome = {}
+    thread = reindex.reindex_in_background(
+        writer, _embedder("hashing-32@16", 16), done=lambda report, error: outcome.update(report=report, error=error)
+    )
+    thread.join(30)
+    assert outcome["error"] is None
+    assert outcome["report"]["dimension_after"] == 16
+    assert writer.dimension == 16 and writer.count() == 20
+
+    assert reader.refresh()
+    assert reader.embedder.model == "hashing-32@16"
+    assert reader.dimension == 16 and reader.count() == 20
+    query = truncate_embeddings(full.get_embedding(texts[3])[None, :], 16)[0]
+    assert reader.search(query, top_k=1)[0]["text"] == texts[3]
+
+
+def test_reindex_in_background_rejects_invalid_requests(tmp_path):
+    root = str(tmp_path / "store")
+    store = FaissStore(_embedder("hashing-32", 32), persistence_dir=root, read_only=False)
+    store.add_documents(_texts(5), metadata={"doc_id": "doc", "section": "summary"})
+    with pytest.raises(ValueError):
+        reindex.reindex_in_background(store, _embedder("hashing-32@64", 64))
+    with pytest.raises(ValueError):
+        reindex.reindex_in_background(store, _embedder("other@16", 16))
+
+    reader = FaissStore(_embedder("hashing-32", 32), persistence_dir=root, read_only=True)
+    with pytest.raises(RuntimeError):
+        reindex.reindex_in_background(reader, _embedder("hashing-32@16", 16))
+
+
+def test_cli_requires_offline(tmp_path):
+    with pytest.raises(SystemExit):
+        reindex.main(["--store", str(tmp_path / "store"), "--dimension", "16"])
+
+
+def test_dimension_recall():
+    rng = np.random.default_rng(0)
+    # Unit vectors, as the embedding backends return
+    chunks = [truncate_embeddings(rng.standard_normal((300, 32)), 32) for _ in range(2)]
+    assert reindex.dimension_recall(chunks, 32, k=5, n_queries=50) == 1.0
+    assert 0.0 < reindex.dimension_recall(chunks, 8, k=5, n_queries=50) < 1.0
+
+
+def test_reindex_reembeds_and_keeps_deletions(tmp_path):
+    root = str(tmp_path / "store")
+    store = FaissStore(_embedder("hashing-32", 32), persistence_dir=root, read_only=False)
+    texts = _texts(10)
+    ids = store.add_documents(texts, metadata={"doc_id": "doc", "section": "summary"})
+    store.delete_chunks(ids[:2])
+
+    other = _embedder("other-16", 16)
+    report = reindex.reindex(store, other, reembed=True)
+    assert report["method"] == "reembed" and report["recall@10"] is None
+    assert store.count() == 8 and store.dimension == 16
+    assert other.batches
+    assert store.search(other.get_embedding(texts[5]), top_k=1)[0]["text"] == texts[5]
+    assert os.path.isdir(report["backup"])
+    assert FaissStore(other, persistence_dir=root).count() == 8
+
+
+def test_failed_reindex_removes_its_copy(tmp_path):
+    root = str(tmp_path / "store")
+    store = FaissStore(_embedder("hashing-32", 32), persistence_dir=root, read_only=False)
+    store.add_documents(_texts(10), metadata={"doc_id": "doc", "section": "summary"})
+    broken = _embedder("other-16", 16)
+
+    def fail(texts):
+        raise RuntimeError("embedding service down")
+
+    broken.embed = fail
+    with pytest.raises(RuntimeError):
+        reindex.reindex(store, broken, reembed=True)
+    assert not os.path.exists(f"{root}.reindex-16")
+    assert store.dimension == 32 and store.count() == 10
+
+    # Nothing left behind blocks the next attempt
+    report = reindex.reindex(store, _embedder("other-16", 16), reembed=True)
+    assert report["rows"] == 10 and store.dimension == 16
+
+
+def test_restart_adopts_reindexed_dimension(tmp_path):
+    root = str(tmp_path / "store")
+    store = FaissStore(_embedder("hashing-32", 32), persistence_dir=root, read_only=False)
+    texts = _texts(10)
+    store.add_documents(texts, metadata={"doc_id": "doc", "section": "summary"})
+    reindex.reindex(store, _embedder("hashing-32@16", 16))
+
+    # Restarted with the full-size configuration: the recorded shortened model is used
+    full = EmbeddingAdapter(backend=HashingEmbedder(dimension=32))
+    restarted = FaissStore(full, persistence_dir=root, read_only=False)
+    assert restarted.embedder.model == "hashing-32@16" and restarted.dimension == 16
+    query = truncate_embeddings(FakeEmbedder(32).get_embedding(texts[4])[None, :], 16)[0]
+    assert restarted.search(query, top_k=1)[0]["text"] == texts[4]
+
+    # Another model still refuses to open it
+    with pytest.raises(ValueError, match="re-index"):
+        FaissStore(_embedder("other", 32), persistence_dir=root, read_only=False)
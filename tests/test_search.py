@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from config.settings import settings
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+
+@pytest.fixture(params=["flat", "ivf_flat", "hnsw"])
+def store(request, tmp_path, embedder, monkeypatch):
+    monkeypatch.setattr(settings, "faiss_train_threshold", 300)
+    monkeypatch.setattr(settings, "faiss_nlist", 8)
+    monkeypatch.setattr(settings, "vector_store_exact_filter_rows", 50)
+    store = FaissStore(embedder, persistence_dir=str(tmp_path), index_type=request.param)
+    for k in range(6):
+        section = "summary" if k == 0 else f"annex_{k}"
+        store.add_documents([f"c{k}-{i}" for i in range(100)], metadata={"doc_id": f"d{k % 3}", "section": section})
+    store.rebuild()
+    return store
+
+
+def test_filters_are_pushed_into_the_search(store, embedder):
+    query = embedder.get_embedding("c4-3")
+    # Only 100 summary chunks exist, all far from the query: still top_k of them come back
+    found = store.search(query, top_k=50, filters={"section": "summary"}, nprobe=8)
+    assert len(found) == 50 and {r["metadata"]["section"] for r in found} == {"summary"}
+
+    found = store.search(query, top_k=5, filters={"section_prefix": "annex_", "doc_id": "d1"}, nprobe=8)
+    assert found[0]["text"] == "c4-3"
+    assert all(r["metadata"]["doc_id"] == "d1" and r["metadata"]["section"].startswith("annex_") for r in found)
+
+    found = store.search(query, top_k=5, filters={"doc_id": ["d0", "d2"]}, nprobe=8)
+    assert len(found) == 5 and {r["metadata"]["doc_id"] for r in found} <= {"d0", "d2"}
+
+    assert store.search(query, top_k=5, filters={"section": "missing"}) == []
+
+
+def test_unknown_filter_key_is_rejected(store, embedder):
+    with pytest.raises(ValueError):
+        store.search(embedder.get_embedding("c1-1"), top_k=5, filters={"page": 3})
+
+
+def test_search_many_matches_single_searches(store, embedder):
+    texts = ["c1-5", "c2-9", "c5-40", "c0-0"]
+    filters = [None, {"section": "annex_2"}, {"doc_id": "d2"}, None]
+    queries = np.array(embedder.embed(texts), dtype=np.float32)
+    batched = store.search_many(queries, top_k=4, filters=filters, nprobe=8)
+    assert len(batched) == len(texts)
+    for query, f, results in zip(queries, filters, batched):
+        assert results == store.search(query, top_k=4, filters=f, nprobe=8)
+    assert [r[0]["text"] for r in batched] == texts
+
+    with pytest.raises(ValueError):
+        store.search_many(queries, top_k=4, filters=[None])
@@ -0,0 +1,61 @@
+import os
+import pickle
+
+import faiss
+import numpy as np
+
+from config.settings import settings
+from src.app.infrastructure.vector_store.faiss import FaissStore
+
+SUMMARY = {"doc_id": "doc", "section": "summary"}
+
+
+def _store(embedder, path, **kwargs):
+    return FaissStore(embedder, persistence_dir=str(path), **kwargs)
+
+
+def test_each_add_appends_a_segment_and_reopens(tmp_path, embedder, monkeypatch):
+    monkeypatch.setattr(settings, "vector_store_merge_threshold", 100)
+    store = _store(embedder, tmp_path)
+    for k in range(3):
+        store.add_documents([f"batch {k} chunk {i}" for i in range(4)], metadata=SUMMARY)
+    segments = store.segments.segments
+    assert [seg["count"] for seg in segments] == [4, 4, 4]
+    assert sorted(os.listdir(tmp_path / "segments")) == [seg["name"] for seg in segments]
+
+    # A segment left behind by an interrupted write is not in the manifest
+    os.makedirs(tmp_path / "segments" / "seg_999999")
+    reopened = _store(embedder, tmp_path)
+    assert reopened.count() == 12
+    assert "seg_999999" not in os.listdir(tmp_path / "segments")
+    best = reopened.search(embedder.get_embedding("batch 1 chunk 2"), top_k=1)[0]
+    assert best["text"] == "batch 1 chunk 2" and best["metadata"]["chunk_id"] == 6
+
+
+def test_merge_compacts_segments_in_row_order(tmp_path, embedder, monkeypatch):
+    monkeypatch.setattr(settings, "vector_store_merge_threshold", 100)
+    store = _store(embedder, tmp_path)
+    texts = [f"chunk {i}" for i in range(9)]
+    for start in range(0, 9, 3):
+        store.add_documents(texts[start:start + 3], metadata=SUMMARY)
+    assert store.segments.merge()
+    assert len(store.segments.segments) == 1
+
+    reopened = _store(embedder, tmp_path)
+    assert [reopened.documents[i]["text"] for i in range(9)] == texts
+    assert reopened.search(embedder.get_embedding("chunk 7"), top_k=1)[0]["text"] == "chunk 7"
+
+
+def test_legacy_files_are_imported(tmp_path, embedder):
+    texts = ["old one", "old two"]
+    index = faiss.IndexFlatL2(embedder.embedding_dim)
+    index.add(np.array(embedder.embed(texts), dtype=np.float32))
+    faiss.write_index(index, str(tmp_path / "faiss_index.bin"))
+    with open(tmp_path / "documents.pkl", "wb") as f:
+        pickle.dump([{"text": t, "metadata": {**SUMMARY, "chunk_id": i}} for i, t in enumerate(texts)], f)
+
+    store = _store(embedder, tmp_path)
+    assert store.count() == 2
+    assert store.search(embedder.get_embedding("old two"), top_k=1)[0]["text"] == "old two"
+    store.add_documents(["new"], metadata=SUMMARY)
+    assert _store(embedder, tmp_path).count() == 3
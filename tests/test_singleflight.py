@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from src.app.utils.singleflight import SingleFlight
+
+
+def _run_concurrently(flight, n, fn, key="k"):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(flight, n):
+    while flight.stats()["coalesced"] < n:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight, release, calls = SingleFlight("test"), threading.Event(), []
+
+    def upstream():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = _run_concurrently(flight, 5, upstream)
+    _wait_for_waiters(flight, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["answer"] * 5 and not errors
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+    # Finished calls are not cached: the next one goes upstream again
+    assert flight.do("k", upstream) == "answer" and len(calls) == 2
+
+
+def test_waiters_get_the_leaders_error():
+    flight, release = SingleFlight("test"), threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    threads, results, errors = _run_concurrently(flight, 3, failing)
+    _wait_for_waiters(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert not results and len(errors) == 3
+    assert all(str(e) == "upstream down" for e in errors)
+
+
+def test_redis_trouble_falls_back_to_a_local_call():
+    class BrokenClient:
+        def set(self, *args, **kwargs):
+            raise ConnectionError("no redis")
+
+    class BrokenCache:
+        client = BrokenClient()
+
+    flight = SingleFlight("test", cache=BrokenCache())
+    assert flight.do("k", lambda: 42) == 42
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: int("x"))
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from src.app.utils.stages import threaded
+
+
+def test_items_come_through_in_order():
+    assert list(threaded(iter(range(100)), maxsize=3)) == list(range(100))
+
+
+def test_producer_runs_at_most_a_queue_ahead():
+    produced = []
+
+    def items():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    stage = threaded(items(), maxsize=2)
+    assert next(stage) == 0
+    threading.Event().wait(0.2)
+    # One taken, two queued, one blocked in put()
+    assert len(produced) <= 4
+    assert list(stage) == list(range(1, 50))
+
+
+def test_producer_error_is_raised_in_the_consumer():
+    def items():
+        yield 1
+        raise ValueError("bad page")
+
+    stage = threaded(items())
+    assert next(stage) == 1
+    with pytest.raises(ValueError, match="bad page"):
+        next(stage)
+
+
+def test_closing_the_consumer_stops_the_producer():
+    closed = threading.Event()
+
+    def items():
+        try:
+            for i in range(10_000):
+                yield i
+        finally:
+            closed.set()
+
+    stage = threaded(items(), maxsize=1)
+    assert next(stage) == 0
+    stage.close()
+    assert closed.wait(2)